@@ -3,8 +3,11 @@
 Tool for building a combined SDB or CSV sample-set from other sets
 Use 'python3 data_set_tool.py -h' for help
 '''
+import os
 import sys
+import shutil
 import argparse
+import tempfile
 import progressbar
 from pathlib import Path
 
@@ -18,9 +21,12 @@ from deepspeech_training.util.downloader import SIMPLE_BAR
 from deepspeech_training.util.sample_collections import (
     CSVWriter,
     DirectSDBWriter,
+    ShardedSDBWriter,
     TarWriter,
     samples_from_sources,
+    unpack_maybe,
 )
+from deepspeech_training.util.helpers import LimitingPool
 from deepspeech_training.util.augmentations import (
     parse_augmentations,
     apply_sample_augmentations,
@@ -30,6 +36,48 @@ from deepspeech_training.util.augmentations import (
 AUDIO_TYPE_LOOKUP = {'wav': AUDIO_TYPE_WAV, 'opus': AUDIO_TYPE_OPUS}
 
 
+def write_chunk(chunk):
+    chunk_filename, samples, audio_type, bitrate, frame_index, labeled = chunk
+    with DirectSDBWriter(chunk_filename,
+                         audio_type=audio_type,
+                         bitrate=bitrate,
+                         frame_index=frame_index,
+                         labeled=labeled) as chunk_writer:
+        for sample in samples:
+            chunk_writer.add(unpack_maybe(sample))
+    return chunk_filename
+
+
+def build_chunked_sdb(writer, samples, audio_type, bar):
+    chunk_dir = tempfile.mkdtemp(dir=str(Path(CLI_ARGS.target).absolute().parent))
+
+    def chunks():
+        chunk_samples = []
+        for sample in samples:
+            chunk_samples.append(sample)
+            if len(chunk_samples) >= CLI_ARGS.chunk_size:
+                yield chunk_samples
+                chunk_samples = []
+        if len(chunk_samples) > 0:
+            yield chunk_samples
+
+    def chunk_specs():
+        for chunk_index, chunk_samples in enumerate(chunks()):
+            chunk_filename = os.path.join(chunk_dir, 'chunk{0:08d}.sdb'.format(chunk_index))
+            yield (chunk_filename, chunk_samples, audio_type,
+                   CLI_ARGS.bitrate, CLI_ARGS.opus_frame_index, writer.labeled)
+
+    try:
+        processes = CLI_ARGS.workers
+        with LimitingPool(processes=processes, process_ahead=processes) as pool:
+            for chunk_filename in pool.imap(write_chunk, chunk_specs()):
+                writer.add_sdb(chunk_filename)
+                os.remove(chunk_filename)
+                bar.update(len(writer))
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+
 def build_data_set():
     audio_type = AUDIO_TYPE_LOOKUP[CLI_ARGS.audio_type]
     augmentations = parse_augmentations(CLI_ARGS.augment)
@@ -41,13 +89,25 @@ def build_data_set():
     if extension == '.csv':
         writer = CSVWriter(CLI_ARGS.target, absolute_paths=CLI_ARGS.absolute_paths, labeled=labeled)
     elif extension == '.sdb':
-        writer = DirectSDBWriter(CLI_ARGS.target, audio_type=audio_type, labeled=labeled)
+        writer = DirectSDBWriter(CLI_ARGS.target,
+                                 audio_type=audio_type,
+                                 frame_index=CLI_ARGS.opus_frame_index,
+                                 labeled=labeled)
+    elif extension == '.sdbm':
+        writer = ShardedSDBWriter(CLI_ARGS.target,
+                                  shard_size=CLI_ARGS.shard_size,
+                                  audio_type=audio_type,
+                                  frame_index=CLI_ARGS.opus_frame_index,
+                                  labeled=labeled)
     elif extension == '.tar':
         writer = TarWriter(CLI_ARGS.target, labeled=labeled, gz=False, include=CLI_ARGS.include)
     elif extension == '.tgz' or CLI_ARGS.target.lower().endswith('.tar.gz'):
         writer = TarWriter(CLI_ARGS.target, labeled=labeled, gz=True, include=CLI_ARGS.include)
     else:
-        print('Unknown extension of target file - has to be either .csv, .sdb, .tar, .tar.gz or .tgz')
+        print('Unknown extension of target file - has to be either .csv, .sdb, .sdbm, .tar, .tar.gz or .tgz')
+        sys.exit(1)
+    if CLI_ARGS.chunk_size > 0 and extension != '.sdb':
+        print('Option --chunk-size is only supported for .sdb targets')
         sys.exit(1)
     with writer:
         samples = samples_from_sources(CLI_ARGS.sources, labeled=not CLI_ARGS.unlabeled)
@@ -55,10 +115,15 @@ def build_data_set():
         if augmentations:
             samples = apply_sample_augmentations(samples, audio_type=AUDIO_TYPE_PCM, augmentations=augmentations)
         bar = progressbar.ProgressBar(max_value=num_samples, widgets=SIMPLE_BAR)
+        if CLI_ARGS.chunk_size > 0:
+            build_chunked_sdb(writer, samples, audio_type, bar)
+            bar.finish()
+            return
         for sample in bar(change_audio_types(
                 samples,
                 audio_type=audio_type,
                 bitrate=CLI_ARGS.bitrate,
+                frame_index=CLI_ARGS.opus_frame_index,
                 processes=CLI_ARGS.workers)):
             writer.add(sample)
 
@@ -70,13 +135,13 @@ def handle_args():
     parser.add_argument(
         'sources',
         nargs='+',
-        help='Source CSV and/or SDB files - '
+        help='Source CSV, SDB, sharded SDB (.sdbm) and/or uncompressed TAR files - '
         'Note: For getting a correctly ordered target set, source SDBs have to have their samples '
         'already ordered from shortest to longest.',
     )
     parser.add_argument(
         'target',
-        help='SDB, CSV or TAR(.gz) file to create'
+        help='SDB, sharded SDB manifest (.sdbm), CSV or TAR(.gz) file to create'
     )
     parser.add_argument(
         '--audio-type',
@@ -89,6 +154,25 @@ def handle_args():
         type=int,
         help='Bitrate for lossy compressed SDB samples like in case of --audio-type opus',
     )
+    parser.add_argument(
+        '--opus-frame-index',
+        action='store_true',
+        help='If to add a frame index to encoded Opus samples (allows decoding time windows without decoding '
+        'preceding audio) in case of --audio-type opus - already Opus encoded source samples are copied as they are',
+    )
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        default=100000,
+        help='Number of samples per shard in case of a sharded SDB (.sdbm) target',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=0,
+        help='If > 0, workers write chunks of this number of samples into temporary SDB files '
+        'that get merged into the target SDB afterwards - only supported for .sdb targets',
+    )
     parser.add_argument(
         '--workers', type=int, default=None, help='Number of encoding SDB workers'
     )
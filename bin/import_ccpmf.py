@@ -31,6 +31,7 @@ import requests
 import json
 
 from deepspeech_training.util.downloader import SIMPLE_BAR, maybe_download
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.helpers import secs_to_hours
 from deepspeech_training.util.importers import (
     get_counter,
@@ -323,7 +324,7 @@ def one_sample(sample):
         subprocess.check_output(["ffmpeg", "-i", audio_source, "-ss", str(start_time), "-t", str(duration), "-c", "copy", wav_fullname], stdin=subprocess.DEVNULL, stderr=subprocess.STDOUT)
 
     file_size = os.path.getsize(wav_fullname)
-    frames = int(subprocess.check_output(["soxi", "-s", wav_fullname], stderr=subprocess.STDOUT))
+    frames = probe_num_frames(wav_fullname)[0]
 
     _counter = get_counter()
     _rows = []
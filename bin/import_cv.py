@@ -2,7 +2,6 @@
 import csv
 import os
 import sys
-import subprocess
 import tarfile
 from glob import glob
 from multiprocessing import Pool
@@ -11,6 +10,7 @@ import progressbar
 import sox
 
 from deepspeech_training.util.downloader import SIMPLE_BAR, maybe_download
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.importers import (
     get_counter,
     get_imported_samples,
@@ -65,17 +65,11 @@ def one_sample(sample):
     # Storing wav files next to the mp3 ones - just with a different suffix
     wav_filename = path.splitext(mp3_filename)[0] + ".wav"
     _maybe_convert_wav(mp3_filename, wav_filename)
-    frames = int(
-        subprocess.check_output(["soxi", "-s", wav_filename], stderr=subprocess.STDOUT)
-    )
     file_size = -1
+    frames = 0
     if os.path.exists(wav_filename):
         file_size = path.getsize(wav_filename)
-        frames = int(
-            subprocess.check_output(
-                ["soxi", "-s", wav_filename], stderr=subprocess.STDOUT
-            )
-        )
+        frames = probe_num_frames(wav_filename)[0]
     label = validate_label(sample[1])
     rows = []
     counter = get_counter()
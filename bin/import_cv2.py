@@ -8,7 +8,6 @@ Use "python3 import_cv2.py -h" for help
 """
 import csv
 import os
-import subprocess
 import unicodedata
 from multiprocessing import Pool
 
@@ -16,6 +15,7 @@ import progressbar
 import sox
 
 from deepspeech_training.util.downloader import SIMPLE_BAR
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.importers import (
     get_counter,
     get_imported_samples,
@@ -67,11 +67,7 @@ def one_sample(sample):
     frames = 0
     if os.path.exists(wav_filename):
         file_size = os.path.getsize(wav_filename)
-        frames = int(
-            subprocess.check_output(
-                ["soxi", "-s", wav_filename], stderr=subprocess.STDOUT
-            )
-        )
+        frames = probe_num_frames(wav_filename)[0]
     label = FILTER_OBJ.filter(sample[1])
     rows = []
     counter = get_counter()
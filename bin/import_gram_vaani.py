@@ -4,7 +4,6 @@ import csv
 import logging
 import math
 import os
-import subprocess
 import urllib
 from pathlib import Path
 
@@ -12,6 +11,7 @@ import pandas as pd
 from sox import Transformer
 
 import swifter
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.importers import get_importers_parser, get_validate_label
 
 __version__ = "0.1.0"
@@ -295,11 +295,7 @@ class GramVaaniDataSets:
             for wav_filename in self.raw.wav_filename
         ]
         wav_frames = [
-            int(
-                subprocess.check_output(
-                    ["soxi", "-s", wav_filepath], stderr=subprocess.STDOUT
-                )
-            )
+            probe_num_frames(wav_filepath)[0]
             for wav_filepath in wav_filepaths
         ]
         is_valid_raw_wav_frames = [
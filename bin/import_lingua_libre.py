@@ -3,7 +3,6 @@ import argparse
 import csv
 import os
 import re
-import subprocess
 import unicodedata
 import zipfile
 from glob import glob
@@ -13,6 +12,7 @@ import progressbar
 import sox
 
 from deepspeech_training.util.downloader import SIMPLE_BAR, maybe_download
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.importers import (
     get_counter,
     get_imported_samples,
@@ -67,11 +67,7 @@ def one_sample(sample):
     frames = 0
     if os.path.exists(wav_filename):
         file_size = os.path.getsize(wav_filename)
-        frames = int(
-            subprocess.check_output(
-                ["soxi", "-s", wav_filename], stderr=subprocess.STDOUT
-            )
-        )
+        frames = probe_num_frames(wav_filename)[0]
     label = label_filter(sample[1])
     rows = []
     counter = get_counter()
@@ -11,6 +11,7 @@ from multiprocessing import Pool
 import progressbar
 
 from deepspeech_training.util.downloader import SIMPLE_BAR, maybe_download
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.importers import (
     get_counter,
     get_imported_samples,
@@ -66,11 +67,7 @@ def one_sample(sample):
         )
         os.rename(tmp_filename, wav_filename)
         file_size = os.path.getsize(wav_filename)
-        frames = int(
-            subprocess.check_output(
-                ["soxi", "-s", wav_filename], stderr=subprocess.STDOUT
-            )
-        )
+        frames = probe_num_frames(wav_filename)[0]
     label = label_filter(sample[1])
     counter = get_counter()
     rows = []
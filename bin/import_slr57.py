@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import csv
 import os
-import subprocess
 import tarfile
 import unicodedata
 from glob import glob
@@ -10,6 +9,7 @@ from multiprocessing import Pool
 import progressbar
 
 from deepspeech_training.util.downloader import SIMPLE_BAR, maybe_download
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.importers import (
     get_counter,
     get_imported_samples,
@@ -60,11 +60,7 @@ def one_sample(sample):
     frames = 0
     if os.path.exists(wav_filename):
         file_size = os.path.getsize(wav_filename)
-        frames = int(
-            subprocess.check_output(
-                ["soxi", "-s", wav_filename], stderr=subprocess.STDOUT
-            )
-        )
+        frames = probe_num_frames(wav_filename)[0]
     label = label_filter(sample[1])
     counter = get_counter()
     rows = []
@@ -2,7 +2,6 @@
 import csv
 import os
 import re
-import subprocess
 import zipfile
 from multiprocessing import Pool
 
@@ -11,6 +10,7 @@ import sox
 
 import unidecode
 from deepspeech_training.util.downloader import SIMPLE_BAR, maybe_download
+from deepspeech_training.util.durations import probe_num_frames
 from deepspeech_training.util.importers import (
     get_counter,
     get_imported_samples,
@@ -67,11 +67,7 @@ def one_sample(sample):
     frames = 0
     if os.path.exists(wav_filename):
         file_size = os.path.getsize(wav_filename)
-        frames = int(
-            subprocess.check_output(
-                ["soxi", "-s", wav_filename], stderr=subprocess.STDOUT
-            )
-        )
+        frames = probe_num_frames(wav_filename)[0]
     label = sample["text"]
 
     rows = []
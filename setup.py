@@ -116,6 +116,10 @@ def main():
         packages=find_packages(where='training'),
         python_requires='>=3.5, <4',
         install_requires=install_requires,
+        extras_require={
+            # Reading Parquet and Arrow IPC sample collections
+            'arrow': ['pyarrow'],
+        },
         # If there are data files included in your packages that need to be
         # installed, specify them here.
         package_data={
@@ -0,0 +1,457 @@
+import io
+import os
+import pickle
+import wave
+import unittest
+from multiprocessing import Pool
+from unittest import mock
+
+import numpy as np
+import opuslib
+from deepspeech_training.util import audio as audio_module
+from deepspeech_training.util.audio import (
+    AUDIO_TYPE_NP,
+    AUDIO_TYPE_OPUS,
+    AUDIO_TYPE_PCM,
+    AUDIO_TYPE_WAV,
+    DEFAULT_FORMAT,
+    AudioFormat,
+    COMB_FILTER_MIN_WINDOW_DELAY,
+    OPUS_CHANNELS_SIZE,
+    OPUS_CHUNK_LEN_SIZE,
+    OPUS_HEADER_SIZE,
+    OPUS_PCM_LEN_SIZE,
+    OPUS_RATE_SIZE,
+    OPUS_WIDTH_SIZE,
+    OpusWindowReader,
+    PolyphaseResampler,
+    Sample,
+    SharedAudio,
+    SharedAudioSlots,
+    decode_opus,
+    feedback_comb_filter,
+    get_opus_encoder,
+    get_opus_frame_size,
+    opus_round_trip,
+    pack_number,
+    pcm_to_np,
+    read_opus,
+    read_opus_chunk_table,
+    read_frames,
+    read_opus_header,
+    resample,
+    shared_memory_available,
+    unpack_number,
+    vad_split,
+    vad_split_buffer,
+    write_opus,
+    write_wav
+)
+
+
+# Windows get decoded with a few pre-roll frames instead of the whole preceding signal.
+# The decoder state should have converged by then - but not necessarily to the last bit.
+WINDOW_TOLERANCE = 8
+
+
+def make_pcm(duration, audio_format=DEFAULT_FORMAT, seed=0):
+    rng = np.random.RandomState(seed)
+    num_values = int(duration * audio_format.rate) * audio_format.channels
+    return rng.randint(-2000, 2000, num_values).astype(np.int16).tobytes()
+
+
+def write_opus_to_buffer(pcm_data, audio_format=DEFAULT_FORMAT, frame_index=False):
+    opus_file = io.BytesIO()
+    write_opus(opus_file, pcm_data, audio_format=audio_format, frame_index=frame_index)
+    return opus_file
+
+
+def write_old_opus_to_buffer(pcm_data, audio_format=DEFAULT_FORMAT):
+    """Writes an Opus container the way it got written before frame indices got introduced"""
+    opus_file = io.BytesIO()
+    frame_size = get_opus_frame_size(audio_format.rate)
+    encoder = get_opus_encoder(audio_format.rate, audio_format.channels)
+    chunk_size = frame_size * audio_format.channels * audio_format.width
+    opus_file.write(pack_number(len(pcm_data), OPUS_PCM_LEN_SIZE))
+    opus_file.write(pack_number(audio_format.rate, OPUS_RATE_SIZE))
+    opus_file.write(pack_number(audio_format.channels, OPUS_CHANNELS_SIZE))
+    opus_file.write(pack_number(audio_format.width, OPUS_WIDTH_SIZE))
+    for i in range(0, len(pcm_data), chunk_size):
+        chunk = pcm_data[i:i + chunk_size]
+        if len(chunk) < chunk_size:
+            chunk = chunk + b'\0' * (chunk_size - len(chunk))
+        encoded = encoder.encode(chunk, frame_size)
+        opus_file.write(pack_number(len(encoded), OPUS_CHUNK_LEN_SIZE))
+        opus_file.write(encoded)
+    return opus_file
+
+
+def read_opus_by_decoder(opus_file):
+    """Former way of reading Opus containers (without frame index) through opuslib.Decoder.decode"""
+    pcm_buffer_size, audio_format = read_opus_header(opus_file)
+    frame_size = get_opus_frame_size(audio_format.rate)
+    decoder = opuslib.Decoder(audio_format.rate, audio_format.channels)
+    audio_data = bytearray()
+    while len(audio_data) < pcm_buffer_size:
+        chunk_len = unpack_number(opus_file.read(OPUS_CHUNK_LEN_SIZE))
+        chunk = opus_file.read(chunk_len)
+        audio_data.extend(decoder.decode(chunk, frame_size))
+    return bytes(audio_data[:pcm_buffer_size])
+
+
+class TestOpusDecoding(unittest.TestCase):
+
+    def test_matches_decoder(self):
+        for duration in [0.01, 0.06, 1.0, 1.23]:
+            opus_file = write_opus_to_buffer(make_pcm(duration))
+            expected = read_opus_by_decoder(opus_file)
+            audio_format, audio_data = read_opus(opus_file)
+            self.assertEqual(audio_format, DEFAULT_FORMAT)
+            self.assertEqual(audio_data, expected)
+
+    def test_empty(self):
+        audio_format, audio_data = decode_opus(write_opus_to_buffer(b''))
+        self.assertEqual(audio_format, DEFAULT_FORMAT)
+        self.assertEqual(len(audio_data), 0)
+
+    def test_decoding_error(self):
+        opus_file = write_opus_to_buffer(make_pcm(0.2))
+        with mock.patch.object(opuslib.api.libopus, 'opus_decode', return_value=-4):
+            with self.assertRaises(opuslib.exceptions.OpusError):
+                decode_opus(opus_file)
+
+    def test_round_trip_errors(self):
+        samples = np.frombuffer(make_pcm(0.2), dtype=np.int16).reshape((-1, 1))
+        for function in ['opus_encode', 'opus_decode']:
+            with mock.patch.object(opuslib.api.libopus, function, return_value=-1):
+                with self.assertRaises(opuslib.exceptions.OpusError):
+                    opus_round_trip(samples, DEFAULT_FORMAT.rate)
+
+    def test_header_size(self):
+        opus_file = write_opus_to_buffer(make_pcm(0.5))
+        pcm_buffer_size, _ = read_opus_header(opus_file)
+        self.assertEqual(opus_file.tell(), OPUS_HEADER_SIZE)
+        self.assertEqual(pcm_buffer_size, int(0.5 * DEFAULT_FORMAT.rate) * DEFAULT_FORMAT.width)
+
+
+class TestOpusFrameIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.pcm_data = make_pcm(1.3)
+        self.old_file = write_old_opus_to_buffer(self.pcm_data)
+        self.expected = read_opus_by_decoder(self.old_file)
+
+    def test_old_format(self):
+        self.assertEqual(write_opus_to_buffer(self.pcm_data).getvalue(), self.old_file.getvalue())
+        _, audio_data = read_opus(self.old_file)
+        self.assertEqual(audio_data, self.expected)
+
+    def test_round_trip(self):
+        for frame_index in [False, True]:
+            opus_file = write_opus_to_buffer(self.pcm_data, frame_index=frame_index)
+            audio_format, audio_data = read_opus(opus_file)
+            self.assertEqual(audio_format, DEFAULT_FORMAT)
+            self.assertEqual(audio_data, self.expected)
+
+    def test_chunk_table(self):
+        tables = [read_opus_chunk_table(write_opus_to_buffer(self.pcm_data, frame_index=frame_index))
+                  for frame_index in [False, True]]
+        np.testing.assert_array_equal(tables[0][1], tables[1][1])
+        num_frames = len(tables[0][0])
+        self.assertEqual(num_frames, int(np.ceil(1.3 / 0.06)))
+
+    def test_windows(self):
+        expected = np.frombuffer(self.expected, dtype=np.int16)
+        rate = DEFAULT_FORMAT.rate
+        for frame_index in [False, True]:
+            opus_file = write_opus_to_buffer(self.pcm_data, frame_index=frame_index)
+            chunk_table = read_opus_chunk_table(opus_file)
+            for start, end in [(0, 10), (5, 5), (959, 961), (3000, 9000), (20000, 30000), (20790, 20800)]:
+                for table in [None, chunk_table]:
+                    _, window = decode_opus(opus_file, start_time=start / rate, end_time=end / rate, chunk_table=table)
+                    self.assertEqual(len(window), len(expected[start:end]))
+                    np.testing.assert_allclose(window, expected[start:end], atol=WINDOW_TOLERANCE)
+
+    def test_window_reader(self):
+        expected = pcm_to_np(self.expected)
+        for frame_index in [False, True]:
+            reader = OpusWindowReader(write_opus_to_buffer(self.pcm_data, frame_index=frame_index))
+            self.assertEqual(len(reader), len(expected))
+            windows = []
+            while len(reader) > 0:
+                windows.append(reader.read(777))
+            self.assertEqual(len(windows[-1]), len(expected) % 777)
+            np.testing.assert_allclose(np.concatenate(windows), expected, atol=WINDOW_TOLERANCE / 2 ** 15)
+
+
+class TestSampleConversion(unittest.TestCase):
+
+    def setUp(self):
+        self.pcm_data = make_pcm(0.7)
+        self.np_data = pcm_to_np(self.pcm_data)
+
+    def wav_sample(self):
+        sample = Sample(AUDIO_TYPE_PCM, self.pcm_data, audio_format=DEFAULT_FORMAT)
+        sample.change_audio_type(AUDIO_TYPE_WAV)
+        return sample
+
+    def test_deferred(self):
+        sample = self.wav_sample()
+        with mock.patch('deepspeech_training.util.audio.read_wav_view') as read_wav_view:
+            sample.change_audio_type(AUDIO_TYPE_NP)
+            self.assertEqual(sample.audio_type, AUDIO_TYPE_NP)
+            self.assertAlmostEqual(sample.duration, 0.7)
+            read_wav_view.assert_not_called()
+        np.testing.assert_array_equal(sample.audio, self.np_data)
+
+    def test_chained_conversion_collapses(self):
+        sample = self.wav_sample()
+        with mock.patch('deepspeech_training.util.audio.read_audio') as read_audio, \
+                mock.patch('deepspeech_training.util.audio.read_wav_view',
+                           wraps=audio_module.read_wav_view) as read_wav_view:
+            sample.change_audio_type(AUDIO_TYPE_PCM)
+            sample.change_audio_type(AUDIO_TYPE_NP)
+            self.assertEqual(sample.audio_type, AUDIO_TYPE_NP)
+            np.testing.assert_array_equal(sample.audio, self.np_data)
+            read_audio.assert_not_called()  # no intermediate PCM decoding
+            read_wav_view.assert_called_once()
+        self.assertEqual(sample.audio_format, DEFAULT_FORMAT)
+
+    def test_conversion_back_to_source_type(self):
+        sample = self.wav_sample()
+        wav_file = sample.audio
+        sample.change_audio_type(AUDIO_TYPE_PCM)
+        sample.change_audio_type(AUDIO_TYPE_WAV)
+        self.assertEqual(sample.audio_type, AUDIO_TYPE_WAV)
+        self.assertIs(sample.audio, wav_file)
+
+    def test_change_of_pending_conversion(self):
+        sample = self.wav_sample()
+        sample.change_audio_type(AUDIO_TYPE_NP)
+        sample.change_audio_type(AUDIO_TYPE_PCM)
+        self.assertEqual(sample.audio_type, AUDIO_TYPE_PCM)
+        self.assertEqual(bytes(sample.audio), self.pcm_data)
+
+    def test_encoding_of_pending_conversion(self):
+        sample = self.wav_sample()
+        sample.change_audio_type(AUDIO_TYPE_NP)
+        sample.change_audio_type(AUDIO_TYPE_OPUS)
+        self.assertEqual(sample.audio_type, AUDIO_TYPE_OPUS)
+        sample.change_audio_type(AUDIO_TYPE_PCM)
+        self.assertEqual(len(sample.audio), len(self.pcm_data))
+
+    def test_replacing_pending_audio(self):
+        sample = self.wav_sample()
+        sample.change_audio_type(AUDIO_TYPE_NP)
+        sample.audio = self.np_data[:100]
+        self.assertEqual(sample.audio_type, AUDIO_TYPE_NP)
+        np.testing.assert_array_equal(sample.audio, self.np_data[:100])
+
+    def test_pickling(self):
+        for source_type in [AUDIO_TYPE_WAV, AUDIO_TYPE_OPUS]:
+            sample = Sample(AUDIO_TYPE_PCM, self.pcm_data, audio_format=DEFAULT_FORMAT, sample_id='test')
+            sample.change_audio_type(source_type)
+            sample.change_audio_type(AUDIO_TYPE_NP)
+            unpickled = pickle.loads(pickle.dumps(sample))
+            self.assertEqual(unpickled.audio_type, AUDIO_TYPE_NP)
+            self.assertEqual(unpickled.sample_id, 'test')
+            self.assertEqual(unpickled.audio_format, DEFAULT_FORMAT)
+            self.assertAlmostEqual(unpickled.duration, 0.7)
+            np.testing.assert_allclose(unpickled.audio, self.np_data, atol=1e-3)
+
+
+def sine(frequency, rate, duration, channels=1):
+    t = np.arange(int(duration * rate)) / rate
+    return np.stack([np.sin(2 * np.pi * frequency * (c + 1) * t) for c in range(channels)], axis=1).astype(np.float32)
+
+
+class TestResampling(unittest.TestCase):
+
+    rates = [(8000, 16000), (16000, 8000), (44100, 16000), (22050, 16000), (16000, 48000)]
+
+    def test_sine(self):
+        for src_rate, dst_rate in self.rates:
+            resampled = resample(sine(440, src_rate, 1.0), src_rate, dst_rate)
+            self.assertEqual(len(resampled), dst_rate)
+            expected = sine(440, dst_rate, 1.0)
+            # The filter needs full input windows - signal start and end are zero padded
+            edge = dst_rate // 100
+            np.testing.assert_allclose(resampled[edge:-edge], expected[edge:-edge], atol=2e-3)
+
+    def test_channels(self):
+        resampled = resample(sine(300, 16000, 0.5, channels=2), 16000, 8000)
+        self.assertEqual(resampled.shape, (4000, 2))
+        np.testing.assert_allclose(resampled[100:-100], sine(300, 8000, 0.5, channels=2)[100:-100], atol=2e-3)
+
+    def test_anti_aliasing(self):
+        # 6 kHz is above the Nyquist frequency of 8 kHz audio
+        resampled = resample(sine(6000, 16000, 1.0), 16000, 8000)
+        self.assertLess(np.sqrt(np.mean(resampled[100:-100] ** 2)), 1e-3)
+
+    def test_streaming(self):
+        rng = np.random.RandomState(0)
+        for src_rate, dst_rate in self.rates:
+            samples = sine(440, src_rate, 0.7)
+            expected = resample(samples, src_rate, dst_rate)
+            resampler = PolyphaseResampler(src_rate, dst_rate)
+            resampler.max_block_outputs = 100
+            blocks, position = [], 0
+            while position < len(samples):
+                block_size = rng.randint(0, 2000)
+                blocks.append(resampler.process(samples[position:position + block_size]))
+                position += block_size
+            blocks.append(resampler.process(samples[:0], final=True))
+            np.testing.assert_allclose(np.concatenate(blocks), expected, atol=1e-6)
+
+    def test_same_rate(self):
+        samples = sine(440, 16000, 0.1)
+        self.assertIs(resample(samples, 16000, 16000), samples)
+
+
+def comb_filter_by_loop(samples, delay, gain):
+    """Former per-sample implementation of the feedback comb filter"""
+    result = np.array(samples, dtype=np.float64)
+    for i in range(delay, len(result)):
+        result[i] += gain * result[i - delay]
+    return result
+
+
+class TestCombFilter(unittest.TestCase):
+
+    def test_matches_loop(self):
+        rng = np.random.RandomState(0)
+        samples = rng.uniform(-1.0, 1.0, (5000, 1)).astype(np.float32)
+        delays = [1, 16, 17, COMB_FILTER_MIN_WINDOW_DELAY - 1, COMB_FILTER_MIN_WINDOW_DELAY, 1000, 4999, 5000, 6000]
+        for delay in delays:
+            for gain in [0.0, 0.3, -0.5, 0.95]:
+                np.testing.assert_allclose(feedback_comb_filter(samples, delay, gain),
+                                           comb_filter_by_loop(samples, delay, gain),
+                                           atol=1e-9,
+                                           err_msg='delay {}, gain {}'.format(delay, gain))
+
+    def test_channels(self):
+        samples = np.random.RandomState(1).uniform(-1.0, 1.0, (3000, 2))
+        for delay in [20, 300]:
+            np.testing.assert_allclose(feedback_comb_filter(samples, delay, 0.5),
+                                       comb_filter_by_loop(samples, delay, 0.5),
+                                       atol=1e-9)
+
+    def test_keeps_input(self):
+        samples = np.ones((1000, 1), dtype=np.float64)
+        result = feedback_comb_filter(samples, 10, 0.5)
+        np.testing.assert_array_equal(samples, 1.0)
+        self.assertEqual(result.dtype, np.float64)
+
+
+SMOKE_TEST_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'smoke_test')
+
+
+class TestVADSplitting(unittest.TestCase):
+
+    def setUp(self):
+        self.recordings = []
+        for filename in ['LDC93S1_pcms16le_1_16000.wav', 'LDC93S1_pcms16le_1_8000.wav', 'new-home-in-the-stars-16k.wav']:
+            with wave.open(os.path.join(SMOKE_TEST_DIR, filename), 'rb') as wav_file:
+                audio_format = AudioFormat(wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth())
+                pcm_data = wav_file.readframes(wav_file.getnframes())
+            # Silence around and within the recording to get more than one segment
+            silence = bytes(audio_format.rate * audio_format.width)
+            self.recordings.append((audio_format, silence + pcm_data + silence + pcm_data + silence[:1000]))
+
+    def test_same_as_vad_split(self):
+        for audio_format, pcm_data in self.recordings:
+            for frame_duration_ms, num_padding_frames, aggressiveness in [(30, 10, 3), (20, 5, 1), (10, 20, 0)]:
+                wav_file = io.BytesIO()
+                write_wav(wav_file, pcm_data, audio_format=audio_format)
+                wav_file.seek(0)
+                with wave.open(wav_file, 'rb') as wav_reader:
+                    expected = list(vad_split(read_frames(wav_reader, frame_duration_ms=frame_duration_ms),
+                                              audio_format=audio_format,
+                                              num_padding_frames=num_padding_frames,
+                                              aggressiveness=aggressiveness))
+                segments = list(vad_split_buffer(pcm_data,
+                                                 audio_format=audio_format,
+                                                 frame_duration_ms=frame_duration_ms,
+                                                 num_padding_frames=num_padding_frames,
+                                                 aggressiveness=aggressiveness))
+                self.assertGreater(len(expected), 1)
+                self.assertEqual([(bytes(data), start, end) for data, start, end in segments], expected)
+
+    def test_invalid_frame_duration(self):
+        audio_format, pcm_data = self.recordings[0]
+        with self.assertRaises(ValueError):
+            list(vad_split_buffer(pcm_data, audio_format=audio_format, frame_duration_ms=25))
+
+
+def make_np_sample(duration):
+    audio = np.full((int(duration * DEFAULT_FORMAT.rate), 1), duration, dtype=np.float32)
+    return Sample(AUDIO_TYPE_NP, audio, audio_format=DEFAULT_FORMAT)
+
+
+def make_np_samples(durations):
+    return [make_np_sample(duration) for duration in durations]
+
+
+@unittest.skipUnless(shared_memory_available(), 'requires multiprocessing.shared_memory')
+class TestSharedAudioSlots(unittest.TestCase):
+
+    def setUp(self):
+        self.slot_size = int(DEFAULT_FORMAT.rate * np.dtype(np.float32).itemsize)  # one second of audio
+
+    def assertSample(self, sample, duration):
+        self.assertIsInstance(sample.audio, np.ndarray)
+        np.testing.assert_array_equal(sample.audio, make_np_sample(duration).audio)
+
+    def test_put_and_take(self):
+        with SharedAudioSlots(2, slot_size=self.slot_size) as slots:
+            slot = slots.free_slots.get()
+            fitting, too_long = make_np_sample(0.5), make_np_sample(1.5)
+            slot_and_samples = slots.put(slot, [fitting, too_long])
+            self.assertIsInstance(fitting.audio, SharedAudio)
+            self.assertIsInstance(too_long.audio, np.ndarray)
+            self.assertLess(len(pickle.dumps(fitting)), 1024)
+            samples = slots.take(pickle.loads(pickle.dumps(slot_and_samples)))
+            self.assertSample(samples[0], 0.5)
+            self.assertSample(samples[1], 1.5)
+            self.assertEqual(slots.free_slots.qsize(), 2)
+
+    def test_imap(self):
+        durations = [0.1, 0.5, 0.0, 1.5, 0.25, 1.0, 0.75]
+        with SharedAudioSlots(4, slot_size=self.slot_size) as slots:
+            pool = Pool(2)
+            samples = list(slots.imap(pool, make_np_sample, durations))
+            pool.close()
+            pool.join()
+            for sample, duration in zip(samples, durations):
+                self.assertSample(sample, duration)
+            # Exited workers must neither have unlinked the memory nor kept it from getting unlinked
+            name = slots.memory.name
+            from multiprocessing import shared_memory  # pylint: disable=import-outside-toplevel
+            shared_memory.SharedMemory(name=name).close()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_imap_lists(self):
+        batches = [[0.25, 0.5], [0.5, 0.75], [], [1.5]]
+        with SharedAudioSlots(3, slot_size=self.slot_size) as slots:
+            pool = Pool(2)
+            results = list(slots.imap(pool, make_np_samples, batches))
+            pool.close()
+            pool.join()
+        for samples, durations in zip(results, batches):
+            self.assertEqual(len(samples), len(durations))
+            for sample, duration in zip(samples, durations):
+                self.assertSample(sample, duration)
+
+    def test_disabled(self):
+        with SharedAudioSlots(4, slot_size=0) as slots:
+            self.assertIsNone(slots.memory)
+            pool = Pool(1)
+            samples = list(slots.imap(pool, make_np_sample, [0.5]))
+            pool.close()
+            pool.join()
+        self.assertSample(samples[0], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import os
+import queue
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from deepspeech_training.util.audio import (
+    AUDIO_TYPE_NP,
+    AUDIO_TYPE_OPUS,
+    AUDIO_TYPE_PCM,
+    AUDIO_TYPE_WAV,
+    DEFAULT_FORMAT,
+    Sample
+)
+from deepspeech_training.util.augmentations import (
+    Codec,
+    Overlay,
+    Volume,
+    get_overlay_bank_meta_path,
+    read_overlay_bank,
+    write_overlay_bank
+)
+from deepspeech_training.util.sample_collections import DirectSDBWriter
+
+
+def make_sample(duration, seed=0, audio_type=AUDIO_TYPE_NP):
+    rng = np.random.RandomState(seed)
+    audio = rng.uniform(-0.5, 0.5, (int(duration * DEFAULT_FORMAT.rate), 1)).astype(np.float32)
+    sample = Sample(AUDIO_TYPE_NP, audio, audio_format=DEFAULT_FORMAT)
+    sample.change_audio_type(audio_type)
+    return sample
+
+
+def decoded(sample):
+    sample.change_audio_type(AUDIO_TYPE_NP)
+    return sample.audio
+
+
+class TestOverlay(unittest.TestCase):
+
+    def overlay_from_queue(self, samples):
+        overlay = Overlay('unused')
+        overlay.queue = queue.Queue()
+        for sample in samples:
+            overlay.queue.put(sample)
+        return overlay
+
+    def test_layers_from_queue(self):
+        for audio_type in [AUDIO_TYPE_NP, AUDIO_TYPE_OPUS]:
+            samples = [make_sample(duration, seed=i, audio_type=audio_type) for i, duration in enumerate([0.5, 0.0, 2.0])]
+            expected = np.concatenate([decoded(make_sample(s.duration, seed=i, audio_type=audio_type))
+                                       for i, s in enumerate(samples)])
+            overlay = self.overlay_from_queue(samples)
+            layers = []
+            for duration in [0.3, 0.3, 1.9]:
+                layer = np.zeros((int(duration * DEFAULT_FORMAT.rate), 1), dtype=np.float32)
+                overlay._add_layer_from_queue(layer)  # pylint: disable=protected-access
+                layers.append(layer)
+            self.assertEqual(overlay.queue.qsize(), 0)
+            self.assertIsNone(overlay.current_sample)
+            np.testing.assert_allclose(np.concatenate(layers), expected, atol=1e-3)
+
+    def test_keeps_remainder(self):
+        overlay = self.overlay_from_queue([make_sample(1.0, audio_type=AUDIO_TYPE_OPUS)])
+        layer = np.zeros((int(0.25 * DEFAULT_FORMAT.rate), 1), dtype=np.float32)
+        overlay._add_layer_from_queue(layer)  # pylint: disable=protected-access
+        self.assertEqual(len(overlay.current_sample), int(0.75 * DEFAULT_FORMAT.rate))
+
+
+def make_speech_like_sample(duration, seed=0):
+    """Harmonics with a slowly changing amplitude - Opus encodes them well at low bitrates"""
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(duration * DEFAULT_FORMAT.rate)) / DEFAULT_FORMAT.rate
+    audio = sum(rng.uniform(0.05, 0.15) * np.sin(2 * np.pi * 150 * harmonic * t) for harmonic in range(1, 5))
+    audio = audio * (0.6 + 0.4 * np.sin(2 * np.pi * 2 * t))
+    return Sample(AUDIO_TYPE_NP, audio.astype(np.float32).reshape((-1, 1)), audio_format=DEFAULT_FORMAT)
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_matches_container_round_trip(self):
+        for duration in [0.01, 0.06, 1.0, 1.37]:
+            for bitrate in [3200, 16000]:
+                sample = make_speech_like_sample(duration)
+                Codec(bitrate=bitrate).apply(sample)
+                # Former implementation: encoding into the Opus container format and decoding it again
+                expected = make_speech_like_sample(duration)
+                expected.change_audio_type(AUDIO_TYPE_PCM)
+                expected.change_audio_type(AUDIO_TYPE_OPUS, bitrate=bitrate)
+                expected.change_audio_type(AUDIO_TYPE_NP)
+                self.assertEqual(sample.audio.dtype, np.float32)
+                self.assertEqual(sample.audio.shape, expected.audio.shape)
+                # np_to_pcm truncates, while Codec rounds - inputs can differ by one quantization step
+                np.testing.assert_allclose(sample.audio, expected.audio, atol=0.01)
+                self.assertLess(np.mean(np.abs(sample.audio - expected.audio)), 1e-3)
+
+
+class TestVolume(unittest.TestCase):
+
+    def make_samples(self, durations):
+        return [make_sample(duration, seed=i) for i, duration in enumerate(durations)]
+
+    def assertSameAsApply(self, durations, clocks, dbfs='-20:3'):
+        expected = self.make_samples(durations)
+        for sample, clock in zip(expected, clocks):
+            Volume(dbfs=dbfs).apply(sample, clock=clock)
+        samples = self.make_samples(durations)
+        Volume(dbfs=dbfs).apply_batch(samples, clocks)
+        for sample, expected_sample in zip(samples, expected):
+            self.assertEqual(sample.audio.shape, expected_sample.audio.shape)
+            self.assertEqual(sample.audio.dtype, expected_sample.audio.dtype)
+            np.testing.assert_allclose(sample.audio, expected_sample.audio, rtol=1e-5, atol=1e-7)
+
+    def test_batch_equals_apply(self):
+        self.assertSameAsApply([0.5, 0.1, 1.2, 0.3], [0.0, 0.3, 0.6, 1.0])
+
+    def test_batch_with_empty_samples(self):
+        self.assertSameAsApply([0.5, 0.0, 0.2], [0.1, 0.5, 0.9])
+
+    def test_batch_of_empty_samples(self):
+        self.assertSameAsApply([0.0, 0.0], [0.0, 1.0])
+
+    def test_batch_samples_own_their_data(self):
+        samples = self.make_samples([0.5, 0.1, 0.3])
+        Volume().apply_batch(samples, [0.0, 0.0, 0.0])
+        for i, sample in enumerate(samples):
+            self.assertIsNone(sample.audio.base)
+            for other in samples[i + 1:]:
+                self.assertFalse(np.shares_memory(sample.audio, other.audio))
+
+    def test_silence(self):
+        samples = [Sample(AUDIO_TYPE_NP, np.zeros((100, 1), dtype=np.float32), audio_format=DEFAULT_FORMAT)]
+        Volume().apply_batch(samples, [0.0])
+        np.testing.assert_array_equal(samples[0].audio, 0.0)
+
+
+class TestOverlayBank(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.bank_path = os.path.join(self.tmp_dir, 'noise.bank')
+        self.durations = [0.5, 0.25, 1.0]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_source(self, durations):
+        sdb_path = os.path.join(self.tmp_dir, 'noise.sdb')
+        with DirectSDBWriter(sdb_path, audio_type=AUDIO_TYPE_WAV, labeled=False) as writer:
+            for i, duration in enumerate(durations):
+                writer.add(make_sample(duration, seed=i))
+        return sdb_path
+
+    def expected_bank(self):
+        return np.concatenate([decoded(make_sample(duration, seed=i)) for i, duration in enumerate(self.durations)])
+
+    def test_write_and_read(self):
+        write_overlay_bank(self.write_source(self.durations), self.bank_path)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['noise.bank', 'noise.bank.json', 'noise.sdb'])
+        bank = read_overlay_bank(self.bank_path)
+        self.assertEqual(bank.dtype, np.float32)
+        np.testing.assert_allclose(bank, self.expected_bank(), atol=1e-4)
+
+    def test_layers_from_bank(self):
+        overlay = Overlay(self.write_source(self.durations), bank=self.bank_path)
+        overlay.start()
+        self.assertTrue(os.path.isfile(get_overlay_bank_meta_path(self.bank_path)))
+        expected = self.expected_bank()
+        repeated = np.concatenate([expected] * 3)
+        random.seed(0)
+        for duration in [0.1, 1.0, 2.0]:  # longer than the bank - wraps around
+            layer = np.zeros((int(duration * DEFAULT_FORMAT.rate), 1), dtype=np.float32)
+            overlay._add_layer_from_bank(layer)  # pylint: disable=protected-access
+            candidates = np.flatnonzero(np.abs(expected[:, 0] - layer[0, 0]) < 1e-4)
+            self.assertTrue(any(np.allclose(layer, repeated[offset:offset + len(layer)], atol=1e-4)
+                                for offset in candidates))
+        overlay.stop()
+
+    def test_empty_source(self):
+        with self.assertRaises(ValueError):
+            write_overlay_bank(self.write_source([]), self.bank_path)
+        self.assertEqual(os.listdir(self.tmp_dir), ['noise.sdb'])
+
+    def test_truncated_bank(self):
+        write_overlay_bank(self.write_source(self.durations), self.bank_path)
+        with open(self.bank_path, 'r+b') as bank_file:
+            bank_file.truncate(1000)
+        with self.assertRaises(ValueError):
+            read_overlay_bank(self.bank_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
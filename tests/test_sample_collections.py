@@ -0,0 +1,356 @@
+import gc
+import os
+import json
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from deepspeech_training.util.helpers import MEGABYTE
+from deepspeech_training.util.audio import AUDIO_TYPE_NP, AUDIO_TYPE_PCM, AUDIO_TYPE_WAV, DEFAULT_FORMAT
+from deepspeech_training.util.sample_collections import (
+    SDB,
+    MAGIC,
+    BIGINT_SIZE,
+    CachedSampleSet,
+    Concatenated,
+    DirectSDBWriter,
+    DurationBuckets,
+    DurationInterleaved,
+    LabeledSample,
+    SampleCache,
+    ShardedSDB,
+    ShardedSDBWriter,
+    Tar,
+    samples_from_source
+)
+
+
+def make_sample(duration, transcript, seed=0):
+    rng = np.random.RandomState(seed)
+    audio = rng.uniform(-0.5, 0.5, (int(duration * DEFAULT_FORMAT.rate), 1)).astype(np.float32)
+    return LabeledSample(AUDIO_TYPE_NP, audio, transcript, audio_format=DEFAULT_FORMAT)
+
+
+def write_legacy_sdb(sdb_filename, samples):
+    """Writes an SDB file in the format without index section"""
+    def big_int(n):
+        return n.to_bytes(BIGINT_SIZE, 'big')
+
+    def small_int(n):
+        return n.to_bytes(4, 'big')
+
+    schema = [{'content': 'speech', 'mime-type': AUDIO_TYPE_WAV},
+              {'content': 'transcript', 'mime-type': 'text/plain'}]
+    meta_data = json.dumps({'schema': schema}).encode()
+    entries = []
+    for sample in samples:
+        sample.change_audio_type(AUDIO_TYPE_WAV)
+        audio = sample.audio.getvalue()
+        transcript = sample.transcript.encode()
+        entry = b''.join([small_int(len(audio)), audio, small_int(len(transcript)), transcript])
+        entries.append(small_int(len(entry)) + entry)
+    with open(sdb_filename, 'wb') as sdb_file:
+        sdb_file.write(MAGIC)
+        sdb_file.write(big_int(len(meta_data)))
+        sdb_file.write(meta_data)
+        sample_chunk_len = BIGINT_SIZE + sum(map(len, entries))
+        sdb_file.write(big_int(sample_chunk_len))
+        sdb_file.write(big_int(len(entries)))
+        offsets = []
+        for entry in entries:
+            offsets.append(sdb_file.tell())
+            sdb_file.write(entry)
+        sdb_file.write(big_int(BIGINT_SIZE + len(offsets) * BIGINT_SIZE))
+        sdb_file.write(big_int(len(offsets)))
+        for offset in offsets:
+            sdb_file.write(big_int(offset))
+
+
+class TestSDBIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.durations = [0.5, 0.1, 0.3]
+        self.transcripts = ['five', 'one one', 'three three three']
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def samples(self):
+        return [make_sample(d, t, seed=i) for i, (d, t) in enumerate(zip(self.durations, self.transcripts))]
+
+    def write_sdb(self, name='test.sdb', samples=None):
+        sdb_filename = os.path.join(self.tmp_dir, name)
+        with DirectSDBWriter(sdb_filename, audio_type=AUDIO_TYPE_WAV) as writer:
+            for sample in self.samples() if samples is None else samples:
+                writer.add(sample)
+        return sdb_filename
+
+    def test_index_columns(self):
+        sdb = SDB(self.write_sdb())
+        np.testing.assert_allclose(sdb.durations, self.durations)
+        np.testing.assert_array_equal(sdb.transcript_lengths, [len(t) for t in self.transcripts])
+        sdb.close()
+
+    def test_index_reverse(self):
+        sdb = SDB(self.write_sdb(), reverse=True)
+        np.testing.assert_allclose(sdb.durations, self.durations[::-1])
+        self.assertEqual(sdb[0].transcript, self.transcripts[-1])
+        sdb.close()
+
+    def test_index_matches_samples(self):
+        sdb = SDB(self.write_sdb())
+        for sample, duration, transcript in zip(sdb, sdb.durations, self.transcripts):
+            self.assertAlmostEqual(sample.duration, duration, places=5)
+            self.assertEqual(sample.transcript, transcript)
+        sdb.close()
+
+    def test_mmap_reading(self):
+        sdb_filename = self.write_sdb()
+        sdb, mapped_sdb = SDB(sdb_filename), SDB(sdb_filename, use_mmap=True)
+        for sample, mapped_sample in zip(sdb, mapped_sdb):
+            sample.change_audio_type(AUDIO_TYPE_PCM)
+            mapped_sample.change_audio_type(AUDIO_TYPE_PCM)
+            self.assertEqual(bytes(sample.audio), bytes(mapped_sample.audio))
+        sdb.close()
+        mapped_sdb.close()
+
+    def test_legacy_sdb(self):
+        sdb_filename = os.path.join(self.tmp_dir, 'legacy.sdb')
+        write_legacy_sdb(sdb_filename, self.samples())
+        sdb = SDB(sdb_filename)
+        self.assertIsNone(sdb.durations)
+        self.assertIsNone(sdb.transcript_lengths)
+        self.assertEqual(len(sdb), len(self.durations))
+        self.assertEqual([s.transcript for s in sdb], self.transcripts)
+        np.testing.assert_allclose([s.duration for s in sdb], self.durations)
+        sdb.close()
+
+    def test_add_legacy_sdb(self):
+        legacy_filename = os.path.join(self.tmp_dir, 'legacy.sdb')
+        write_legacy_sdb(legacy_filename, self.samples())
+        sdb_filename = os.path.join(self.tmp_dir, 'combined.sdb')
+        with DirectSDBWriter(sdb_filename, audio_type=AUDIO_TYPE_WAV) as writer:
+            writer.add(make_sample(0.2, 'two'))
+            self.assertEqual(writer.add_sdb(legacy_filename), len(self.durations))
+        sdb = SDB(sdb_filename)
+        np.testing.assert_allclose(sdb.durations, [0.2] + self.durations)
+        self.assertEqual([s.transcript for s in sdb], ['two'] + self.transcripts)
+        sdb.close()
+
+
+@unittest.skipUnless(hasattr(sys, 'unraisablehook'), 'requires sys.unraisablehook (Python 3.8+)')
+class TestFailingConstruction(unittest.TestCase):
+    """Readers that fail in their constructors must not fail again when getting garbage collected"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assertOnlyRaises(self, exception_type, create):
+        with mock.patch.object(sys, 'unraisablehook') as unraisablehook:
+            with self.assertRaises(exception_type):
+                create()
+            gc.collect()
+        unraisablehook.assert_not_called()
+
+    def test_compressed_tar(self):
+        self.assertOnlyRaises(ValueError, lambda: Tar(os.path.join(self.tmp_dir, 'x.tgz')))
+        self.assertOnlyRaises(ValueError, lambda: Tar(os.path.join(self.tmp_dir, 'x.tar.gz')))
+
+    def test_missing_tar(self):
+        self.assertOnlyRaises(FileNotFoundError, lambda: Tar(os.path.join(self.tmp_dir, 'x.tar')))
+
+    def test_missing_sdb(self):
+        self.assertOnlyRaises(FileNotFoundError, lambda: SDB(os.path.join(self.tmp_dir, 'x.sdb')))
+
+    def test_invalid_sdb(self):
+        sdb_filename = os.path.join(self.tmp_dir, 'x.sdb')
+        with open(sdb_filename, 'wb') as sdb_file:
+            sdb_file.write(b'no sdb')
+        self.assertOnlyRaises(RuntimeError, lambda: SDB(sdb_filename))
+
+
+class TestShardedSDB(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manifest_filename = os.path.join(self.tmp_dir, 'test.sdbm')
+        self.durations = [0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4]
+        self.transcripts = ['sample {}'.format(i) for i in range(len(self.durations))]
+        with ShardedSDBWriter(self.manifest_filename, shard_size=3, audio_type=AUDIO_TYPE_WAV) as writer:
+            for i, (duration, transcript) in enumerate(zip(self.durations, self.transcripts)):
+                writer.add(make_sample(duration, transcript, seed=i))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_manifest(self):
+        with open(self.manifest_filename, 'r', encoding='utf8') as manifest_file:
+            shards = json.load(manifest_file)['shards']
+        self.assertEqual([shard['num-samples'] for shard in shards], [3, 3, 1])
+        self.assertEqual([shard['filename'] for shard in shards], ['test.00000.sdb', 'test.00001.sdb', 'test.00002.sdb'])
+        for shard, durations in zip(shards, [self.durations[0:3], self.durations[3:6], self.durations[6:]]):
+            self.assertAlmostEqual(shard['min-duration'], min(durations), places=5)
+            self.assertAlmostEqual(shard['max-duration'], max(durations), places=5)
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp_dir, shard['filename'])))
+
+    def test_read(self):
+        sharded = samples_from_source(self.manifest_filename)
+        self.assertIsInstance(sharded, ShardedSDB)
+        self.assertEqual(len(sharded), len(self.durations))
+        self.assertEqual([sharded[i].transcript for i in range(len(sharded))], self.transcripts)
+        np.testing.assert_allclose(sharded.durations, self.durations)
+        np.testing.assert_array_equal(sharded.transcript_lengths, list(map(len, self.transcripts)))
+        sharded.close()
+
+    def test_read_reverse(self):
+        sharded = ShardedSDB(self.manifest_filename, reverse=True)
+        self.assertEqual([s.transcript for s in sharded], self.transcripts[::-1])
+        np.testing.assert_allclose(sharded.durations, self.durations[::-1])
+        sharded.close()
+
+    def test_parallel_iteration(self):
+        for read_workers in [1, 2, 4]:
+            sharded = ShardedSDB(self.manifest_filename, read_workers=read_workers, read_ahead=1)
+            samples = list(sharded)
+            self.assertEqual([s.transcript for s in samples], self.transcripts)
+            np.testing.assert_allclose([s.duration for s in samples], self.durations)
+            sharded.close()
+
+    def test_stopped_iteration(self):
+        sharded = ShardedSDB(self.manifest_filename, read_workers=2, read_ahead=1)
+        samples = iter(sharded)
+        self.assertEqual(next(samples).transcript, self.transcripts[0])
+        samples.close()  # must not wait for blocked reader threads
+        self.assertEqual(next(iter(sharded)).transcript, self.transcripts[0])
+        sharded.close()
+
+
+class TestDurationInterleaved(unittest.TestCase):
+
+    class Collection:
+        def __init__(self, name, durations):
+            self.name = name
+            self.durations = np.array(durations)
+
+        def __getitem__(self, i):
+            return self.name, i
+
+        def __len__(self):
+            return len(self.durations)
+
+    def test_merges_sorted(self):
+        a = TestDurationInterleaved.Collection('a', [1.0, 2.0, 4.0])
+        b = TestDurationInterleaved.Collection('b', [2.0, 3.0])
+        interleaved = DurationInterleaved(a, b)
+        self.assertEqual([interleaved[i] for i in range(len(interleaved))],
+                         [('a', 0), ('a', 1), ('b', 0), ('b', 1), ('a', 2)])
+        np.testing.assert_array_equal(interleaved.durations, [1.0, 2.0, 2.0, 3.0, 4.0])
+
+    def test_merges_reverse(self):
+        a = TestDurationInterleaved.Collection('a', [4.0, 2.0])
+        b = TestDurationInterleaved.Collection('b', [3.0, 2.0, 1.0])
+        interleaved = DurationInterleaved(a, b, reverse=True)
+        self.assertEqual(list(interleaved), [('a', 0), ('b', 0), ('a', 1), ('b', 1), ('b', 2)])
+
+    def test_keeps_collection_order(self):
+        # Unsorted collections are merged (like util.helpers.Interleaved does) and not sorted globally
+        a = TestDurationInterleaved.Collection('a', [3.0, 1.0])
+        b = TestDurationInterleaved.Collection('b', [2.0])
+        self.assertEqual(list(DurationInterleaved(a, b)), [('b', 0), ('a', 0), ('a', 1)])
+
+
+class TestDurationBuckets(unittest.TestCase):
+
+    def test_reshuffles_within_buckets(self):
+        collection = TestDurationInterleaved.Collection('a', np.arange(12, dtype=np.float64))
+        buckets = DurationBuckets(collection, 2, 3, seed=1)
+        orders = [buckets.shuffle(seed).order.copy() for seed in range(3)]
+        for order in orders:
+            self.assertEqual(sorted(order.tolist()), list(range(12)))
+            for batch in order.reshape(-1, 2):
+                self.assertEqual(batch[0] // 4, batch[1] // 4)  # batches from one bucket
+        self.assertFalse(all(np.array_equal(orders[0], order) for order in orders[1:]))
+
+    def test_sizes_fallback(self):
+        class SizedCollection:
+            def __init__(self, sizes):
+                self.sizes = np.array(sizes)
+
+            def __getitem__(self, i):
+                return i
+
+            def __len__(self):
+                return len(self.sizes)
+        collection = Concatenated(SizedCollection([30, 10]), SizedCollection([20, 40]))
+        self.assertIsNone(collection.durations)
+        batches = DurationBuckets(collection, 2, 2, seed=0).order.reshape(-1, 2).tolist()
+        self.assertEqual(sorted(map(sorted, batches)), [[0, 3], [1, 2]])
+
+    def test_missing_durations(self):
+        collection = Concatenated(TestDurationInterleaved.Collection('a', [1.0]))
+        collection.durations = None
+        with self.assertRaises(ValueError):
+            DurationBuckets(collection, 1, 1)
+
+
+class TestCachedSampleSet(unittest.TestCase):
+
+    def make_set(self, name, durations):
+        samples = [make_sample(duration, name, seed=i) for i, duration in enumerate(durations)]
+        for i, sample in enumerate(samples):
+            sample.sample_id = '{}:{}'.format(name, i)
+        return samples
+
+    def run_pass(self, cached_set, samples):
+        if cached_set.is_cached():
+            return list(cached_set.get_samples()), True
+        return list(cached_set.cache(iter(samples), len(samples))), False
+
+    def test_sets_fitting_separately_but_not_together(self):
+        set_a, set_b = self.make_set('a', [0.5, 0.5]), self.make_set('b', [0.25, 0.5])
+        size_a, size_b = [sum(map(SampleCache.get_sample_size, samples)) for samples in [set_a, set_b]]
+        sample_cache = SampleCache(max(size_a, size_b) + min(size_a, size_b) // 2)
+        overflows = []
+        cached_a = CachedSampleSet(sample_cache, on_overflow=lambda: overflows.append('a'))
+        cached_b = CachedSampleSet(sample_cache, on_overflow=lambda: overflows.append('b'))
+        for epoch in range(3):
+            samples, from_cache = self.run_pass(cached_a, set_a)
+            self.assertEqual([s.sample_id for s in samples], ['a:0', 'a:1'])
+            self.assertEqual(from_cache, epoch > 0)
+            samples, from_cache = self.run_pass(cached_b, set_b)
+            self.assertEqual([s.sample_id for s in samples], ['b:0', 'b:1'])
+            self.assertFalse(from_cache)
+        self.assertEqual(overflows, ['b'])
+        self.assertFalse(cached_b.cacheable)
+        self.assertEqual(sample_cache.size, size_a)  # nothing of b occupies cache space
+
+    def test_sets_fitting_together(self):
+        set_a, set_b = self.make_set('a', [0.5, 0.25]), self.make_set('b', [0.25])
+        sample_cache = SampleCache(sum(map(SampleCache.get_sample_size, set_a + set_b)))
+        cached_a, cached_b = CachedSampleSet(sample_cache), CachedSampleSet(sample_cache)
+        for epoch in range(3):
+            self.assertEqual(self.run_pass(cached_a, set_a)[1], epoch > 0)
+            self.assertEqual(self.run_pass(cached_b, set_b)[1], epoch > 0)
+
+    def test_aborted_pass(self):
+        samples = self.make_set('a', [0.25, 0.25, 0.25])
+        sample_cache = SampleCache(10 * MEGABYTE)
+        cached_set = CachedSampleSet(sample_cache)
+        passing = cached_set.cache(iter(samples), len(samples))
+        next(passing)
+        passing.close()
+        self.assertFalse(cached_set.is_cached())
+        self.assertEqual(len(sample_cache), 0)
+        self.assertEqual(len(list(cached_set.cache(iter(samples), len(samples)))), 3)
+        self.assertTrue(cached_set.is_cached())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -54,7 +54,11 @@ def evaluate(test_csvs, create_model):
                                 batch_size=FLAGS.test_batch_size,
                                 train_phase=False,
                                 reverse=FLAGS.reverse_test,
-                                limit=FLAGS.limit_test) for csv in test_csvs]
+                                limit=FLAGS.limit_test,
+                                use_mmap=FLAGS.read_mmap,
+                                probe_durations=FLAGS.probe_durations,
+                                slot_size=FLAGS.sample_slot_size,
+                                audio_dtype=FLAGS.audio_dtype) for csv in test_csvs]
     iterator = tfv1.data.Iterator.from_structure(tfv1.data.get_output_types(test_sets[0]),
                                                  tfv1.data.get_output_shapes(test_sets[0]),
                                                  output_classes=tfv1.data.get_output_classes(test_sets[0]))
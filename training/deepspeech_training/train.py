@@ -36,6 +36,7 @@ from .util.flags import create_flags, FLAGS
 from .util.helpers import check_ctcdecoder_version, ExceptionBox
 from .util.logging import create_progressbar, log_debug, log_error, log_info, log_progress, log_warn
 from .util.io import open_remote, remove_remote, listdir_remote, is_remote_path, isdir_remote
+from .util.sample_collections import SampleCache
 
 check_ctcdecoder_version()
 
@@ -424,7 +425,15 @@ def train():
                                process_ahead=len(Config.available_devices) * FLAGS.train_batch_size * 2,
                                reverse=FLAGS.reverse_train,
                                limit=FLAGS.limit_train,
-                               buffering=FLAGS.read_buffer)
+                               buffering=FLAGS.read_buffer,
+                               use_mmap=FLAGS.read_mmap,
+                               probe_durations=FLAGS.probe_durations,
+                               buckets=FLAGS.train_buckets,
+                               slot_size=FLAGS.sample_slot_size,
+                               audio_dtype=FLAGS.audio_dtype,
+                               augmentation_batch_size=FLAGS.augmentation_batch_size,
+                               min_duration=FLAGS.train_min_duration or None,
+                               max_duration=FLAGS.train_max_duration or None)
 
     iterator = tfv1.data.Iterator.from_structure(tfv1.data.get_output_types(train_set),
                                                  tfv1.data.get_output_shapes(train_set),
@@ -433,6 +442,8 @@ def train():
     # Make initialization ops for switching between the two sets
     train_init_op = iterator.make_initializer(train_set)
 
+    sample_cache = SampleCache(FLAGS.dev_sample_cache) if FLAGS.dev_sample_cache > 0 else None
+
     if FLAGS.dev_files:
         dev_sources = FLAGS.dev_files.split(',')
         dev_sets = [create_dataset([source],
@@ -442,7 +453,12 @@ def train():
                                    process_ahead=len(Config.available_devices) * FLAGS.dev_batch_size * 2,
                                    reverse=FLAGS.reverse_dev,
                                    limit=FLAGS.limit_dev,
-                                   buffering=FLAGS.read_buffer) for source in dev_sources]
+                                   buffering=FLAGS.read_buffer,
+                                   use_mmap=FLAGS.read_mmap,
+                                   probe_durations=FLAGS.probe_durations,
+                                   sample_cache=sample_cache,
+                                   slot_size=FLAGS.sample_slot_size,
+                                   audio_dtype=FLAGS.audio_dtype) for source in dev_sources]
         dev_init_ops = [iterator.make_initializer(dev_set) for dev_set in dev_sets]
 
     if FLAGS.metrics_files:
@@ -454,7 +470,12 @@ def train():
                                        process_ahead=len(Config.available_devices) * FLAGS.dev_batch_size * 2,
                                        reverse=FLAGS.reverse_dev,
                                        limit=FLAGS.limit_dev,
-                                       buffering=FLAGS.read_buffer) for source in metrics_sources]
+                                       buffering=FLAGS.read_buffer,
+                                       use_mmap=FLAGS.read_mmap,
+                                       probe_durations=FLAGS.probe_durations,
+                                       sample_cache=sample_cache,
+                                       slot_size=FLAGS.sample_slot_size,
+                                       audio_dtype=FLAGS.audio_dtype) for source in metrics_sources]
         metrics_init_ops = [iterator.make_initializer(metrics_set) for metrics_set in metrics_sets]
 
     # Dropout
@@ -2,11 +2,16 @@ import os
 import io
 import wave
 import math
+import mmap
+import queue
+import struct
 import tempfile
 import collections
 import numpy as np
 
-from .helpers import LimitingPool
+from functools import lru_cache
+
+from .helpers import LimitingPool, MEGABYTE
 from collections import namedtuple
 from .io import open_remote, remove_remote, copy_remote, is_remote_path
 
@@ -22,6 +27,11 @@ AUDIO_TYPE_PCM = 'application/vnd.mozilla.pcm'
 AUDIO_TYPE_WAV = 'audio/wav'
 AUDIO_TYPE_OPUS = 'application/vnd.mozilla.opus'
 SERIALIZABLE_AUDIO_TYPES = [AUDIO_TYPE_WAV, AUDIO_TYPE_OPUS]
+
+AUDIO_DTYPE_FLOAT32 = 'float32'
+AUDIO_DTYPE_FLOAT16 = 'float16'
+AUDIO_DTYPE_INT16 = 'int16'
+AUDIO_DTYPES = [AUDIO_DTYPE_FLOAT32, AUDIO_DTYPE_FLOAT16, AUDIO_DTYPE_INT16]
 LOADABLE_AUDIO_EXTENSIONS = {'.wav': AUDIO_TYPE_WAV}
 
 OPUS_PCM_LEN_SIZE = 4
@@ -29,11 +39,129 @@ OPUS_RATE_SIZE = 4
 OPUS_CHANNELS_SIZE = 1
 OPUS_WIDTH_SIZE = 1
 OPUS_CHUNK_LEN_SIZE = 2
+OPUS_FRAME_COUNT_SIZE = 4
+OPUS_HEADER_SIZE = OPUS_PCM_LEN_SIZE + OPUS_RATE_SIZE + OPUS_CHANNELS_SIZE + OPUS_WIDTH_SIZE
+# Flag bit of the width byte - if set, a frame count and a table of all chunk lengths follow the header
+OPUS_FRAME_INDEX_FLAG = 0x80
+OPUS_CHUNK_LEN_DTYPE = '>u2'
+# Number of frames (60 ms each) to decode ahead of a window start to let the decoder converge
+OPUS_PREROLL_FRAMES = 2
+# OPUS_AUTO value of libopus' OPUS_SET_BITRATE request
+OPUS_BITRATE_AUTO = -1000
+
+WAV_RIFF_HEADER = struct.Struct('<4sI4s')
+WAV_CHUNK_HEADER = struct.Struct('<4sI')
+WAV_FMT_CHUNK = struct.Struct('<HHIIHH')
+
+# Enough for about 30 seconds of mono 16 kHz np.float32 audio
+DEFAULT_SLOT_SIZE = 2 * MEGABYTE
+
+# Shortest delay (in samples) for which `feedback_comb_filter` runs its recursion window by window
+COMB_FILTER_MIN_WINDOW_DELAY = 256
+
+
+_MAPPED_FILES = {}
+
+
+def get_mapped_file_view(path):
+    """Returns a read-only memoryview of a per-process memory-mapping of a local file.
+    Every file gets mapped only once per process and stays mapped till the process ends."""
+    view = _MAPPED_FILES.get(path)
+    if view is None:
+        with open(path, 'rb') as mapped_file:
+            view = _MAPPED_FILES[path] = memoryview(mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ))
+    return view
+
+
+def _open_mapped_file_range(path, offset, length):
+    view = get_mapped_file_view(path)
+    if offset + length > len(view):
+        raise ValueError('Range {}-{} exceeds mapped file "{}"'.format(offset, offset + length, path))
+    return MemoryViewIO(view[offset:offset + length], file_path=path, file_offset=offset)
+
+
+class MemoryViewIO(io.RawIOBase):
+    """
+    Read-only file-like wrapper around a buffer (e.g. a memoryview slice of a memory-mapped file).
+    Other than io.BytesIO it does not copy the wrapped data on construction.
+    When pickled (e.g. for passing it to another process), a wrapped range of a memory-mapped local file
+    (see file_path and file_offset) is only referenced by its location and gets mapped again on unpickling
+    (see `get_mapped_file_view`). Any other wrapped data gets copied into a bytes object.
+    """
+    def __init__(self, buffer, file_path=None, file_offset=0):
+        """
+        Parameters
+        ----------
+        buffer : bytes-like object
+            Data to wrap
+        file_path : str
+            Path of the local file that buffer is a memory-mapped range of (if so)
+        file_offset : int
+            Offset of buffer within the file at file_path
+        """
+        super().__init__()
+        self.view = memoryview(buffer).cast('B')
+        self.file_path = None if file_path is None else os.path.abspath(file_path)
+        self.file_offset = file_offset
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = len(self.view) + offset
+        else:
+            raise ValueError('Invalid whence: {}'.format(whence))
+        if position < 0:
+            raise ValueError('Negative seek position {}'.format(position))
+        self.position = position
+        return self.position
+
+    def read(self, size=-1):
+        end = len(self.view) if size is None or size < 0 else min(len(self.view), self.position + size)
+        data = self.view[self.position:end].tobytes() if end > self.position else b''
+        self.position = max(self.position, end)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def getbuffer(self):
+        return self.view
+
+    def getvalue(self):
+        return self.view.tobytes()
+
+    def close(self):
+        if not self.closed:
+            self.view.release()
+        super().close()
+
+    def __reduce__(self):
+        if self.file_path is not None:
+            return _open_mapped_file_range, (self.file_path, self.file_offset, len(self.view))
+        return self.__class__, (self.getvalue(),)
 
 
 class Sample:
     """
     Represents in-memory audio data of a certain (convertible) representation.
+    Decoding conversions (to util.audio.AUDIO_TYPE_PCM or util.audio.AUDIO_TYPE_NP) are recorded by
+    `change_audio_type` and only carried out on first access of `audio` or `audio_format` -
+    chained conversions like WAV to PCM to NP get collapsed into one.
 
     Attributes
     ----------
@@ -46,6 +174,8 @@ class Sample:
     duration : float
         Audio duration of the sample in seconds
     """
+    __slots__ = ('_audio_type', '_audio_format', '_audio', '_pending_audio_type', 'sample_id', 'duration')
+
     def __init__(self, audio_type, raw_data, audio_format=None, sample_id=None):
         """
         Parameters
@@ -57,36 +187,103 @@ class Sample:
                     wrapped by a custom container format (used in SDBs)
                 - util.audio.AUDIO_TYPE_WAV: Memory file representation (BytesIO) of a Wave file
                 - util.audio.AUDIO_TYPE_PCM: Binary representation (bytearray) of PCM encoded audio data (Wave file without header)
-                - util.audio.AUDIO_TYPE_NP: NumPy representation of audio data (np.float32) - typically used for GPU feeding
+                - util.audio.AUDIO_TYPE_NP: NumPy representation of audio data (np.float32) - typically used for GPU feeding.
+                    Training pipelines can shrink it to np.float16 or np.int16 for the transfer (see `np_to_dtype`).
         raw_data : binary
             Audio data in the form of the provided representation type (see audio_type).
             For types util.audio.AUDIO_TYPE_OPUS or util.audio.AUDIO_TYPE_WAV data can also be passed as a bytearray.
+            A memoryview (e.g. of a memory-mapped file) gets wrapped by util.audio.MemoryViewIO without copying it.
         audio_format : util.audio.AudioFormat
             Required in case of audio_type = util.audio.AUDIO_TYPE_PCM or util.audio.AUDIO_TYPE_NP,
             as this information cannot be derived from raw audio data.
         sample_id : str
             Tracking ID - should indicate sample's origin as precisely as possible
         """
-        self.audio_type = audio_type
-        self.audio_format = audio_format
+        self._audio_type = audio_type
+        self._audio_format = audio_format
+        self._pending_audio_type = None
         self.sample_id = sample_id
         if audio_type in SERIALIZABLE_AUDIO_TYPES:
-            self.audio = raw_data if isinstance(raw_data, io.BytesIO) else io.BytesIO(raw_data)
-            self.duration = read_duration(audio_type, self.audio)
+            if isinstance(raw_data, (io.BytesIO, MemoryViewIO)):
+                self._audio = raw_data
+            elif isinstance(raw_data, memoryview):
+                self._audio = MemoryViewIO(raw_data)
+            else:
+                self._audio = io.BytesIO(raw_data)
+            self.duration = read_duration(audio_type, self._audio)
         else:
-            self.audio = raw_data
-            if self.audio_format is None:
-                raise ValueError('For audio type "{}" parameter "audio_format" is mandatory'.format(self.audio_type))
+            self._audio = raw_data
+            if self._audio_format is None:
+                raise ValueError('For audio type "{}" parameter "audio_format" is mandatory'.format(self._audio_type))
             if audio_type == AUDIO_TYPE_PCM:
-                self.duration = get_pcm_duration(len(self.audio), self.audio_format)
+                self.duration = get_pcm_duration(len(self._audio), self._audio_format)
             elif audio_type == AUDIO_TYPE_NP:
-                self.duration = get_np_duration(len(self.audio), self.audio_format)
+                self.duration = get_np_duration(len(self._audio), self._audio_format)
             else:
-                raise ValueError('Unsupported audio type: {}'.format(self.audio_type))
+                raise ValueError('Unsupported audio type: {}'.format(self._audio_type))
+
+    @property
+    def audio_type(self):
+        return self._audio_type if self._pending_audio_type is None else self._pending_audio_type
+
+    @property
+    def audio(self):
+        self.apply_pending_conversion()
+        return self._audio
+
+    @audio.setter
+    def audio(self, audio):
+        # New data is in the representation the sample reports - a pending conversion is obsolete
+        if self._pending_audio_type is not None:
+            self._close_audio()
+            self._audio_type = self._pending_audio_type
+            self._pending_audio_type = None
+        self._audio = audio
+
+    @property
+    def audio_format(self):
+        self.apply_pending_conversion()
+        return self._audio_format
+
+    @audio_format.setter
+    def audio_format(self, audio_format):
+        self.apply_pending_conversion()
+        self._audio_format = audio_format
+
+    def _close_audio(self):
+        if self._audio_type in SERIALIZABLE_AUDIO_TYPES:
+            self._audio.close()
+
+    def apply_pending_conversion(self):
+        """Carries out a decoding conversion that got recorded by `change_audio_type`."""
+        new_audio_type = self._pending_audio_type
+        if new_audio_type is None:
+            return
+        self._pending_audio_type = None
+        if self._audio_type == AUDIO_TYPE_OPUS and new_audio_type == AUDIO_TYPE_NP:
+            self._audio_format, audio = decode_opus(self._audio)
+            self._audio.close()
+            audio = pcm_to_np(audio, self._audio_format)
+        elif self._audio_type == AUDIO_TYPE_WAV and new_audio_type == AUDIO_TYPE_NP:
+            self._audio_format, audio = read_wav_view(self._audio)
+            audio = pcm_to_np(audio, self._audio_format)
+            self._audio.close()
+        elif self._audio_type in SERIALIZABLE_AUDIO_TYPES:
+            self._audio_format, audio = read_audio(self._audio_type, self._audio)
+            self._audio.close()
+            if new_audio_type == AUDIO_TYPE_NP:
+                audio = pcm_to_np(audio, self._audio_format)
+        else:
+            audio = pcm_to_np(self._audio, self._audio_format)
+        self._audio = audio
+        self._audio_type = new_audio_type
 
-    def change_audio_type(self, new_audio_type, bitrate=None):
+    def change_audio_type(self, new_audio_type, bitrate=None, frame_index=False):
         """
-        In-place conversion of audio data into a different representation.
+        Conversion of audio data into a different representation.
+        Conversions into util.audio.AUDIO_TYPE_PCM or util.audio.AUDIO_TYPE_NP from other types than
+        util.audio.AUDIO_TYPE_NP are deferred till the audio data gets accessed.
+        Conversions into serializable types (encoding) are done immediately.
 
         Parameters
         ----------
@@ -94,43 +291,216 @@ class Sample:
             New audio-type - see `__init__`.
         bitrate : int
             Bitrate to use in case of converting to a lossy audio-type.
+        frame_index : bool
+            If to write a frame index in case of converting to util.audio.AUDIO_TYPE_OPUS (see `write_opus`).
         """
         if self.audio_type == new_audio_type:
             return
-        if new_audio_type == AUDIO_TYPE_PCM and self.audio_type in SERIALIZABLE_AUDIO_TYPES:
-            self.audio_format, audio = read_audio(self.audio_type, self.audio)
-            self.audio.close()
-            self.audio = audio
-        elif new_audio_type == AUDIO_TYPE_PCM and self.audio_type == AUDIO_TYPE_NP:
-            self.audio = np_to_pcm(self.audio, self.audio_format)
-        elif new_audio_type == AUDIO_TYPE_NP:
-            self.change_audio_type(AUDIO_TYPE_PCM)
-            self.audio = pcm_to_np(self.audio, self.audio_format)
+        if new_audio_type == self._audio_type:  # back to the original data of a pending conversion
+            self._pending_audio_type = None
+        elif new_audio_type in [AUDIO_TYPE_PCM, AUDIO_TYPE_NP] and self._audio_type != AUDIO_TYPE_NP:
+            self._pending_audio_type = new_audio_type
+        elif new_audio_type == AUDIO_TYPE_PCM:  # from AUDIO_TYPE_NP
+            self._audio = np_to_pcm(self._audio, self._audio_format)
+            self._audio_type = new_audio_type
         elif new_audio_type in SERIALIZABLE_AUDIO_TYPES:
             self.change_audio_type(AUDIO_TYPE_PCM)
+            self.apply_pending_conversion()
             audio_bytes = io.BytesIO()
-            write_audio(new_audio_type, audio_bytes, self.audio, audio_format=self.audio_format, bitrate=bitrate)
+            write_audio(new_audio_type, audio_bytes, self._audio, audio_format=self._audio_format, bitrate=bitrate,
+                        frame_index=frame_index)
             audio_bytes.seek(0)
-            self.audio = audio_bytes
+            self._audio = audio_bytes
+            self._audio_type = new_audio_type
         else:
             raise RuntimeError('Changing audio representation type from "{}" to "{}" not supported'
                                .format(self.audio_type, new_audio_type))
-        self.audio_type = new_audio_type
+
+    def __getstate__(self):
+        # Conversions are meant to happen where they got requested (e.g. in worker processes)
+        self.apply_pending_conversion()
+        return {slot: getattr(self, slot) for cls in type(self).__mro__ for slot in getattr(cls, '__slots__', ())}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
 
 
 def _unpack_and_change_audio_type(sample_and_audio_type):
-    packed_sample, audio_type, bitrate = sample_and_audio_type
+    packed_sample, audio_type, bitrate, frame_index = sample_and_audio_type
     if hasattr(packed_sample, 'unpack'):
         sample = packed_sample.unpack()
     else:
         sample = packed_sample
-    sample.change_audio_type(audio_type, bitrate=bitrate)
+    sample.change_audio_type(audio_type, bitrate=bitrate, frame_index=frame_index)
     return sample
 
 
-def change_audio_types(packed_samples, audio_type=AUDIO_TYPE_PCM, bitrate=None, processes=None, process_ahead=None):
-    with LimitingPool(processes=processes, process_ahead=process_ahead) as pool:
-        yield from pool.imap(_unpack_and_change_audio_type, map(lambda s: (s, audio_type, bitrate), packed_samples))
+def change_audio_types(packed_samples,
+                       audio_type=AUDIO_TYPE_PCM,
+                       bitrate=None,
+                       frame_index=False,
+                       processes=None,
+                       process_ahead=None,
+                       slot_size=0):
+    process_ahead = os.cpu_count() if process_ahead is None else process_ahead
+    with SharedAudioSlots(process_ahead + 2, slot_size=slot_size) as slots, \
+            LimitingPool(processes=processes, process_ahead=process_ahead) as pool:
+        yield from slots.imap(pool,
+                              _unpack_and_change_audio_type,
+                              map(lambda s: (s, audio_type, bitrate, frame_index), packed_samples))
+
+
+SharedAudio = namedtuple('SharedAudio', 'slot shape dtype offset')
+
+_ATTACHED_SHARED_MEMORIES = {}
+
+
+def _close_attached_shared_memories():
+    for memory in _ATTACHED_SHARED_MEMORIES.values():
+        try:
+            memory.close()
+        except BufferError:  # still referenced by a sample that got not taken out of its slot
+            pass
+    _ATTACHED_SHARED_MEMORIES.clear()
+
+
+def _attach_shared_memory(name):
+    """Attaches to shared memory that got created by another process, without taking over its clean-up."""
+    from multiprocessing import shared_memory, resource_tracker  # pylint: disable=import-outside-toplevel
+    if not _ATTACHED_SHARED_MEMORIES:
+        # Runs when pool workers exit regularly (as well as at exit of the main process)
+        from multiprocessing.util import Finalize  # pylint: disable=import-outside-toplevel
+        Finalize(None, _close_attached_shared_memories, exitpriority=0)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # Processes started by multiprocessing use the resource tracker of their parent process,
+    # which keeps a set of names - a process with its own tracker has to unregister the attachment,
+    # as its tracker would otherwise unlink the memory as soon as the process exits.
+    own_tracker = resource_tracker._resource_tracker._fd is None  # pylint: disable=protected-access
+    memory = shared_memory.SharedMemory(name=name)
+    if own_tracker:
+        resource_tracker.unregister(memory._name, 'shared_memory')  # pylint: disable=protected-access
+    return memory
+
+
+def _apply_with_shared_slot(fun_slots_slot_arg):
+    fun, slots, slot, arg = fun_slots_slot_arg
+    return slots.put(slot, fun(arg))
+
+
+def shared_memory_available():
+    """Returns if multiprocessing.shared_memory (Python 3.8+) is available for `SharedAudioSlots`."""
+    try:
+        from multiprocessing import shared_memory  # pylint: disable=import-outside-toplevel,unused-import
+        return True
+    except ImportError:
+        return False
+
+
+class SharedAudioSlots:
+    """
+    Fixed number of equally sized slots of shared memory for passing NumPy audio data of samples
+    from pool workers back to the parent process. Only small util.audio.SharedAudio descriptors get pickled
+    instead of the audio data itself. Samples of other audio types or with audio data not fitting into a slot
+    (as well as all samples, if multiprocessing.shared_memory is not available - see `shared_memory_available`)
+    get pickled as usual. Slots should be created before the pool, so that only the creating process takes care of
+    unlinking the shared memory. Workers close their attachments when they exit.
+    """
+    def __init__(self, num_slots, slot_size=DEFAULT_SLOT_SIZE):
+        """
+        Parameters
+        ----------
+        num_slots : int
+            Number of slots - should exceed the maximum number of samples in flight by two to never block dispatching
+        slot_size : int
+            Size of a slot in bytes - 0 disables the shared memory transport
+        """
+        self.slot_size = slot_size
+        self.memory = None
+        self.free_slots = None
+        if slot_size > 0 and num_slots > 0 and shared_memory_available():
+            from multiprocessing import shared_memory  # pylint: disable=import-outside-toplevel
+            self.memory = shared_memory.SharedMemory(create=True, size=num_slots * slot_size)
+            self.free_slots = queue.Queue()
+            for slot in range(num_slots):
+                self.free_slots.put(slot)
+
+    def __enter__(self):
+        return self
+
+    def __getstate__(self):
+        return self.memory.name, self.slot_size
+
+    def __setstate__(self, state):
+        name, self.slot_size = state
+        if name not in _ATTACHED_SHARED_MEMORIES:
+            _ATTACHED_SHARED_MEMORIES[name] = _attach_shared_memory(name)
+        self.memory = _ATTACHED_SHARED_MEMORIES[name]
+        self.free_slots = None
+
+    def get_slot_array(self, slot, shape, dtype, offset=0):
+        return np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=slot * self.slot_size + offset)
+
+    def put(self, slot, samples):
+        """Worker side: Moves the NumPy audio data of a sample (or of a list of samples) into a slot, if it fits."""
+        offset = 0
+        for sample in samples if isinstance(samples, list) else [samples]:
+            if sample.audio_type != AUDIO_TYPE_NP or offset + sample.audio.nbytes > self.slot_size:
+                continue
+            audio = sample.audio
+            self.get_slot_array(slot, audio.shape, audio.dtype, offset=offset)[...] = audio
+            sample.audio = SharedAudio(slot, audio.shape, audio.dtype.str, offset)
+            offset += -(-audio.nbytes // 8) * 8  # keeping following arrays aligned
+        return slot, samples
+
+    def take(self, slot_and_samples):
+        """Parent side: Copies the audio data of a sample (or of a list of samples) out of its slot
+        and frees the slot."""
+        slot, samples = slot_and_samples
+        for sample in samples if isinstance(samples, list) else [samples]:
+            shared_audio = sample.audio
+            if isinstance(shared_audio, SharedAudio):
+                sample.audio = np.array(self.get_slot_array(slot, shared_audio.shape, shared_audio.dtype,
+                                                            offset=shared_audio.offset))
+        self.free_slots.put(slot)
+        return samples
+
+    def imap(self, pool, fun, it):
+        """
+        Like pool.imap(fun, it), but with sample results passed through the slots.
+
+        Parameters
+        ----------
+        pool : util.helpers.LimitingPool or multiprocessing.Pool
+            Pool to run fun in
+        fun : callable
+            Picklable function that returns a util.audio.Sample (or a list of them) for an element of it
+        it : iterable
+            Arguments to map fun on
+        """
+        if self.memory is None:
+            yield from pool.imap(fun, it)
+            return
+
+        def with_slots():
+            for arg in it:
+                # Blocks till the consumer got a previous result out of its slot
+                yield fun, self, self.free_slots.get(), arg
+        for slot_and_sample in pool.imap(_apply_with_shared_slot, with_slots()):
+            yield self.take(slot_and_sample)
+
+    def close(self):
+        if self.memory is None or self.free_slots is None:
+            return
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 def get_audio_type_from_extension(ext):
@@ -157,7 +527,295 @@ def get_np_duration(np_len, audio_format=DEFAULT_FORMAT):
     return np_len / audio_format.rate
 
 
+def pcm_to_float(pcm_data, width, channels):
+    """Converts interleaved PCM data of any sample width (1 to 4 bytes) into
+    a np.float32 array of shape (samples, channels) with values from -1.0 to 1.0."""
+    data = np.frombuffer(pcm_data, dtype=np.uint8)
+    data = data[:len(data) - len(data) % (width * channels)]
+    if width == 1:  # 8 bit WAV samples are unsigned
+        samples = data.astype(np.float32) - 128.0
+    elif width == 3:
+        data = data.reshape((-1, 3)).astype(np.int32)
+        samples = ((data[:, 0] << 8) | (data[:, 1] << 16) | (data[:, 2] << 24)).astype(np.float32) / 256.0
+    elif width in [2, 4]:
+        samples = data.view('<i{}'.format(width)).astype(np.float32)
+    else:
+        raise ValueError('Unsupported sample width: {}'.format(width))
+    samples /= float(1 << (width * 8 - 1))
+    return samples.reshape((-1, channels))
+
+
+def float_to_pcm(samples, width):
+    """Converts np.float32 audio of shape (samples, channels) into interleaved PCM data of the given sample width."""
+    scale = float(1 << (width * 8 - 1))
+    samples = np.clip(np.rint(samples.reshape(-1) * scale), -scale, scale - 1)
+    if width == 1:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if width == 3:
+        return samples.astype('<i4').view(np.uint8).reshape((-1, 4))[:, :3].tobytes()
+    if width in [2, 4]:
+        return samples.astype('<i{}'.format(width)).tobytes()
+    raise ValueError('Unsupported sample width: {}'.format(width))
+
+
+@lru_cache(maxsize=256)
+def get_resampling_filter(up, down, zero_crossings=16, beta=8.6):
+    """
+    Designs a Kaiser windowed sinc low-pass filter for resampling by up/down and
+    splits it into its up polyphase components.
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, int)
+        Filter matrix of shape (up, taps per phase) - already scaled by up - and the filter delay
+    """
+    factor = max(up, down)
+    num_taps = 2 * zero_crossings * factor + 1
+    cutoff = 0.5 / factor
+    t = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(num_taps, beta) * up
+    taps_per_phase = int(math.ceil(num_taps / up))
+    taps = np.pad(taps, (0, taps_per_phase * up - num_taps), mode='constant')
+    filter_matrix = taps.reshape((taps_per_phase, up)).T.astype(np.float32)
+    filter_matrix.setflags(write=False)
+    return filter_matrix, (num_taps - 1) // 2
+
+
+class PolyphaseResampler:
+    """
+    Streaming polyphase resampler for np.float32 audio of shape (samples, channels).
+    All outputs of a block get computed in one vectorized gather and multiply-accumulate step.
+    """
+    # Maximum number of outputs to compute at once - limits the size of the gathered input windows
+    max_block_outputs = 8192
+
+    def __init__(self, src_rate, dst_rate, channels=1):
+        divisor = math.gcd(src_rate, dst_rate)
+        self.up = dst_rate // divisor
+        self.down = src_rate // divisor
+        self.channels = channels
+        self.filter, self.delay = get_resampling_filter(self.up, self.down)
+        self.taps_per_phase = self.filter.shape[1]
+        self.reversed_filter = np.ascontiguousarray(self.filter[:, ::-1])
+        self.inputs = np.zeros((0, channels), dtype=np.float32)
+        self.inputs_start = 0  # global index of first element in self.inputs
+        self.num_inputs = 0
+        self.num_outputs = 0
+
+    def process(self, samples, final=False):
+        """
+        Feeds a block of input samples and returns all output samples computable so far.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray
+            Input samples of shape (samples, channels)
+        final : bool
+            If this is the last block - the signal is then considered to be zero after it
+
+        Returns
+        -------
+        numpy.ndarray
+            Resampled output samples of shape (samples, channels)
+        """
+        self.inputs = np.concatenate([self.inputs, samples.astype(np.float32, copy=False)])
+        self.num_inputs += len(samples)
+        if final:
+            end = int(math.ceil(self.num_inputs * self.up / self.down))
+        else:
+            # Outputs that only depend on inputs received so far
+            end = (self.num_inputs * self.up - 1 - self.delay) // self.down + 1
+        end = max(end, self.num_outputs)
+        outputs = [self._compute(start, min(end, start + self.max_block_outputs))
+                   for start in range(self.num_outputs, end, self.max_block_outputs)]
+        self.num_outputs = end
+        keep_from = (self.num_outputs * self.down + self.delay) // self.up - self.taps_per_phase + 1
+        keep_from = min(keep_from, self.inputs_start + len(self.inputs))
+        if keep_from > self.inputs_start:
+            self.inputs = self.inputs[keep_from - self.inputs_start:]
+            self.inputs_start = keep_from
+        if len(outputs) == 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return np.concatenate(outputs)
+
+    def _compute(self, start, end):
+        positions = np.arange(start, end, dtype=np.int64) * self.down + self.delay
+        newest = positions // self.up
+        # Zero padding for inputs before the signal start or after its (final) end
+        pad_end = max(0, int(newest[-1]) + 1 - (self.inputs_start + len(self.inputs)))
+        padded = np.pad(self.inputs, ((self.taps_per_phase, pad_end), (0, 0)), mode='constant')
+        row_stride, channel_stride = padded.strides
+        # View of all input windows - gathering whole (contiguous) windows is cheaper than gathering single inputs
+        windows = np.lib.stride_tricks.as_strided(padded,
+                                                  shape=(len(padded) - self.taps_per_phase + 1,
+                                                         self.taps_per_phase,
+                                                         self.channels),
+                                                  strides=(row_stride, row_stride, channel_stride),
+                                                  writeable=False)
+        return np.einsum('ktc,kt->kc',
+                         windows[newest + 1 - self.inputs_start],
+                         self.reversed_filter[positions % self.up])
+
+
+def feedback_comb_filter(samples, delay, gain, min_gain=1e-12):
+    """
+    Applies the IIR (feedback) comb filter y[i] = x[i] + gain * y[i - delay] along the first axis.
+    For long delays the recursion runs window by window, as each step then processes a large slice.
+    For short delays (where this would take many tiny steps) its closed form y[i] = sum(gain ** k * x[i - k * delay])
+    gets computed by repeated doubling of the echo distance, which takes only about log2(len(samples) / delay)
+    vectorized steps over the whole signal.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray
+        Signal with samples along the first axis
+    delay : int
+        Delay in samples
+    gain : float
+        Feedback gain
+    min_gain : float
+        Echoes below this (absolute) gain are dropped when computing the closed form
+
+    Returns
+    -------
+    numpy.ndarray
+        Filtered signal as np.float64 array
+    """
+    result = np.array(samples, dtype=np.float64)
+    if delay >= COMB_FILTER_MIN_WINDOW_DELAY:
+        for start in range(delay, len(result), delay):
+            width = min(delay, len(result) - start)  # last window could be smaller
+            result[start:start + width] += gain * result[start - delay:start - delay + width]
+        return result
+    echoes = np.empty_like(result)
+    shift, shift_gain = delay, gain
+    while shift < len(result) and abs(shift_gain) >= min_gain:
+        np.multiply(result[:-shift], shift_gain, out=echoes[shift:])
+        result[shift:] += echoes[shift:]
+        shift, shift_gain = 2 * shift, shift_gain * shift_gain
+    return result
+
+
+def resample(samples, src_rate, dst_rate):
+    """Resamples np.float32 audio of shape (samples, channels) in one go."""
+    if src_rate == dst_rate:
+        return samples
+    return PolyphaseResampler(src_rate, dst_rate, channels=samples.shape[1]).process(samples, final=True)
+
+
+class WavConverter:
+    """
+    In-process converter of the sample rate, number of channels and sample width of a WAV file's PCM data.
+    Implements the reading methods of wave.Wave_read that are used by `read_frames`
+    and streams through the source file.
+    """
+    block_duration = 1.0
+
+    def __init__(self, wav_reader, audio_format=DEFAULT_FORMAT):
+        """
+        Parameters
+        ----------
+        wav_reader : wave.Wave_read
+            Source reader
+        audio_format : util.audio.AudioFormat
+            Target format
+        """
+        self.wav_reader = wav_reader
+        self.src_format = read_audio_format_from_wav_file(wav_reader)
+        self.audio_format = audio_format
+        if not WavConverter.supports(self.src_format, audio_format):
+            raise ValueError('Unsupported conversion from {} to {}'.format(self.src_format, audio_format))
+        self.resampler = None
+        if self.src_format.rate != audio_format.rate:
+            self.resampler = PolyphaseResampler(self.src_format.rate, audio_format.rate, channels=audio_format.channels)
+        self.remaining_inputs = wav_reader.getnframes()
+        self.finished = self.remaining_inputs == 0
+        self.nframes = int(math.ceil(self.remaining_inputs * audio_format.rate / self.src_format.rate))
+        self.outputs = np.zeros((0, audio_format.channels), dtype=np.float32)
+
+    @staticmethod
+    def supports(src_format, dst_format):
+        widths = [1, 2, 3, 4]
+        return src_format.width in widths and dst_format.width in widths and \
+            (src_format.channels == dst_format.channels or 1 in [src_format.channels, dst_format.channels])
+
+    def getframerate(self):
+        return self.audio_format.rate
+
+    def getnchannels(self):
+        return self.audio_format.channels
+
+    def getsampwidth(self):
+        return self.audio_format.width
+
+    def getnframes(self):
+        return self.nframes
+
+    def _read_block(self):
+        num_frames = min(self.remaining_inputs, max(1, int(self.block_duration * self.src_format.rate)))
+        data = self.wav_reader.readframes(num_frames)
+        samples = pcm_to_float(data, self.src_format.width, self.src_format.channels)
+        self.remaining_inputs = 0 if len(samples) == 0 else self.remaining_inputs - len(samples)
+        if self.src_format.channels != self.audio_format.channels:
+            if self.audio_format.channels == 1:
+                samples = np.mean(samples, axis=1, keepdims=True)
+            else:
+                samples = np.repeat(samples, self.audio_format.channels, axis=1)
+        self.finished = self.remaining_inputs == 0
+        if self.resampler is not None:
+            samples = self.resampler.process(samples, final=self.finished)
+        return samples
+
+    def readframes(self, n):
+        while len(self.outputs) < n and not self.finished:
+            self.outputs = np.concatenate([self.outputs, self._read_block()])
+        frames, self.outputs = self.outputs[:n], self.outputs[n:]
+        return float_to_pcm(frames, self.audio_format.width)
+
+    def close(self):
+        self.wav_reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_wav_converter(wav_file, audio_format=DEFAULT_FORMAT):
+    """Opens a WAV file for in-process conversion into audio_format.
+    Returns None if the file is no supported PCM WAV file."""
+    try:
+        wav_reader = wave.open(wav_file, 'rb')
+    except (wave.Error, EOFError):
+        return None
+    if not WavConverter.supports(read_audio_format_from_wav_file(wav_reader), audio_format):
+        wav_reader.close()
+        return None
+    return WavConverter(wav_reader, audio_format=audio_format)
+
+
+def write_wav_frames(wav_file, wav_reader, block_frames=64 * 1024):
+    """Streams all frames of a (converting) WAV reader into a new WAV file."""
+    with wave.open(wav_file, 'wb') as wav_file_writer:
+        wav_file_writer.setframerate(wav_reader.getframerate())
+        wav_file_writer.setnchannels(wav_reader.getnchannels())
+        wav_file_writer.setsampwidth(wav_reader.getsampwidth())
+        while True:
+            data = wav_reader.readframes(block_frames)
+            if len(data) == 0:
+                break
+            wav_file_writer.writeframes(data)
+
+
 def convert_audio(src_audio_path, dst_audio_path, file_type=None, audio_format=DEFAULT_FORMAT):
+    if src_audio_path.endswith('.wav') and file_type in [None, 'wav'] and dst_audio_path.endswith('.wav'):
+        with open_remote(src_audio_path, 'rb') as src_file:
+            converter = open_wav_converter(src_file, audio_format=audio_format)
+            if converter is not None:
+                with converter, open_remote(dst_audio_path, 'wb') as dst_file:
+                    write_wav_frames(dst_file, converter)
+                return
     import sox
     transformer = sox.Transformer()
     transformer.set_output_format(file_type=file_type,
@@ -181,20 +839,32 @@ class AudioFile:
         if self.audio_path.endswith('.wav'):
             self.open_file = open_remote(self.audio_path, 'rb')
             self.open_wav = wave.open(self.open_file)
-            if read_audio_format_from_wav_file(self.open_wav) == self.audio_format:
+            src_format = read_audio_format_from_wav_file(self.open_wav)
+            if src_format == self.audio_format:
                 if self.as_path:
                     self.open_wav.close()
                     self.open_file.close()
                     return self.audio_path
                 return self.open_wav
+            if WavConverter.supports(src_format, self.audio_format):
+                # Converting in-process
+                self.open_wav = WavConverter(self.open_wav, audio_format=self.audio_format)
+                if not self.as_path:
+                    return self.open_wav
+                _, self.tmp_file_path = tempfile.mkstemp(suffix='.wav')
+                write_wav_frames(self.tmp_file_path, self.open_wav)
+                self.open_wav.close()
+                self.open_file.close()
+                return self.tmp_file_path
             self.open_wav.close()
             self.open_file.close()
+            self.open_file = None
 
-        # If the format isn't right, copy the file to local tmp dir and do the conversion on disk
+        # If the format isn't supported, copy the file to local tmp dir and do the conversion on disk
         if is_remote_path(self.audio_path):
             _, self.tmp_src_file_path = tempfile.mkstemp(suffix='.wav')
             copy_remote(self.audio_path, self.tmp_src_file_path)
-            self.audio_path = self.tmp_file_path
+            self.audio_path = self.tmp_src_file_path
 
         _, self.tmp_file_path = tempfile.mkstemp(suffix='.wav')
         convert_audio(self.audio_path, self.tmp_file_path, file_type='wav', audio_format=self.audio_format)
@@ -214,17 +884,72 @@ class AudioFile:
             os.remove(self.tmp_src_file_path)
 
 
-def read_frames(wav_file, frame_duration_ms=30, yield_remainder=False):
+def frame_view(samples, frame_samples, hop_samples=None):
+    """
+    Read-only strided view of a signal as a sequence of (possibly overlapping) frames without copying it.
+    Incomplete trailing frames are dropped.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray
+        Signal with samples along the first axis
+    frame_samples : int
+        Number of samples per frame
+    hop_samples : int
+        Number of samples between the starts of two consecutive frames - defaults to frame_samples
+
+    Returns
+    -------
+    numpy.ndarray
+        View of shape (frames, frame_samples) + samples.shape[1:]
+    """
+    hop_samples = frame_samples if hop_samples is None else hop_samples
+    samples = np.ascontiguousarray(samples)
+    num_frames = max(0, (len(samples) - frame_samples) // hop_samples + 1)
+    return np.lib.stride_tricks.as_strided(samples,
+                                           shape=(num_frames, frame_samples) + samples.shape[1:],
+                                           strides=(hop_samples * samples.strides[0],) + samples.strides,
+                                           writeable=False)
+
+
+def read_frames(wav_file, frame_duration_ms=30, yield_remainder=False, frames_per_block=1024):
+    """
+    Reads PCM audio frames of a fixed duration from a WAV reader (wave.Wave_read or util.audio.WavConverter).
+    Data is read in blocks of frames_per_block frames and each frame is yielded as a memoryview slice of its block.
+    Blocks are not reused, so slices stay valid after iteration continued.
+
+    Parameters
+    ----------
+    wav_file : wave.Wave_read or util.audio.WavConverter
+        Reader to read the PCM data from
+    frame_duration_ms : int
+        Frame duration in milliseconds
+    yield_remainder : bool
+        If the trailing incomplete frame (if any) should also be yielded
+    frames_per_block : int
+        Number of frames per block read from wav_file
+
+    Returns
+    -------
+    iterable of memoryview
+        PCM data of the frames
+    """
     audio_format = read_audio_format_from_wav_file(wav_file)
-    frame_size = int(audio_format.rate * (frame_duration_ms / 1000.0))
+    frame_samples = int(audio_format.rate * (frame_duration_ms / 1000.0))
+    frame_size = frame_samples * audio_format.channels * audio_format.width
+    block_size = frame_size * frames_per_block
     while True:
         try:
-            data = wav_file.readframes(frame_size)
-            if not yield_remainder and get_pcm_duration(len(data), audio_format) * 1000 < frame_duration_ms:
-                break
-            yield data
+            block = memoryview(wav_file.readframes(frame_samples * frames_per_block)).cast('B')
         except EOFError:
             break
+        complete_size = len(block) - len(block) % frame_size
+        for offset in range(0, complete_size, frame_size):
+            yield block[offset:offset + frame_size]
+        if len(block) < block_size:
+            if yield_remainder and complete_size < len(block):
+                yield block[complete_size:]
+            break
 
 
 def read_frames_from_file(audio_path, audio_format=DEFAULT_FORMAT, frame_duration_ms=30, yield_remainder=False):
@@ -233,12 +958,63 @@ def read_frames_from_file(audio_path, audio_format=DEFAULT_FORMAT, frame_duratio
             yield frame
 
 
-def vad_split(audio_frames,
-              audio_format=DEFAULT_FORMAT,
-              num_padding_frames=10,
-              threshold=0.5,
-              aggressiveness=3):
-    from webrtcvad import Vad  # pylint: disable=import-outside-toplevel
+class VADSegmenter:
+    """
+    Turns a sequence of per-frame speech decisions into voiced segments (contiguous frame ranges).
+    A segment starts once more than threshold of the last num_padding_frames frames are voiced
+    (including these frames as padding) and ends once more than threshold of them are unvoiced.
+    Voiced frames in the padding window are counted incrementally.
+    """
+    def __init__(self, num_padding_frames=10, threshold=0.5):
+        self.num_padding_frames = num_padding_frames
+        self.limit = threshold * num_padding_frames
+        self.ring_buffer = collections.deque()
+        self.num_voiced = 0
+        self.triggered = False
+        self.segment_start = 0
+        self.num_frames = 0
+
+    def push(self, is_speech):
+        """
+        Adds the speech decision of the next frame.
+
+        Returns
+        -------
+        tuple of (int, int) or None
+            Start frame index and (exclusive) end frame index of a segment that ended with this frame, otherwise None
+        """
+        is_speech = bool(is_speech)
+        self.num_frames += 1
+        if self.num_padding_frames == 0:
+            return None
+        self.ring_buffer.append(is_speech)
+        self.num_voiced += is_speech
+        if len(self.ring_buffer) > self.num_padding_frames:
+            self.num_voiced -= self.ring_buffer.popleft()
+        if not self.triggered:
+            if self.num_voiced > self.limit:
+                self.triggered = True
+                self.segment_start = self.num_frames - len(self.ring_buffer)
+                self._clear()
+        elif len(self.ring_buffer) - self.num_voiced > self.limit:
+            self.triggered = False
+            self._clear()
+            return self.segment_start, self.num_frames
+        return None
+
+    def finish(self):
+        """Returns start and (exclusive) end frame index of a trailing segment or None."""
+        if self.triggered:
+            self.triggered = False
+            return self.segment_start, self.num_frames
+        return None
+
+    def _clear(self):
+        self.ring_buffer.clear()
+        self.num_voiced = 0
+
+
+def _check_vad_parameters(audio_format, aggressiveness):
     if audio_format.channels != 1:
         raise ValueError('VAD-splitting requires mono samples')
     if audio_format.width != 2:
@@ -247,40 +1023,258 @@ def vad_split(audio_frames,
         raise ValueError('VAD-splitting only supported for sample rates 8000, 16000, 32000, or 48000')
     if aggressiveness not in [0, 1, 2, 3]:
         raise ValueError('VAD-splitting aggressiveness mode has to be one of 0, 1, 2, or 3')
-    ring_buffer = collections.deque(maxlen=num_padding_frames)
-    triggered = False
+
+
+def _check_vad_frame_duration(frame_duration_ms):
+    if int(frame_duration_ms) not in [10, 20, 30]:
+        raise ValueError('VAD-splitting only supported for frame durations 10, 20, or 30 ms')
+
+
+def get_vad_segment_times(segment, frame_duration_ms, final=False):
+    """Start and end time in milliseconds of a segment as returned by `VADSegmenter`"""
+    start, end = segment
+    if final:
+        return frame_duration_ms * max(0, start - 1), frame_duration_ms * end
+    return frame_duration_ms * max(0, start - 1), frame_duration_ms * (end - 1)
+
+
+def vad_split(audio_frames,
+              audio_format=DEFAULT_FORMAT,
+              num_padding_frames=10,
+              threshold=0.5,
+              aggressiveness=3):
+    """
+    Splits a stream of PCM audio frames into voiced segments using WebRTC's voice activity detection.
+
+    Parameters
+    ----------
+    audio_frames : iterable of bytes-like objects
+        PCM frames of 10, 20 or 30 ms (see `read_frames`)
+    audio_format : util.audio.AudioFormat
+        Format of the frames - has to be mono 16 bit audio of 8, 16, 32 or 48 kHz
+    num_padding_frames : int
+        Number of frames of the window that decides about the start and the end of a segment
+    threshold : float
+        Ratio of voiced (or unvoiced) frames within the window that starts (or ends) a segment
+    aggressiveness : int
+        WebRTC VAD mode from 0 (least aggressive) to 3 (most aggressive about filtering out non-speech)
+
+    Returns
+    -------
+    iterable of (bytes, float, float)
+        PCM data, start time and end time in milliseconds of all voiced segments
+    """
+    from webrtcvad import Vad  # pylint: disable=import-outside-toplevel
+    _check_vad_parameters(audio_format, aggressiveness)
     vad = Vad(int(aggressiveness))
-    voiced_frames = []
-    frame_duration_ms = 0
-    frame_index = 0
-    for frame_index, frame in enumerate(audio_frames):
-        frame_duration_ms = get_pcm_duration(len(frame), audio_format) * 1000
-        if int(frame_duration_ms) not in [10, 20, 30]:
-            raise ValueError('VAD-splitting only supported for frame durations 10, 20, or 30 ms')
+    segmenter = VADSegmenter(num_padding_frames=num_padding_frames, threshold=threshold)
+    padding_frames = collections.deque(maxlen=max(1, num_padding_frames))
+    # Growing buffer of the voiced frames of the current segment - reused for all segments
+    buffer = bytearray(MEGABYTE)
+    buffer_len = 0
+    frame_duration_ms, frame_len = 0, None
+
+    def segment_data():
+        with memoryview(buffer) as view:
+            return bytes(view[:buffer_len])
+
+    def append(frame):
+        nonlocal buffer, buffer_len
+        if buffer_len + len(frame) > len(buffer):
+            buffer.extend(bytes(max(len(buffer), len(frame))))
+        buffer[buffer_len:buffer_len + len(frame)] = frame
+        buffer_len += len(frame)
+
+    for frame in audio_frames:
+        if len(frame) != frame_len:
+            frame_len = len(frame)
+            frame_duration_ms = get_pcm_duration(frame_len, audio_format) * 1000
+            _check_vad_frame_duration(frame_duration_ms)
         is_speech = vad.is_speech(frame, audio_format.rate)
-        if not triggered:
-            ring_buffer.append((frame, is_speech))
-            num_voiced = len([f for f, speech in ring_buffer if speech])
-            if num_voiced > threshold * ring_buffer.maxlen:
-                triggered = True
-                for f, s in ring_buffer:
-                    voiced_frames.append(f)
-                ring_buffer.clear()
+        if segmenter.triggered:
+            append(frame)
+            segment = segmenter.push(is_speech)
+            if segment is not None:
+                yield (segment_data(),) + get_vad_segment_times(segment, frame_duration_ms)
+                buffer_len = 0
         else:
-            voiced_frames.append(frame)
-            ring_buffer.append((frame, is_speech))
-            num_unvoiced = len([f for f, speech in ring_buffer if not speech])
-            if num_unvoiced > threshold * ring_buffer.maxlen:
-                triggered = False
-                yield b''.join(voiced_frames), \
-                      frame_duration_ms * max(0, frame_index - len(voiced_frames)), \
-                      frame_duration_ms * frame_index
-                ring_buffer.clear()
-                voiced_frames = []
-    if len(voiced_frames) > 0:
-        yield b''.join(voiced_frames), \
-              frame_duration_ms * (frame_index - len(voiced_frames)), \
-              frame_duration_ms * (frame_index + 1)
+            padding_frames.append(frame)
+            segmenter.push(is_speech)
+            if segmenter.triggered:
+                for padding_frame in padding_frames:
+                    append(padding_frame)
+                padding_frames.clear()
+    segment = segmenter.finish()
+    if segment is not None:
+        yield (segment_data(),) + get_vad_segment_times(segment, frame_duration_ms, final=True)
+
+
+def vad_split_buffer(pcm_data,
+                     audio_format=DEFAULT_FORMAT,
+                     frame_duration_ms=30,
+                     num_padding_frames=10,
+                     threshold=0.5,
+                     aggressiveness=3):
+    """
+    Like `vad_split`, but for PCM data that is completely in memory.
+    All frames get classified in one go. As voiced segments are contiguous frame ranges,
+    they are returned as views into pcm_data without copying it.
+
+    Parameters
+    ----------
+    pcm_data : bytes-like object
+        PCM data (e.g. bytes or a np.int16 array)
+    frame_duration_ms : int
+        Frame duration in milliseconds - one of 10, 20 or 30
+    audio_format, num_padding_frames, threshold, aggressiveness
+        See `vad_split`
+
+    Returns
+    -------
+    iterable of (memoryview, float, float)
+        PCM data view, start time and end time in milliseconds of all voiced segments
+    """
+    from webrtcvad import Vad  # pylint: disable=import-outside-toplevel
+    _check_vad_parameters(audio_format, aggressiveness)
+    _check_vad_frame_duration(frame_duration_ms)
+    vad = Vad(int(aggressiveness))
+    pcm_data = memoryview(pcm_data).cast('B')
+    frame_samples = int(audio_format.rate * (frame_duration_ms / 1000.0))
+    frame_size = frame_samples * audio_format.width
+    frame_duration_ms = get_pcm_duration(frame_size, audio_format) * 1000
+    is_speech = vad.is_speech
+    rate = audio_format.rate
+    decisions = [is_speech(pcm_data[offset:offset + frame_size], rate, length=frame_samples)
+                 for offset in range(0, len(pcm_data) - frame_size + 1, frame_size)]
+    return _split_buffer_by_decisions(pcm_data, decisions, frame_size, frame_duration_ms,
+                                      num_padding_frames=num_padding_frames, threshold=threshold)
+
+
+def _split_buffer_by_decisions(pcm_data, decisions, frame_size, frame_duration_ms, num_padding_frames, threshold):
+    segmenter = VADSegmenter(num_padding_frames=num_padding_frames, threshold=threshold)
+
+    def segment_data(segment, final=False):
+        return (pcm_data[segment[0] * frame_size:segment[1] * frame_size],) + \
+            get_vad_segment_times(segment, frame_duration_ms, final=final)
+
+    for decision in decisions:
+        segment = segmenter.push(decision)
+        if segment is not None:
+            yield segment_data(segment)
+    segment = segmenter.finish()
+    if segment is not None:
+        yield segment_data(segment, final=True)
+
+
+def apply_hysteresis(high, low):
+    """
+    Vectorized hysteresis thresholding of per-frame decisions:
+    A frame is active if it belongs to a run of frames above the low threshold
+    that contains at least one frame above the high threshold.
+
+    Parameters
+    ----------
+    high : numpy.ndarray
+        Boolean mask of frames above the high threshold
+    low : numpy.ndarray
+        Boolean mask of frames above the low threshold
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean mask of active frames
+    """
+    low = low | high
+    run_starts = low & ~np.concatenate([[False], low[:-1]])
+    run_ids = np.cumsum(run_starts) * low  # 0 for frames outside of runs
+    active_runs = np.zeros(int(run_ids.max(initial=0)) + 1, dtype=bool)
+    active_runs[run_ids[high]] = True
+    active_runs[0] = False
+    return active_runs[run_ids]
+
+
+def energy_vad_decisions(samples, frame_samples, aggressiveness=3, max_zcr=0.3, noise_percentile=10):
+    """
+    Per-frame speech decisions from log-energy and zero-crossing rate of a whole signal.
+    Frames start speech regions if their energy exceeds the estimated noise floor by a high threshold
+    and their zero-crossing rate is voice-like (below max_zcr). Regions extend over neighboring frames
+    with energy above a low threshold.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray
+        Mono np.float32 signal
+    frame_samples : int
+        Number of samples per frame
+    aggressiveness : int
+        0 (least aggressive) to 3 (most aggressive about filtering out non-speech) - raises the thresholds
+    max_zcr : float
+        Maximum zero-crossing rate (crossings per sample) of frames that can start speech regions
+    noise_percentile : float
+        Percentile of frame energies taken as noise floor
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean array with one decision per complete frame
+    """
+    frames = frame_view(samples, frame_samples)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    energy = 10.0 * np.log10(np.einsum('ij,ij->i', frames, frames) / frame_samples + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(1, frame_samples - 1)
+    noise_floor = np.percentile(energy, noise_percentile)
+    high_db = 9.0 + 3.0 * aggressiveness
+    return apply_hysteresis((energy > noise_floor + high_db) & (zcr < max_zcr), energy > noise_floor + high_db / 2)
+
+
+VAD_METHOD_AUTO = 'auto'
+VAD_METHOD_WEBRTC = 'webrtc'
+VAD_METHOD_ENERGY = 'energy'
+VAD_METHODS = [VAD_METHOD_AUTO, VAD_METHOD_WEBRTC, VAD_METHOD_ENERGY]
+
+
+def resolve_vad_method(vad_method):
+    """Resolves VAD_METHOD_AUTO to VAD_METHOD_WEBRTC if webrtcvad is installed, otherwise to VAD_METHOD_ENERGY."""
+    if vad_method not in VAD_METHODS:
+        raise ValueError('Unknown VAD method: {}'.format(vad_method))
+    if vad_method != VAD_METHOD_AUTO:
+        return vad_method
+    try:
+        import webrtcvad  # pylint: disable=import-outside-toplevel,unused-import
+        return VAD_METHOD_WEBRTC
+    except ImportError:
+        return VAD_METHOD_ENERGY
+
+
+def energy_vad_split_buffer(pcm_data,
+                            audio_format=DEFAULT_FORMAT,
+                            frame_duration_ms=30,
+                            num_padding_frames=10,
+                            threshold=0.5,
+                            aggressiveness=3):
+    """
+    Like `vad_split_buffer`, but based on `energy_vad_decisions` instead of WebRTC's VAD.
+    Does not depend on webrtcvad and supports all sample rates and frame durations.
+
+    Returns
+    -------
+    iterable of (memoryview, float, float)
+        PCM data view, start time and end time in milliseconds of all voiced segments
+    """
+    if audio_format.channels != 1:
+        raise ValueError('VAD-splitting requires mono samples')
+    if aggressiveness not in [0, 1, 2, 3]:
+        raise ValueError('VAD-splitting aggressiveness mode has to be one of 0, 1, 2, or 3')
+    pcm_data = memoryview(pcm_data).cast('B')
+    frame_samples = int(audio_format.rate * (frame_duration_ms / 1000.0))
+    frame_size = frame_samples * audio_format.width
+    frame_duration_ms = get_pcm_duration(frame_size, audio_format) * 1000
+    samples = pcm_to_float(pcm_data, audio_format.width, 1)[:, 0]
+    decisions = energy_vad_decisions(samples, frame_samples, aggressiveness=aggressiveness)
+    return _split_buffer_by_decisions(pcm_data, decisions, frame_size, frame_duration_ms,
+                                      num_padding_frames=num_padding_frames, threshold=threshold)
 
 
 def pack_number(n, num_bytes):
@@ -295,49 +1289,391 @@ def get_opus_frame_size(rate):
     return 60 * rate // 1000
 
 
-def write_opus(opus_file, audio_data, audio_format=DEFAULT_FORMAT, bitrate=None):
+def write_opus(opus_file, audio_data, audio_format=DEFAULT_FORMAT, bitrate=None, frame_index=False):
+    """
+    Encodes PCM data into the custom Opus container format:
+    PCM byte length, rate, channels and width, followed by the Opus encoded 60 ms frames ("chunks").
+
+    Parameters
+    ----------
+    opus_file : file-like object
+        Writable file to write the container to
+    audio_data : bytes
+        PCM data to encode
+    audio_format : util.audio.AudioFormat
+        Format of the PCM data
+    bitrate : int
+        Encoder bitrate
+    frame_index : bool
+        If False, every chunk is prefixed by its length.
+        If True, a frame count and a table of all chunk lengths are written right after the header.
+        This allows seeking to any frame without walking all preceding chunks (see `read_opus`).
+    """
     frame_size = get_opus_frame_size(audio_format.rate)
-    import opuslib  # pylint: disable=import-outside-toplevel
-    encoder = opuslib.Encoder(audio_format.rate, audio_format.channels, 'audio')
-    if bitrate is not None:
-        encoder.bitrate = bitrate
+    encoder = get_opus_encoder(audio_format.rate, audio_format.channels, bitrate=bitrate)
     chunk_size = frame_size * audio_format.channels * audio_format.width
+
+    def encode_chunks():
+        for i in range(0, len(audio_data), chunk_size):
+            chunk = audio_data[i:i + chunk_size]
+            # Preventing non-deterministic encoding results from uninitialized remainder of the encoder buffer
+            if len(chunk) < chunk_size:
+                chunk = chunk + b'\0' * (chunk_size - len(chunk))
+            yield encoder.encode(chunk, frame_size)
+
     opus_file.write(pack_number(len(audio_data), OPUS_PCM_LEN_SIZE))
     opus_file.write(pack_number(audio_format.rate, OPUS_RATE_SIZE))
     opus_file.write(pack_number(audio_format.channels, OPUS_CHANNELS_SIZE))
-    opus_file.write(pack_number(audio_format.width, OPUS_WIDTH_SIZE))
-    for i in range(0, len(audio_data), chunk_size):
-        chunk = audio_data[i:i + chunk_size]
-        # Preventing non-deterministic encoding results from uninitialized remainder of the encoder buffer
-        if len(chunk) < chunk_size:
-            chunk = chunk + b'\0' * (chunk_size - len(chunk))
-        encoded = encoder.encode(chunk, frame_size)
-        opus_file.write(pack_number(len(encoded), OPUS_CHUNK_LEN_SIZE))
-        opus_file.write(encoded)
+    opus_file.write(pack_number(audio_format.width | (OPUS_FRAME_INDEX_FLAG if frame_index else 0), OPUS_WIDTH_SIZE))
+    if frame_index:
+        chunks = list(encode_chunks())
+        opus_file.write(pack_number(len(chunks), OPUS_FRAME_COUNT_SIZE))
+        opus_file.write(np.array([len(chunk) for chunk in chunks], dtype=OPUS_CHUNK_LEN_DTYPE).tobytes())
+        for encoded in chunks:
+            opus_file.write(encoded)
+    else:
+        for encoded in encode_chunks():
+            opus_file.write(pack_number(len(encoded), OPUS_CHUNK_LEN_SIZE))
+            opus_file.write(encoded)
 
 
 def read_opus_header(opus_file):
+    pcm_buffer_size, audio_format, _ = read_opus_header_and_flags(opus_file)
+    return pcm_buffer_size, audio_format
+
+
+def read_opus_header_and_flags(opus_file):
     opus_file.seek(0)
     pcm_buffer_size = unpack_number(opus_file.read(OPUS_PCM_LEN_SIZE))
     rate = unpack_number(opus_file.read(OPUS_RATE_SIZE))
     channels = unpack_number(opus_file.read(OPUS_CHANNELS_SIZE))
     width = unpack_number(opus_file.read(OPUS_WIDTH_SIZE))
-    return pcm_buffer_size, AudioFormat(rate, channels, width)
+    frame_index = bool(width & OPUS_FRAME_INDEX_FLAG)
+    return pcm_buffer_size, AudioFormat(rate, channels, width & ~OPUS_FRAME_INDEX_FLAG), frame_index
 
 
-def read_opus(opus_file):
+def read_opus_chunk_table(opus_file):
+    """
+    Determines the positions of all Opus chunks (encoded frames) of a file in the custom Opus container format.
+    Containers with frame index provide them directly, others get walked once (without reading chunk data).
+
+    Parameters
+    ----------
+    opus_file : file-like object
+        Readable and seekable file containing the Opus container
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, numpy.ndarray)
+        Byte offsets and lengths of all chunks as np.int64 arrays
+    """
+    pcm_buffer_size, audio_format, frame_index = read_opus_header_and_flags(opus_file)
+    if frame_index:
+        num_frames = unpack_number(opus_file.read(OPUS_FRAME_COUNT_SIZE))
+        chunk_len_size = np.dtype(OPUS_CHUNK_LEN_DTYPE).itemsize
+        chunk_lens = np.frombuffer(opus_file.read(num_frames * chunk_len_size), dtype=OPUS_CHUNK_LEN_DTYPE)
+        chunk_lens = chunk_lens.astype(np.int64)
+        offsets = opus_file.tell() + np.cumsum(chunk_lens) - chunk_lens
+        return offsets, chunk_lens
+    frame_values = get_opus_frame_size(audio_format.rate) * audio_format.channels
+    num_frames = int(math.ceil(pcm_buffer_size / (frame_values * np.dtype(np.int16).itemsize)))
+    offsets, chunk_lens = [], []
+    for _ in range(num_frames):
+        chunk_len = unpack_number(opus_file.read(OPUS_CHUNK_LEN_SIZE))
+        offsets.append(opus_file.tell())
+        chunk_lens.append(chunk_len)
+        opus_file.seek(chunk_len, io.SEEK_CUR)
+    return np.array(offsets, dtype=np.int64), np.array(chunk_lens, dtype=np.int64)
+
+
+def read_opus_chunks(opus_file, first_frame=0, chunk_table=None):
+    """
+    Reads the Opus chunks (encoded frames) of a file in the custom Opus container format starting at a given frame.
+    Containers with frame index seek to the first chunk directly, others skip all preceding chunks one by one.
+
+    Parameters
+    ----------
+    opus_file : file-like object
+        Readable and seekable file containing the Opus container
+    first_frame : int
+        Index of the first chunk to read
+    chunk_table : tuple of (numpy.ndarray, numpy.ndarray)
+        Chunk positions as returned by `read_opus_chunk_table` - lets repeated reads of a container seek directly
+
+    Returns
+    -------
+    iterable of bytes
+        Chunks from first_frame on - reading stops at the end of the container
+    """
+    if chunk_table is not None:
+        offsets, chunk_lens = chunk_table
+        for offset, chunk_len in zip(offsets[first_frame:].tolist(), chunk_lens[first_frame:].tolist()):
+            opus_file.seek(offset)
+            yield opus_file.read(chunk_len)
+        return
+    pcm_buffer_size, audio_format, frame_index = read_opus_header_and_flags(opus_file)
+    frame_values = get_opus_frame_size(audio_format.rate) * audio_format.channels
+    num_frames = int(math.ceil(pcm_buffer_size / (frame_values * np.dtype(np.int16).itemsize)))
+    if frame_index:
+        num_frames = unpack_number(opus_file.read(OPUS_FRAME_COUNT_SIZE))
+        chunk_len_size = np.dtype(OPUS_CHUNK_LEN_DTYPE).itemsize
+        chunk_lens = np.frombuffer(opus_file.read(num_frames * chunk_len_size), dtype=OPUS_CHUNK_LEN_DTYPE)
+        first_frame = min(first_frame, num_frames)
+        opus_file.seek(int(np.sum(chunk_lens[:first_frame], dtype=np.int64)), io.SEEK_CUR)
+        for chunk_len in chunk_lens[first_frame:].tolist():
+            yield opus_file.read(chunk_len)
+    else:
+        for frame in range(num_frames):
+            chunk_len = unpack_number(opus_file.read(OPUS_CHUNK_LEN_SIZE))
+            if frame < first_frame:
+                opus_file.seek(chunk_len, io.SEEK_CUR)
+            else:
+                yield opus_file.read(chunk_len)
+
+
+_OPUS_ENCODERS = {}
+_OPUS_DECODERS = {}
+
+
+def get_opus_encoder(rate, channels, bitrate=None):
+    """Returns a per-process Opus encoder for the given rate and number of channels set to bitrate
+    (None for automatic bitrate). Encoders get created once and reset on reuse."""
+    key = (rate, channels)
+    encoder = _OPUS_ENCODERS.get(key)
+    if encoder is None:
+        import opuslib  # pylint: disable=import-outside-toplevel
+        encoder = _OPUS_ENCODERS[key] = opuslib.Encoder(rate, channels, 'audio')
+    else:
+        encoder.reset_state()
+    # Resetting the state keeps the settings - a bitrate of a former use has to be reverted
+    encoder.bitrate = OPUS_BITRATE_AUTO if bitrate is None else bitrate
+    return encoder
+
+
+def get_opus_decoder(rate, channels):
+    """Returns a per-process Opus decoder for the given rate and number of channels.
+    Decoders get created once and reset on reuse."""
+    key = (rate, channels)
+    decoder = _OPUS_DECODERS.get(key)
+    if decoder is None:
+        import opuslib  # pylint: disable=import-outside-toplevel
+        decoder = _OPUS_DECODERS[key] = opuslib.Decoder(rate, channels)
+    else:
+        decoder.reset_state()
+    return decoder
+
+
+# The following two functions bypass opuslib's bytes based Encoder.encode and Decoder.decode methods
+# to let libopus read from and write into NumPy buffers directly. They rely on internals of opuslib 2.0.0
+# (as pinned in setup.py): its ctypes bindings (opuslib.api) and the state pointers of its encoders and decoders.
+
+
+def opus_encode_frame(encoder, frame, frame_size, encoded, max_bytes):
+    """
+    Encodes one frame of np.int16 PCM data through libopus.
+
+    Parameters
+    ----------
+    encoder : opuslib.Encoder
+        Encoder to use (see `get_opus_encoder`)
+    frame : numpy.ndarray
+        Contiguous np.int16 array of frame_size * channels values
+    frame_size : int
+        Number of samples (per channel) of the frame
+    encoded : ctypes.Array
+        Buffer the encoded frame is written to
+    max_bytes : int
+        Size of the encoded buffer
+
+    Returns
+    -------
+    int
+        Length of the encoded frame in bytes
+    """
+    import opuslib  # pylint: disable=import-outside-toplevel
+    import ctypes  # pylint: disable=import-outside-toplevel
+    pointer = ctypes.cast(frame.ctypes.data, opuslib.api.c_int16_pointer)
+    result = opuslib.api.libopus.opus_encode(encoder._state, pointer, frame_size,  # pylint: disable=protected-access
+                                             ctypes.cast(encoded, ctypes.c_char_p), max_bytes)
+    if result < 0:
+        raise opuslib.exceptions.OpusError(result)
+    return result
+
+
+def opus_decode_frame(decoder, chunk, chunk_len, output, frame_size):
+    """
+    Decodes one encoded Opus frame through libopus into a NumPy buffer.
+
+    Parameters
+    ----------
+    decoder : opuslib.Decoder
+        Decoder to use (see `get_opus_decoder`)
+    chunk : bytes or ctypes.Array
+        Encoded frame
+    chunk_len : int
+        Length of the encoded frame in bytes
+    output : numpy.ndarray
+        Contiguous np.int16 array with room for at least frame_size * channels values
+    frame_size : int
+        Maximum number of samples (per channel) to decode
+
+    Returns
+    -------
+    int
+        Number of decoded samples (per channel)
+    """
+    import opuslib  # pylint: disable=import-outside-toplevel
+    import ctypes  # pylint: disable=import-outside-toplevel
+    if output.dtype != np.int16 or not output.flags.c_contiguous:
+        raise ValueError('Opus frames can only be decoded into contiguous np.int16 arrays')
+    pointer = ctypes.cast(output.ctypes.data, opuslib.api.c_int16_pointer)
+    result = opuslib.api.libopus.opus_decode(decoder._state, chunk, chunk_len,  # pylint: disable=protected-access
+                                             pointer, frame_size, 0)
+    if result < 0:
+        raise opuslib.exceptions.OpusError(result)
+    return result
+
+
+def decode_opus(opus_file, start_time=0.0, end_time=None, chunk_table=None):
+    """
+    Decodes (a time window of) a file in the custom Opus container format (as written by `write_opus`)
+    into a NumPy int16 array without intermediate copies.
+    Only the frames overlapping the window (plus some pre-roll frames) get decoded.
+
+    Parameters
+    ----------
+    opus_file : file-like object
+        Readable and seekable file containing the Opus container
+    start_time : float
+        Start of the window to decode in seconds
+    end_time : float
+        End of the window to decode in seconds - None for decoding till the end
+    chunk_table : tuple of (numpy.ndarray, numpy.ndarray)
+        Optional chunk positions as returned by `read_opus_chunk_table` (see `OpusWindowReader`)
+
+    Returns
+    -------
+    tuple of (util.audio.AudioFormat, numpy.ndarray)
+        Audio format and flat (channel interleaved) np.int16 array of the decoded PCM data
+    """
     pcm_buffer_size, audio_format = read_opus_header(opus_file)
     frame_size = get_opus_frame_size(audio_format.rate)
-    import opuslib  # pylint: disable=import-outside-toplevel
-    decoder = opuslib.Decoder(audio_format.rate, audio_format.channels)
-    audio_data = bytearray()
-    while len(audio_data) < pcm_buffer_size:
-        chunk_len = unpack_number(opus_file.read(OPUS_CHUNK_LEN_SIZE))
-        chunk = opus_file.read(chunk_len)
-        decoded = decoder.decode(chunk, frame_size)
-        audio_data.extend(decoded)
-    audio_data = audio_data[:pcm_buffer_size]
-    return audio_format, bytes(audio_data)
+    num_samples = pcm_buffer_size // (np.dtype(np.int16).itemsize * audio_format.channels)
+    # Rounding keeps windows that got computed from sample positions free of gaps and overlaps
+    start_sample = min(num_samples, max(0, int(round(start_time * audio_format.rate))))
+    end_sample = num_samples if end_time is None else min(num_samples, int(round(end_time * audio_format.rate)))
+    end_sample = max(start_sample, end_sample)
+    first_frame = max(0, start_sample // frame_size - OPUS_PREROLL_FRAMES)
+    # Opus frames decode to whole frames - pre-roll and last frame remainder get cut off after decoding
+    num_frames = int(math.ceil(end_sample / frame_size)) - first_frame
+    frame_values = frame_size * audio_format.channels
+    buffer = np.empty(num_frames * frame_values, dtype=np.int16)
+    position = 0
+    if num_frames > 0:
+        decoder = get_opus_decoder(audio_format.rate, audio_format.channels)
+        for chunk in read_opus_chunks(opus_file, first_frame=first_frame, chunk_table=chunk_table):
+            # Frames get decoded one by one - so there is always room for a whole frame behind position
+            result = opus_decode_frame(decoder, chunk, len(chunk), buffer[position:], frame_size)
+            position += result * audio_format.channels
+            if position >= len(buffer):
+                break
+    offset = first_frame * frame_size
+    return audio_format, buffer[(start_sample - offset) * audio_format.channels:
+                                (end_sample - offset) * audio_format.channels]
+
+
+class OpusWindowReader:
+    """
+    Reads consecutive windows of a (mono) file in the custom Opus container format as np.float32 audio.
+    Every window gets decoded on its own by `decode_opus` - so long files (e.g. noise recordings)
+    can be consumed piece by piece without ever getting decoded completely.
+    """
+    def __init__(self, opus_file):
+        """
+        Parameters
+        ----------
+        opus_file : file-like object
+            Readable and seekable file containing the Opus container
+        """
+        self.opus_file = opus_file
+        pcm_buffer_size, self.audio_format = read_opus_header(opus_file)
+        if self.audio_format.channels != 1:
+            raise ValueError('Window reading requires mono samples')
+        self.num_samples = pcm_buffer_size // np.dtype(np.int16).itemsize
+        self.chunk_table = read_opus_chunk_table(opus_file)
+        self.position = 0
+
+    def __len__(self):
+        """Number of samples left to read"""
+        return self.num_samples - self.position
+
+    def read(self, num_samples):
+        """
+        Decodes the next window.
+
+        Parameters
+        ----------
+        num_samples : int
+            Maximum number of samples to read
+
+        Returns
+        -------
+        numpy.ndarray
+            np.float32 audio data of shape (samples, 1) - shorter than num_samples at the end of the file
+        """
+        end = min(self.num_samples, self.position + num_samples)
+        rate = self.audio_format.rate
+        _, audio_data = decode_opus(self.opus_file,
+                                    start_time=self.position / rate,
+                                    end_time=end / rate,
+                                    chunk_table=self.chunk_table)
+        self.position = end
+        return pcm_to_np(audio_data, self.audio_format)
+
+
+def opus_round_trip(samples, rate, bitrate=None):
+    """
+    Encodes audio data with the lossy Opus codec and directly decodes it again, frame by frame.
+    Works on NumPy buffers with the per-process encoder and decoder
+    (without packing the encoded frames into the custom Opus container).
+
+    Parameters
+    ----------
+    samples : numpy.ndarray
+        np.int16 audio data of shape (samples, channels)
+    rate : int
+        Sample rate - has to be supported by Opus
+    bitrate : int
+        Encoder bitrate - None for automatic bitrate
+
+    Returns
+    -------
+    numpy.ndarray
+        Decoded np.int16 audio data of the same shape
+    """
+    import ctypes  # pylint: disable=import-outside-toplevel
+    num_samples, channels = samples.shape
+    frame_size = get_opus_frame_size(rate)
+    frame_values = frame_size * channels
+    num_frames = int(math.ceil(num_samples / frame_size))
+    # Zero padding of the last frame keeps encoding deterministic (see `write_opus`)
+    inputs = np.zeros(num_frames * frame_values, dtype=np.int16)
+    inputs[:samples.size] = samples.reshape(-1)
+    outputs = np.empty_like(inputs)
+    frame_bytes = frame_values * inputs.itemsize
+    encoded = ctypes.create_string_buffer(frame_bytes)
+    encoder = get_opus_encoder(rate, channels, bitrate=bitrate)
+    decoder = get_opus_decoder(rate, channels)
+    for offset in range(0, num_frames * frame_values, frame_values):
+        # Both functions raise opuslib.exceptions.OpusError on failure - so encoded_len is a valid length
+        encoded_len = opus_encode_frame(encoder, inputs[offset:offset + frame_values], frame_size, encoded, frame_bytes)
+        opus_decode_frame(decoder, encoded, encoded_len, outputs[offset:offset + frame_values], frame_size)
+    return outputs[:samples.size].reshape(samples.shape)
+
+
+def read_opus(opus_file, start_time=0.0, end_time=None):
+    audio_format, audio_data = decode_opus(opus_file, start_time=start_time, end_time=end_time)
+    return audio_format, audio_data.tobytes()
 
 
 def write_wav(wav_file, pcm_data, audio_format=DEFAULT_FORMAT):
@@ -357,6 +1693,21 @@ def read_wav(wav_file):
         return audio_format, pcm_data
 
 
+def read_wav_view(wav_file):
+    """Like `read_wav`, but returns the PCM data as a view into the file's buffer if it provides one
+    (io.BytesIO or util.audio.MemoryViewIO)."""
+    if not hasattr(wav_file, 'getbuffer'):
+        return read_wav(wav_file)
+    wav_file.seek(0)
+    with wave.open(wav_file, 'rb') as wav_file_reader:
+        audio_format = read_audio_format_from_wav_file(wav_file_reader)
+        num_frames = wav_file_reader.getnframes()
+        # wave.open stops reading at the beginning of the data chunk
+        data_start = wav_file.tell()
+    data_end = data_start + num_frames * audio_format.channels * audio_format.width
+    return audio_format, wav_file.getbuffer()[data_start:data_end]
+
+
 def read_audio(audio_type, audio_file):
     if audio_type == AUDIO_TYPE_WAV:
         return read_wav(audio_file)
@@ -365,18 +1716,63 @@ def read_audio(audio_type, audio_file):
     raise ValueError('Unsupported audio type: {}'.format(audio_type))
 
 
-def write_audio(audio_type, audio_file, pcm_data, audio_format=DEFAULT_FORMAT, bitrate=None):
+def write_audio(audio_type, audio_file, pcm_data, audio_format=DEFAULT_FORMAT, bitrate=None, frame_index=False):
     if audio_type == AUDIO_TYPE_WAV:
         return write_wav(audio_file, pcm_data, audio_format=audio_format)
     if audio_type == AUDIO_TYPE_OPUS:
-        return write_opus(audio_file, pcm_data, audio_format=audio_format, bitrate=bitrate)
+        return write_opus(audio_file, pcm_data, audio_format=audio_format, bitrate=bitrate, frame_index=frame_index)
     raise ValueError('Unsupported audio type: {}'.format(audio_type))
 
 
-def read_wav_duration(wav_file):
+def read_wav_header(wav_file):
+    """
+    Parses the RIFF/WAVE header of a WAV file without decoding it (and without instantiating a wave reader).
+    Skips unknown chunks (like LIST or fact) and only reads the "fmt " chunk and the header of the "data" chunk.
+
+    Parameters
+    ----------
+    wav_file : file-like object
+        Seekable binary file object of the WAV file
+
+    Returns
+    -------
+    tuple of (number of frames, util.audio.AudioFormat)
+    """
     wav_file.seek(0)
-    with wave.open(wav_file, 'rb') as wav_file_reader:
-        return wav_file_reader.getnframes() / wav_file_reader.getframerate()
+    riff_header = wav_file.read(WAV_RIFF_HEADER.size)
+    if len(riff_header) < WAV_RIFF_HEADER.size:
+        raise ValueError('Truncated RIFF header')
+    riff_id, _, wave_id = WAV_RIFF_HEADER.unpack(riff_header)
+    if riff_id != b'RIFF' or wave_id != b'WAVE':
+        raise ValueError('Not a RIFF/WAVE file')
+    audio_format, block_align = None, None
+    while True:
+        chunk_header = wav_file.read(WAV_CHUNK_HEADER.size)
+        if len(chunk_header) < WAV_CHUNK_HEADER.size:
+            raise ValueError('Missing data chunk')
+        chunk_id, chunk_size = WAV_CHUNK_HEADER.unpack(chunk_header)
+        chunk_start = wav_file.tell()
+        if chunk_id == b'fmt ':
+            fmt_chunk = wav_file.read(WAV_FMT_CHUNK.size)
+            if chunk_size < WAV_FMT_CHUNK.size or len(fmt_chunk) < WAV_FMT_CHUNK.size:
+                raise ValueError('Truncated fmt chunk')
+            _, channels, rate, _, block_align, bits_per_sample = WAV_FMT_CHUNK.unpack(fmt_chunk)
+            if channels == 0 or block_align == 0:
+                raise ValueError('Invalid fmt chunk')
+            audio_format = AudioFormat(rate, channels, (bits_per_sample + 7) // 8)
+        elif chunk_id == b'data':
+            if audio_format is None:
+                raise ValueError('Missing fmt chunk')
+            # Streaming writers cannot know the data size upfront - 0xFFFFFFFF then means "until end of file"
+            data_size = min(chunk_size, wav_file.seek(0, io.SEEK_END) - chunk_start)
+            return data_size // block_align, audio_format
+        # RIFF chunks are word-aligned
+        wav_file.seek(chunk_start + chunk_size + (chunk_size & 1))
+
+
+def read_wav_duration(wav_file):
+    num_frames, audio_format = read_wav_header(wav_file)
+    return num_frames / audio_format.rate
 
 
 def read_opus_duration(opus_file):
@@ -407,6 +1803,44 @@ def pcm_to_np(pcm_data, audio_format=DEFAULT_FORMAT):
     return np.expand_dims(samples, axis=1)
 
 
+def stack_padded(arrays):
+    """
+    Stacks arrays of different lengths (first axis) into one zero padded array.
+
+    Parameters
+    ----------
+    arrays : list of numpy.ndarray
+        Arrays of equal shapes (apart from their first axes) and data types
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, list of int)
+        Array of shape (len(arrays), longest length, ...) and the original lengths
+    """
+    lengths = [len(array) for array in arrays]
+    batch = np.zeros((len(arrays), max(lengths)) + arrays[0].shape[1:], dtype=arrays[0].dtype)
+    for row, array in zip(batch, arrays):
+        row[:len(array)] = array
+    return batch, lengths
+
+
+def np_to_dtype(np_data, dtype=AUDIO_DTYPE_FLOAT32):
+    """
+    Converts np.float32 audio data (as produced by `pcm_to_np`) into a more compact in-flight representation.
+    np.float16 halves the size and keeps values outside of [-1.0, 1.0] (e.g. of augmented samples),
+    np.int16 scales values like `np_to_pcm` (clipping them to [-1.0, 1.0]) and is lossless for 16 bit source data.
+    """
+    dtype = np.dtype(dtype)
+    if dtype == np_data.dtype:
+        return np_data
+    if dtype == np.int16:
+        max_value = np.iinfo(np.int16).max
+        return np.clip(np.rint(np_data * max_value), -max_value - 1, max_value).astype(np.int16)
+    if dtype in [np.float16, np.float32]:
+        return np_data.astype(dtype)
+    raise ValueError('Unsupported in-flight audio data type: {}'.format(dtype))
+
+
 def np_to_pcm(np_data, audio_format=DEFAULT_FORMAT):
     if audio_format.channels != 1:
         raise ValueError('Mono-channel audio required')
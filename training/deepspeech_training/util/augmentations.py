@@ -1,12 +1,15 @@
 
 import os
 import re
+import json
 import math
 import random
 import numpy as np
 
 from multiprocessing import Queue, Process
-from .audio import gain_db_to_ratio, max_dbfs, normalize_audio, AUDIO_TYPE_NP, AUDIO_TYPE_PCM, AUDIO_TYPE_OPUS
+from .audio import gain_db_to_ratio, max_dbfs, normalize_audio, SharedAudioSlots, np_to_dtype, feedback_comb_filter, \
+    change_audio_types, resample, opus_round_trip, stack_padded, OpusWindowReader, AUDIO_TYPE_NP, AUDIO_TYPE_OPUS, \
+    AUDIO_DTYPE_FLOAT32, AUDIO_DTYPE_INT16
 from .helpers import LimitingPool, int_range, float_range, pick_value_from_range, tf_pick_value_from_range, MEGABYTE
 from .sample_collections import samples_from_source, unpack_maybe
 
@@ -26,6 +29,12 @@ class SampleAugmentation(Augmentation):
     def apply(self, sample, clock=0.0):
         raise NotImplementedError
 
+    def apply_batch(self, samples, clocks):
+        """Augments a list of (typically similarly long) samples with their respective clock values.
+        Augmentations that can process many samples at once more efficiently should override this."""
+        for sample, clock in zip(samples, clocks):
+            self.apply(sample, clock)
+
     def stop(self):
         pass
 
@@ -137,9 +146,10 @@ def apply_graph_augmentations(domain, tensor, augmentations, transcript=None, cl
 
 
 class AugmentationContext:
-    def __init__(self, target_audio_type, augmentations):
+    def __init__(self, target_audio_type, augmentations, audio_dtype=AUDIO_DTYPE_FLOAT32):
         self.target_audio_type = target_audio_type
         self.augmentations = augmentations
+        self.audio_dtype = audio_dtype
 
 
 AUGMENTATION_CONTEXT = None
@@ -156,14 +166,50 @@ def _load_and_augment_sample(timed_sample, context=None):
     return _augment_sample((realized_sample, clock), context)
 
 
+def _finish_sample(sample, context):
+    sample.change_audio_type(new_audio_type=context.target_audio_type)
+    if context.target_audio_type == AUDIO_TYPE_NP and context.audio_dtype != AUDIO_DTYPE_FLOAT32:
+        sample.audio = np_to_dtype(sample.audio, context.audio_dtype)
+    return sample
+
+
 def _augment_sample(timed_sample, context=None):
     context = AUGMENTATION_CONTEXT if context is None else context
     sample, clock = timed_sample
     for augmentation in context.augmentations:
         if random.random() < augmentation.probability:
             augmentation.apply(sample, clock)
-    sample.change_audio_type(new_audio_type=context.target_audio_type)
-    return sample
+    return _finish_sample(sample, context)
+
+
+def _load_and_augment_batch(timed_samples, context=None):
+    context = AUGMENTATION_CONTEXT if context is None else context
+    samples = [unpack_maybe(sample) for sample, _ in timed_samples]
+    clocks = [clock for _, clock in timed_samples]
+    for augmentation in context.augmentations:
+        picked = [i for i in range(len(samples)) if random.random() < augmentation.probability]
+        if len(picked) > 0:
+            augmentation.apply_batch([samples[i] for i in picked], [clocks[i] for i in picked])
+    return [_finish_sample(sample, context) for sample in samples]
+
+
+def _batch_items(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+
+def _unbatch_samples(results, batched):
+    for result in results:
+        if batched:
+            yield from result
+        else:
+            yield result
 
 
 def apply_sample_augmentations(samples,
@@ -172,7 +218,10 @@ def apply_sample_augmentations(samples,
                                buffering=BUFFER_SIZE,
                                process_ahead=None,
                                clock=0.0,
-                               final_clock=None):
+                               final_clock=None,
+                               slot_size=0,
+                               audio_dtype=AUDIO_DTYPE_FLOAT32,
+                               batch_size=1):
     """
     Prepares samples for being used during training.
     This includes parallel and buffered application of augmentations and a conversion to a specified audio-type.
@@ -194,6 +243,15 @@ def apply_sample_augmentations(samples,
     final_clock : float
         Final clock value between 0.0 and 1.0 for the last sample. Has to be >= than clock.
         Requires samples.__len__ attribute.
+    slot_size : int
+        If > 0, NumPy audio data gets passed from the worker processes through slots of shared memory
+        of this byte size instead of being pickled (see util.audio.SharedAudioSlots).
+    audio_dtype : str
+        One of util.audio.AUDIO_DTYPES - data type that NumPy audio data gets converted to after augmentation
+        for reducing inter-process and buffer memory (see util.audio.np_to_dtype).
+    batch_size : int
+        If > 1, this number of consecutive (and - in case of duration ordered sources - similarly long) samples
+        gets augmented together by one worker (see SampleAugmentation.apply_batch).
 
     Returns
     -------
@@ -216,15 +274,23 @@ def apply_sample_augmentations(samples,
     try:
         for augmentation in augmentations:
             augmentation.start(buffering=buffering)
-        context = AugmentationContext(audio_type, augmentations)
+        context = AugmentationContext(audio_type, augmentations, audio_dtype=audio_dtype)
+        batched = batch_size > 1
+        if batched:
+            fun, items = _load_and_augment_batch, _batch_items(timed_samples(), batch_size)
+        else:
+            fun, items = _load_and_augment_sample, timed_samples()
         if process_ahead == 0:
-            for timed_sample in timed_samples():
-                yield _load_and_augment_sample(timed_sample, context=context)
+            yield from _unbatch_samples((fun(item, context=context) for item in items), batched)
         else:
-            with LimitingPool(process_ahead=process_ahead,
-                              initializer=_init_augmentation_worker,
-                              initargs=(context,)) as pool:
-                yield from pool.imap(_load_and_augment_sample, timed_samples())
+            process_ahead = os.cpu_count() if process_ahead is None else process_ahead
+            # Pool items are batches - but process_ahead counts samples
+            process_ahead = max(1, int(math.ceil(process_ahead / batch_size)))
+            with SharedAudioSlots(process_ahead + 2, slot_size=slot_size * batch_size) as slots, \
+                    LimitingPool(process_ahead=process_ahead,
+                                 initializer=_init_augmentation_worker,
+                                 initargs=(context,)) as pool:
+                yield from _unbatch_samples(slots.imap(pool, fun, items), batched)
     finally:
         for augmentation in augmentations:
             augmentation.stop()
@@ -243,24 +309,104 @@ def _enqueue_overlay_samples(sample_source, queue, buffering=BUFFER_SIZE):
             queue.put(sample)
 
 
+def get_overlay_bank_meta_path(bank_path):
+    return bank_path + '.json'
+
+
+def write_overlay_bank(sample_source, bank_path, buffering=BUFFER_SIZE):
+    """
+    Decodes (in parallel) all samples of a sample source and writes their concatenated audio data
+    as raw np.float32 values into a file. Data is streamed into the file, so that the bank does not have to fit
+    into memory. As its length is only known in the end, the shape of the bank goes into a JSON file next to it
+    (see `get_overlay_bank_meta_path`), which gets written last - a bank is only complete once this file exists.
+    """
+    samples = samples_from_source(sample_source, buffering=buffering, labeled=False)
+    tmp_bank_path = bank_path + '.tmp'
+    num_samples = 0
+    with open(tmp_bank_path, 'wb') as bank_file:
+        for sample in change_audio_types(samples, audio_type=AUDIO_TYPE_NP):
+            audio = np.ascontiguousarray(sample.audio, dtype=np.float32)
+            bank_file.write(memoryview(audio).cast('B'))
+            num_samples += len(audio)
+    if num_samples == 0:
+        os.remove(tmp_bank_path)
+        raise ValueError('Overlay source "{}" contains no audio data'.format(sample_source))
+    os.replace(tmp_bank_path, bank_path)
+    meta_path = get_overlay_bank_meta_path(bank_path)
+    with open(meta_path + '.tmp', 'w', encoding='utf8') as meta_file:
+        json.dump({'dtype': np.dtype(np.float32).str, 'shape': [num_samples, 1]}, meta_file)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def read_overlay_bank(bank_path):
+    """Memory-maps an overlay bank that got written by `write_overlay_bank` as np.float32 array of shape (samples, 1)."""
+    with open(get_overlay_bank_meta_path(bank_path), 'r', encoding='utf8') as meta_file:
+        meta = json.load(meta_file)
+    dtype, shape = np.dtype(meta['dtype']), tuple(meta['shape'])
+    if os.path.getsize(bank_path) != dtype.itemsize * int(np.prod(shape)):
+        raise ValueError('Size of overlay bank "{}" does not match its shape - delete it to have it rebuilt'
+                         .format(bank_path))
+    return np.memmap(bank_path, dtype=dtype, mode='r', shape=shape)
+
+
 class Overlay(SampleAugmentation):
     """See "Overlay augmentation" in training documentation"""
-    def __init__(self, source, p=1.0, snr=3.0, layers=1):
+    def __init__(self, source, p=1.0, snr=3.0, layers=1, bank=None):
         super(Overlay, self).__init__(p)
         self.source = source
         self.snr = float_range(snr)
         self.layers = int_range(layers)
+        self.bank = bank
+        self.bank_data = None
         self.current_sample = None
         self.queue = None
         self.enqueue_process = None
 
     def start(self, buffering=BUFFER_SIZE):
+        if self.bank is not None:
+            if not os.path.isfile(get_overlay_bank_meta_path(self.bank)):
+                write_overlay_bank(self.source, self.bank, buffering=buffering)
+            self.bank_data = None  # gets memory-mapped by every worker on first use
+            return
         self.queue = Queue(max(1, math.floor(self.probability * self.layers[1] * os.cpu_count())))
         self.enqueue_process = Process(target=_enqueue_overlay_samples,
                                        args=(self.source, self.queue),
                                        kwargs={'buffering': buffering})
         self.enqueue_process.start()
 
+    def _add_layer_from_queue(self, overlay_data):
+        overlay_offset = 0
+        while overlay_offset < len(overlay_data):
+            if self.current_sample is None:
+                next_overlay_sample = self.queue.get()
+                next_overlay_sample = unpack_maybe(next_overlay_sample)
+                if next_overlay_sample.audio_type == AUDIO_TYPE_OPUS:
+                    # Opus samples (e.g. from SDBs) get decoded window by window as they get consumed
+                    self.current_sample = OpusWindowReader(next_overlay_sample.audio)
+                else:
+                    next_overlay_sample.change_audio_type(new_audio_type=AUDIO_TYPE_NP)
+                    self.current_sample = next_overlay_sample.audio
+            n_taken = min(len(overlay_data) - overlay_offset, len(self.current_sample))
+            if isinstance(self.current_sample, OpusWindowReader):
+                overlay_data[overlay_offset:overlay_offset + n_taken] += self.current_sample.read(n_taken)
+            else:  # take required slice from head and keep tail for next layer or sample
+                overlay_data[overlay_offset:overlay_offset + n_taken] += self.current_sample[0:n_taken]
+                self.current_sample = self.current_sample[n_taken:]
+            overlay_offset += n_taken
+            if len(self.current_sample) == 0:
+                self.current_sample = None
+
+    def _add_layer_from_bank(self, overlay_data):
+        if self.bank_data is None:
+            self.bank_data = read_overlay_bank(self.bank)
+        bank_offset = random.randrange(len(self.bank_data))
+        overlay_offset = 0
+        while overlay_offset < len(overlay_data):  # wraps around at the end of the bank
+            n_taken = min(len(overlay_data) - overlay_offset, len(self.bank_data) - bank_offset)
+            overlay_data[overlay_offset:overlay_offset + n_taken] += self.bank_data[bank_offset:bank_offset + n_taken]
+            overlay_offset += n_taken
+            bank_offset = 0
+
     def apply(self, sample, clock=0.0):
         sample = unpack_maybe(sample)
         sample.change_audio_type(new_audio_type=AUDIO_TYPE_NP)
@@ -268,23 +414,10 @@ class Overlay(SampleAugmentation):
         audio = sample.audio
         overlay_data = np.zeros_like(audio)
         for _ in range(n_layers):
-            overlay_offset = 0
-            while overlay_offset < len(audio):
-                if self.current_sample is None:
-                    next_overlay_sample = self.queue.get()
-                    next_overlay_sample = unpack_maybe(next_overlay_sample)
-                    next_overlay_sample.change_audio_type(new_audio_type=AUDIO_TYPE_NP)
-                    self.current_sample = next_overlay_sample.audio
-                n_required = len(audio) - overlay_offset
-                n_current = len(self.current_sample)
-                if n_required >= n_current:  # take it completely
-                    overlay_data[overlay_offset:overlay_offset + n_current] += self.current_sample
-                    overlay_offset += n_current
-                    self.current_sample = None
-                else:  # take required slice from head and keep tail for next layer or sample
-                    overlay_data[overlay_offset:overlay_offset + n_required] += self.current_sample[0:n_required]
-                    overlay_offset += n_required
-                    self.current_sample = self.current_sample[n_required:]
+            if self.bank is None:
+                self._add_layer_from_queue(overlay_data)
+            else:
+                self._add_layer_from_bank(overlay_data)
         snr_db = pick_value_from_range(self.snr, clock=clock)
         orig_dbfs = max_dbfs(audio)
         overlay_gain = orig_dbfs - max_dbfs(overlay_data) - snr_db
@@ -297,6 +430,7 @@ class Overlay(SampleAugmentation):
             self.enqueue_process = None
         self.current_sample = None
         self.queue = None
+        self.bank_data = None
 
 
 class Codec(SampleAugmentation):
@@ -307,8 +441,9 @@ class Codec(SampleAugmentation):
 
     def apply(self, sample, clock=0.0):
         bitrate = pick_value_from_range(self.bitrate, clock=clock)
-        sample.change_audio_type(new_audio_type=AUDIO_TYPE_PCM)  # decoding to ensure it has to get encoded again
-        sample.change_audio_type(new_audio_type=AUDIO_TYPE_OPUS, bitrate=bitrate)  # will get decoded again downstream
+        sample.change_audio_type(new_audio_type=AUDIO_TYPE_NP)
+        audio = opus_round_trip(np_to_dtype(sample.audio, AUDIO_DTYPE_INT16), sample.audio_format.rate, bitrate=bitrate)
+        sample.audio = audio.astype(np.float32) / np.iinfo(np.int16).max
 
 
 class Reverb(SampleAugmentation):
@@ -328,44 +463,31 @@ class Reverb(SampleAugmentation):
         result = np.copy(audio)
         primes = [17, 19, 23, 29, 31]
         for delay_prime in primes:  # primes to minimize comb filter interference
-            layer = np.copy(audio)
             n_delay = math.floor(delay * (delay_prime / primes[0]) * sample.audio_format.rate / 1000.0)
             n_delay = max(16, n_delay)  # 16 samples minimum to avoid performance trap and risk of division by zero
-            for w_index in range(0, math.floor(len(audio) / n_delay)):
-                w1 = w_index * n_delay
-                w2 = (w_index + 1) * n_delay
-                width = min(len(audio) - w2, n_delay)  # last window could be smaller
-                layer[w2:w2 + width] += decay * layer[w1:w1 + width]
-            result += layer
+            result += feedback_comb_filter(audio, n_delay, decay)
         audio = normalize_audio(result, dbfs=orig_dbfs)
         sample.audio = np.array(audio, dtype=np.float32)
 
 
 class Resample(SampleAugmentation):
     """See "Resample augmentation" in training documentation"""
+    # Intermediate sample rates get rounded to multiples of this (in Hz),
+    # which keeps the number and sizes of (cached) resampling filter designs small
+    rate_step = 100
+
     def __init__(self, p=1.0, rate=8000):
         super(Resample, self).__init__(p)
         self.rate = int_range(rate)
 
     def apply(self, sample, clock=0.0):
-        # late binding librosa and its dependencies
-        # pre-importing sklearn fixes https://github.com/scikit-learn/scikit-learn/issues/14485
-        import sklearn  # pylint: disable=import-outside-toplevel
-        from librosa.core import resample  # pylint: disable=import-outside-toplevel
         sample.change_audio_type(new_audio_type=AUDIO_TYPE_NP)
         rate = pick_value_from_range(self.rate, clock=clock)
+        rate = max(1, int(round(rate / self.rate_step))) * self.rate_step
         audio = sample.audio
-        orig_len = len(audio)
-        audio = np.swapaxes(audio, 0, 1)
-        if audio.shape[0] < 2:
-            # since v0.8 librosa enforces a shape of (samples,) instead of (channels, samples) for mono samples
-            resampled = resample(audio[0], sample.audio_format.rate, rate)
-            audio[0] = resample(resampled, rate, sample.audio_format.rate)[:orig_len]
-        else:
-            audio = resample(audio, sample.audio_format.rate, rate)
-            audio = resample(audio, rate, sample.audio_format.rate)
-        audio = np.swapaxes(audio, 0, 1)[0:orig_len]
-        sample.audio = audio
+        orig_rate = sample.audio_format.rate
+        # Round trip results are never shorter than the original
+        sample.audio = resample(resample(audio, orig_rate, rate), rate, orig_rate)[:len(audio)]
 
 
 class Volume(SampleAugmentation):
@@ -376,9 +498,29 @@ class Volume(SampleAugmentation):
 
     def apply(self, sample, clock=0.0):
         sample.change_audio_type(new_audio_type=AUDIO_TYPE_NP)
+        if len(sample.audio) == 0:  # nothing to normalize
+            return
         target_dbfs = pick_value_from_range(self.target_dbfs, clock=clock)
         sample.audio = normalize_audio(sample.audio, dbfs=target_dbfs)
 
+    def apply_batch(self, samples, clocks):
+        for sample in samples:
+            sample.change_audio_type(new_audio_type=AUDIO_TYPE_NP)
+        # Like apply, empty samples are kept as they are
+        samples_and_clocks = [(sample, clock) for sample, clock in zip(samples, clocks) if len(sample.audio) > 0]
+        if len(samples_and_clocks) == 0:
+            return
+        samples, clocks = zip(*samples_and_clocks)
+        batch, lengths = stack_padded([sample.audio for sample in samples])
+        target_dbfs = np.array([pick_value_from_range(self.target_dbfs, clock=clock) for clock in clocks])
+        # Vectorized normalize_audio (with max_dbfs and gain_db_to_ratio) - zero padding does not change peak levels
+        peaks_dbfs = 20.0 * np.log10(np.maximum(1e-16, np.max(np.abs(batch.reshape((len(samples), -1))), axis=1)))
+        gains = np.power(10.0, (target_dbfs - (peaks_dbfs + 3.0103)) / 20.0)
+        batch *= gains.astype(batch.dtype).reshape((-1,) + (1,) * (batch.ndim - 1))
+        np.clip(batch, -1.0, 1.0, out=batch)
+        for sample, audio, length in zip(samples, batch, lengths):
+            sample.audio = audio[:length].copy()  # views would keep the whole padded batch alive
+
 
 class Pitch(GraphAugmentation):
     """See "Pitch augmentation" in training documentation"""
@@ -13,6 +13,7 @@ from .gpu import get_available_gpus
 from .logging import log_error, log_warn
 from .helpers import parse_file_size
 from .augmentations import parse_augmentations
+from .audio import shared_memory_available
 from .io import path_exists_remote
 
 class ConfigSingleton:
@@ -38,6 +39,11 @@ def initialize_globals():
                  'epoch will be repeated on all following epochs. This could lead to unintended over-fitting. '
                  'You could use --cache_for_epochs <n_epochs> to invalidate the cache after a given number of epochs.')
 
+    if FLAGS.train_buckets > 0 and FLAGS.feature_cache:
+        log_warn('Due to current feature-cache settings the sample order of duration buckets (--train_buckets) of '
+                 'the first epoch will be repeated on all following epochs (till the cache gets invalidated by '
+                 '--cache_for_epochs).')
+
     # Caching
     if FLAGS.cache_for_epochs == 1:
         log_warn('--cache_for_epochs == 1 is (re-)creating the feature cache on every epoch but will never use it.')
@@ -45,6 +51,16 @@ def initialize_globals():
     # Read-buffer
     FLAGS.read_buffer = parse_file_size(FLAGS.read_buffer)
 
+    # Shared memory slots for passing samples from augmentation workers
+    FLAGS.sample_slot_size = parse_file_size(FLAGS.sample_slot_size)
+    if FLAGS.sample_slot_size > 0 and not shared_memory_available():
+        log_error('--sample_slot_size requires multiprocessing.shared_memory (Python 3.8+). '
+                  'Set it to 0 to pickle samples instead.')
+        sys.exit(1)
+
+    # Validation sample cache
+    FLAGS.dev_sample_cache = parse_file_size(FLAGS.dev_sample_cache)
+
     # Set default dropout rates
     if FLAGS.dropout_rate2 < 0:
         FLAGS.dropout_rate2 = FLAGS.dropout_rate
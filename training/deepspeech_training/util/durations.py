@@ -0,0 +1,136 @@
+import os
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .audio import (
+    AUDIO_TYPE_WAV,
+    AUDIO_TYPE_OPUS,
+    get_audio_type_from_extension,
+    get_num_samples,
+    read_opus_header,
+    read_wav_header
+)
+
+DEFAULT_PROBE_WORKERS = 32
+
+
+def probe_num_frames(audio_path, audio_type=None):
+    """
+    Determines number of frames and audio format of a local audio file by only parsing its header.
+
+    Parameters
+    ----------
+    audio_path : str
+        Path to the audio file
+    audio_type : str
+        Audio type of the file (util.audio.AUDIO_TYPE_WAV or util.audio.AUDIO_TYPE_OPUS).
+        If None, it gets derived from the file extension (falling back to util.audio.AUDIO_TYPE_WAV).
+
+    Returns
+    -------
+    tuple of (number of frames, util.audio.AudioFormat)
+    """
+    if audio_type is None:
+        audio_type = get_audio_type_from_extension(os.path.splitext(audio_path)[1].lower()) or AUDIO_TYPE_WAV
+    with open(audio_path, 'rb') as audio_file:
+        if audio_type == AUDIO_TYPE_WAV:
+            return read_wav_header(audio_file)
+        if audio_type == AUDIO_TYPE_OPUS:
+            pcm_buffer_size, audio_format = read_opus_header(audio_file)
+            return get_num_samples(pcm_buffer_size, audio_format), audio_format
+    raise ValueError('Unsupported audio type: {}'.format(audio_type))
+
+
+def probe_duration(audio_path, audio_type=None):
+    """Determines the duration (in seconds) of a local audio file by only parsing its header
+    (see util.durations.probe_num_frames)"""
+    num_frames, audio_format = probe_num_frames(audio_path, audio_type=audio_type)
+    return num_frames / audio_format.rate
+
+
+class DurationCache:
+    """
+    On-disk (JSON) cache of audio file durations.
+    Entries are keyed by file path and only valid as long as size and modification time of the file did not change.
+    Thread-safe, so that it can be shared by concurrent probing threads.
+    """
+    def __init__(self, cache_filename=None):
+        """
+        Parameters
+        ----------
+        cache_filename : str
+            Path to the cache file. If None, durations are only cached in memory.
+        """
+        self.cache_filename = cache_filename
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        if cache_filename is not None:
+            try:
+                with open(cache_filename, 'r', encoding='utf8') as cache_file:
+                    self.entries = json.load(cache_file)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, audio_path, stat):
+        with self.lock:
+            entry = self.entries.get(audio_path, None)
+        if entry is not None and len(entry) == 3 and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+            return entry[2]
+        return None
+
+    def put(self, audio_path, stat, duration):
+        with self.lock:
+            self.entries[audio_path] = [stat.st_size, stat.st_mtime, duration]
+            self.dirty = True
+
+    def save(self):
+        """Writes the cache file, if there are new entries. Failing to do so (e.g. read-only directory) is ignored,
+        as the durations will just get probed again next time."""
+        if self.cache_filename is None or not self.dirty:
+            return
+        with self.lock:
+            try:
+                with open(self.cache_filename, 'w', encoding='utf8') as cache_file:
+                    json.dump(self.entries, cache_file)
+                self.dirty = False
+            except OSError:
+                pass
+
+
+def probe_durations(audio_paths, cache_filename=None, audio_type=None, workers=DEFAULT_PROBE_WORKERS):
+    """
+    Determines the durations of local audio files by parsing their headers in parallel threads.
+
+    Parameters
+    ----------
+    audio_paths : list of str
+        Paths to the audio files to probe
+    cache_filename : str or util.durations.DurationCache
+        Optional path to a (JSON) cache file (or an already loaded cache) with durations of already probed files.
+        The cache file gets updated with newly probed durations.
+    audio_type : str
+        Audio type of all files (see util.durations.probe_num_frames) - if None, derived from the file extensions
+    workers : int
+        Number of probing threads - as probing is I/O bound, this can be considerably higher than the CPU count
+
+    Returns
+    -------
+    list of float durations (in seconds) in the order of audio_paths
+    """
+    cache = cache_filename if isinstance(cache_filename, DurationCache) else DurationCache(cache_filename)
+
+    def probe(audio_path):
+        stat = os.stat(audio_path)
+        duration = cache.get(audio_path, stat)
+        if duration is None:
+            duration = probe_duration(audio_path, audio_type=audio_type)
+            cache.put(audio_path, stat, duration)
+        return duration
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        durations = list(executor.map(probe, audio_paths))
+    cache.save()
+    return durations
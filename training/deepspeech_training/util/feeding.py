@@ -13,12 +13,23 @@ from .config import Config
 from .text import text_to_char_array
 from .flags import FLAGS
 from .augmentations import apply_sample_augmentations, apply_graph_augmentations
-from .audio import read_frames_from_file, vad_split, pcm_to_np, DEFAULT_FORMAT
-from .sample_collections import samples_from_sources
+from .audio import read_frames, vad_split, vad_split_buffer, energy_vad_split_buffer, resolve_vad_method, pcm_to_np, \
+    AudioFile, DEFAULT_FORMAT, VAD_METHOD_AUTO, VAD_METHOD_ENERGY, AUDIO_DTYPE_FLOAT32
+from .sample_collections import samples_from_sources, DurationBuckets, CachedSampleSet
 from .helpers import remember_exception, MEGABYTE
+from .logging import log_warn
+
+# Audio files with up to this many bytes of PCM data get VAD-split in memory - longer ones get streamed
+VAD_MAX_BUFFER_SIZE = 256 * MEGABYTE
 
 
 def audio_to_features(audio, sample_rate, transcript=None, clock=0.0, train_phase=False, augmentations=None, sample_id=None):
+    # Audio might be kept in a more compact representation till here (see util.audio.np_to_dtype)
+    if audio.dtype == tf.int16:
+        audio = tf.cast(audio, tf.float32) / np.iinfo(np.int16).max
+    elif audio.dtype != tf.float32:
+        audio = tf.cast(audio, tf.float32)
+
     if train_phase:
         # We need the lambdas to make TensorFlow happy.
         # pylint: disable=unnecessary-lambda
@@ -94,14 +105,49 @@ def create_dataset(sources,
                    limit=0,
                    exception_box=None,
                    process_ahead=None,
-                   buffering=1 * MEGABYTE):
+                   buffering=1 * MEGABYTE,
+                   use_mmap=False,
+                   probe_durations=False,
+                   buckets=0,
+                   sample_cache=None,
+                   slot_size=0,
+                   audio_dtype=AUDIO_DTYPE_FLOAT32,
+                   augmentation_batch_size=1,
+                   min_duration=None,
+                   max_duration=None):
     epoch_counter = Counter()  # survives restarts of the dataset and its generator
+    bucketed_samples = []  # duration buckets get determined once and survive restarts as well
+    cached_set = None  # survives restarts as well
 
-    def generate_values():
-        epoch = epoch_counter['epoch']
-        if train_phase:
-            epoch_counter['epoch'] += 1
-        samples = samples_from_sources(sources, buffering=buffering, labeled=True, reverse=reverse)
+    def warn_cache_overflow():
+        log_warn('Sample cache of {} bytes has not enough space left (next to other cached sets) for all samples '
+                 'of {} - they will be loaded again on every epoch'.format(sample_cache.max_size, ', '.join(sources)))
+
+    if sample_cache is not None and not train_phase:  # augmented samples differ on every epoch
+        cached_set = CachedSampleSet(sample_cache, on_overflow=warn_cache_overflow)
+
+    def load_samples(epoch):
+        if buckets > 0:
+            if not bucketed_samples:
+                samples = samples_from_sources(sources,
+                                               buffering=buffering,
+                                               labeled=True,
+                                               use_mmap=use_mmap,
+                                               probe_durations=probe_durations,
+                                               random_access=True,
+                                               min_duration=min_duration,
+                                               max_duration=max_duration)
+                bucketed_samples.append(DurationBuckets(samples, batch_size, buckets))
+            samples = bucketed_samples[0].shuffle(FLAGS.random_seed + epoch)
+        else:
+            samples = samples_from_sources(sources,
+                                           buffering=buffering,
+                                           labeled=True,
+                                           reverse=reverse,
+                                           use_mmap=use_mmap,
+                                           probe_durations=probe_durations,
+                                           min_duration=min_duration,
+                                           max_duration=max_duration)
         num_samples = len(samples)
         if limit > 0:
             num_samples = min(limit, num_samples)
@@ -110,7 +156,23 @@ def create_dataset(sources,
                                              buffering=buffering,
                                              process_ahead=2 * batch_size if process_ahead is None else process_ahead,
                                              clock=epoch / epochs,
-                                             final_clock=(epoch + 1) / epochs)
+                                             final_clock=(epoch + 1) / epochs,
+                                             slot_size=slot_size,
+                                             audio_dtype=audio_dtype,
+                                             batch_size=augmentation_batch_size)
+        return num_samples, samples
+
+    def generate_values():
+        epoch = epoch_counter['epoch']
+        if train_phase:
+            epoch_counter['epoch'] += 1
+        if cached_set is not None and cached_set.is_cached():
+            num_samples = len(cached_set.sample_ids)
+            samples = cached_set.get_samples()
+        else:
+            num_samples, samples = load_samples(epoch)
+            if cached_set is not None and cached_set.cacheable:
+                samples = cached_set.cache(samples, num_samples)
         for sample_index, sample in enumerate(samples):
             if sample_index >= num_samples:
                 break
@@ -136,7 +198,7 @@ def create_dataset(sources,
     process_fn = partial(entry_to_features, train_phase=train_phase, augmentations=augmentations)
 
     dataset = (tf.data.Dataset.from_generator(remember_exception(generate_values, exception_box),
-                                              output_types=(tf.string, tf.float32, tf.int32,
+                                              output_types=(tf.string, tf.as_dtype(audio_dtype), tf.int32,
                                                             (tf.int64, tf.int32, tf.int64), tf.float64))
                               .map(process_fn, num_parallel_calls=tf.data.experimental.AUTOTUNE))
     if cache_path:
@@ -152,14 +214,27 @@ def split_audio_file(audio_path,
                      aggressiveness=3,
                      outlier_duration_ms=10000,
                      outlier_batch_size=1,
-                     exception_box=None):
+                     exception_box=None,
+                     vad_method=VAD_METHOD_AUTO):
+    vad_method = resolve_vad_method(vad_method)
+
     def generate_values():
-        frames = read_frames_from_file(audio_path)
-        segments = vad_split(frames, aggressiveness=aggressiveness)
-        for segment in segments:
-            segment_buffer, time_start, time_end = segment
-            samples = pcm_to_np(segment_buffer, audio_format)
-            yield time_start, time_end, samples
+        with AudioFile(audio_path, audio_format=audio_format) as wav_file:
+            num_frames = wav_file.getnframes()
+            if vad_method == VAD_METHOD_ENERGY:
+                # Energy based VAD processes the whole signal at once
+                pcm_data = wav_file.readframes(num_frames)
+                segments = energy_vad_split_buffer(pcm_data, audio_format=audio_format, aggressiveness=aggressiveness)
+            elif num_frames * audio_format.channels * audio_format.width <= VAD_MAX_BUFFER_SIZE:
+                # Classifies all frames in one go and returns segments as views of pcm_data
+                pcm_data = wav_file.readframes(num_frames)
+                segments = vad_split_buffer(pcm_data, audio_format=audio_format, aggressiveness=aggressiveness)
+            else:
+                segments = vad_split(read_frames(wav_file), audio_format=audio_format, aggressiveness=aggressiveness)
+            for segment in segments:
+                segment_buffer, time_start, time_end = segment
+                samples = pcm_to_np(segment_buffer, audio_format)
+                yield time_start, time_end, samples
 
     def to_mfccs(time_start, time_end, samples):
         features, features_len = audio_to_features(samples, audio_format.rate)
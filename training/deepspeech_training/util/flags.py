@@ -18,6 +18,11 @@ def create_flags():
     f.DEFINE_string('metrics_files', '', 'comma separated list of files specifying the datasets used for tracking of metrics (after validation step). Currently the only metric is the CTC loss but without affecting the tracking of best validation loss. Multiple files will get reported separately. If empty, metrics will not be computed.')
 
     f.DEFINE_string('read_buffer', '1MB', 'buffer-size for reading samples from datasets (supports file-size suffixes KB, MB, GB, TB)')
+    f.DEFINE_boolean('probe_durations', False, 'order samples of CSV files by their exact durations (read from the headers of their local WAV files by parallel threads) instead of by column wav_filesize - durations get cached in a ".durations" file next to each CSV file')
+    f.DEFINE_boolean('read_mmap', False, 'memory-map local SDB and tar files and read their samples without copying them - sample loading processes map the files as well and receive only sample locations - --read_buffer is ignored for such files')
+    f.DEFINE_string('sample_slot_size', '0', 'if > 0, decoded audio of samples is passed from augmentation workers to the training process through shared memory slots of this size (supports file-size suffixes KB, MB, GB, TB) instead of being pickled - samples exceeding it are pickled as usual - requires Python 3.8+ and enough shared memory (e.g. /dev/shm) for about four batches of slots')
+    f.DEFINE_enum('audio_dtype', 'float32', ['float32', 'float16', 'int16'], 'data type of decoded (and augmented) audio on its way from the sample loading processes into the TensorFlow graph, where it gets converted to float32 - float16 and int16 halve inter-process and buffer memory (allowing for more samples being processed ahead) - int16 clips augmented signals to [-1.0, 1.0]')
+    f.DEFINE_string('dev_sample_cache', '0', 'size of an in-memory LRU cache of decoded validation and metrics samples (supports file-size suffixes KB, MB, GB, TB) - sets that fit into its remaining space (next to the sets evaluated before them) are not read and decoded again on following epochs - 0 disables the cache')
     f.DEFINE_string('feature_cache', '', 'cache MFCC features to disk to speed up future training runs on the same data. This flag specifies the path where cached features extracted from --train_files will be saved. If empty, or if online augmentation flags are enabled, caching will be disabled.')
     f.DEFINE_integer('cache_for_epochs', 0, 'after how many epochs the feature cache is invalidated again - 0 for "never"')
 
@@ -29,6 +34,7 @@ def create_flags():
     # ================
 
     f.DEFINE_multi_string('augment', None, 'specifies an augmentation of the training samples. Format is "--augment operation[param1=value1, ...]"')
+    f.DEFINE_integer('augmentation_batch_size', 1, 'number of consecutive (similarly long) training samples that get augmented together by one augmentation worker - sample augmentations like volume then process them at once (vectorized)')
 
     # Global Constants
     # ================
@@ -79,6 +85,9 @@ def create_flags():
     f.DEFINE_boolean('reverse_train', False, 'if to reverse sample order of the train set')
     f.DEFINE_boolean('reverse_dev', False, 'if to reverse sample order of the dev set')
     f.DEFINE_boolean('reverse_test', False, 'if to reverse sample order of the test set')
+    f.DEFINE_float('train_min_duration', 0.0, 'if > 0, training samples of Parquet and Arrow IPC files that are shorter than this (in seconds, according to their duration column) are skipped - for Parquet files the filter is applied while reading the file')
+    f.DEFINE_float('train_max_duration', 0.0, 'if > 0, training samples of Parquet and Arrow IPC files that are longer than this (in seconds, according to their duration column) are skipped - for Parquet files the filter is applied while reading the file')
+    f.DEFINE_integer('train_buckets', 0, 'if > 0, training samples are grouped into this number of equally sized duration buckets and fed as randomly ordered batches of samples from the same bucket - reduces padding, ignores --reverse_train - requires known sample durations (SDB files with durations index or CSV files with --probe_durations) or CSV column wav_filesize')
 
     # Checkpointing
 
@@ -3,26 +3,39 @@ import os
 import io
 import csv
 import json
+import mmap
+import heapq
+import queue
 import tarfile
+import threading
+import numpy as np
 
 from pathlib import Path
 from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from .helpers import KILOBYTE, MEGABYTE, GIGABYTE, Interleaved, LenMap
 from .audio import (
     Sample,
+    MemoryViewIO,
     DEFAULT_FORMAT,
     AUDIO_TYPE_PCM,
     AUDIO_TYPE_OPUS,
+    AUDIO_TYPE_WAV,
     SERIALIZABLE_AUDIO_TYPES,
     get_audio_type_from_extension,
     write_wav
 )
 from .io import open_remote, is_remote_path
+from .durations import probe_durations as probe_audio_durations
 
 BIG_ENDIAN = 'big'
 INT_SIZE = 4
 BIGINT_SIZE = 2 * INT_SIZE
+BIGINT_DTYPE = np.dtype('>u8')
+DURATION_DTYPE = np.dtype('>f4')
+LENGTH_DTYPE = np.dtype('>u4')
 MAGIC = b'SAMPLEDB'
 
 BUFFER_SIZE = 1 * MEGABYTE
@@ -30,16 +43,33 @@ REVERSE_BUFFER_SIZE = 16 * KILOBYTE
 CACHE_SIZE = 1 * GIGABYTE
 
 SCHEMA_KEY = 'schema'
+INDEX_KEY = 'index'
 CONTENT_KEY = 'content'
 MIME_TYPE_KEY = 'mime-type'
 MIME_TYPE_TEXT = 'text/plain'
 CONTENT_TYPE_SPEECH = 'speech'
 CONTENT_TYPE_TRANSCRIPT = 'transcript'
+SHARDS_KEY = 'shards'
+SHARD_FILENAME_KEY = 'filename'
+SHARD_NUM_SAMPLES_KEY = 'num-samples'
+SHARD_MIN_DURATION_KEY = 'min-duration'
+SHARD_MAX_DURATION_KEY = 'max-duration'
+DEFAULT_SHARD_SIZE = 100000
+DEFAULT_SHARD_READ_WORKERS = 4
+DEFAULT_SHARD_READ_AHEAD = 64
+TAR_CSV_NAME = 'samples.csv'
+TAR_INDEX_SUFFIX = '.index'
+DURATIONS_SUFFIX = '.durations'
+INDEX_DURATION = 'duration'
+INDEX_TRANSCRIPT_LENGTH = 'transcript-length'
+INDEX_DTYPES = {INDEX_DURATION: DURATION_DTYPE, INDEX_TRANSCRIPT_LENGTH: LENGTH_DTYPE}
 
 
 class LabeledSample(Sample):
     """In-memory labeled audio sample representing an utterance.
     Derived from util.audio.Sample and used by sample collection readers and writers."""
+    __slots__ = ('transcript',)
+
     def __init__(self, audio_type, raw_data, transcript, audio_format=DEFAULT_FORMAT, sample_id=None):
         """
         Parameters
@@ -123,6 +153,7 @@ class DirectSDBWriter:
                  buffering=BUFFER_SIZE,
                  audio_type=AUDIO_TYPE_OPUS,
                  bitrate=None,
+                 frame_index=False,
                  id_prefix=None,
                  labeled=True):
         """
@@ -136,6 +167,8 @@ class DirectSDBWriter:
             See util.audio.Sample.__init__ .
         bitrate : int
             Bitrate for sample-compression in case of lossy audio_type (e.g. AUDIO_TYPE_OPUS)
+        frame_index : bool
+            If to write Opus samples with frame index (see util.audio.write_opus) in case of AUDIO_TYPE_OPUS
         id_prefix : str
             Prefix for IDs of written samples - defaults to sdb_filename
         labeled : bool or None
@@ -149,16 +182,22 @@ class DirectSDBWriter:
             raise ValueError('Audio type "{}" not supported'.format(audio_type))
         self.audio_type = audio_type
         self.bitrate = bitrate
+        self.frame_index = frame_index
         self.sdb_file = open_remote(sdb_filename, 'wb', buffering=buffering)
         self.offsets = []
+        self.durations = []
+        self.transcript_lengths = []
         self.num_samples = 0
 
         self.sdb_file.write(MAGIC)
 
-        schema_entries = [{CONTENT_KEY: CONTENT_TYPE_SPEECH, MIME_TYPE_KEY: audio_type}]
+        self.schema = [{CONTENT_KEY: CONTENT_TYPE_SPEECH, MIME_TYPE_KEY: audio_type}]
+        if self.labeled:
+            self.schema.append({CONTENT_KEY: CONTENT_TYPE_TRANSCRIPT, MIME_TYPE_KEY: MIME_TYPE_TEXT})
+        self.index_columns = [INDEX_DURATION]
         if self.labeled:
-            schema_entries.append({CONTENT_KEY: CONTENT_TYPE_TRANSCRIPT, MIME_TYPE_KEY: MIME_TYPE_TEXT})
-        meta_data = {SCHEMA_KEY: schema_entries}
+            self.index_columns.append(INDEX_TRANSCRIPT_LENGTH)
+        meta_data = {SCHEMA_KEY: self.schema, INDEX_KEY: self.index_columns}
         meta_data = json.dumps(meta_data).encode()
         self.write_big_int(len(meta_data))
         self.sdb_file.write(meta_data)
@@ -178,7 +217,7 @@ class DirectSDBWriter:
     def add(self, sample):
         def to_bytes(n):
             return n.to_bytes(INT_SIZE, BIG_ENDIAN)
-        sample.change_audio_type(self.audio_type, bitrate=self.bitrate)
+        sample.change_audio_type(self.audio_type, bitrate=self.bitrate, frame_index=self.frame_index)
         opus = sample.audio.getbuffer()
         opus_len = to_bytes(len(opus))
         if self.labeled:
@@ -190,11 +229,58 @@ class DirectSDBWriter:
             entry_len = to_bytes(len(opus_len) + len(opus))
             buffer = b''.join([entry_len, opus_len, opus])
         self.offsets.append(self.sdb_file.tell())
+        self.durations.append(sample.duration)
+        if self.labeled:
+            self.transcript_lengths.append(len(sample.transcript))
         self.sdb_file.write(buffer)
         sample.sample_id = '{}:{}'.format(self.id_prefix, self.num_samples)
         self.num_samples += 1
         return sample.sample_id
 
+    def add_sdb(self, sdb_filename, buffering=BUFFER_SIZE):
+        """
+        Appends all samples of another SDB file by copying their raw entries (without decoding or re-encoding them).
+
+        Parameters
+        ----------
+        sdb_filename : str
+            Path to the SDB file to append - it has to have the same schema (audio type and labeling)
+        buffering : int
+            Buffer size to use while copying the sample entries
+
+        Returns
+        -------
+        Number of appended samples
+        """
+        sdb = SDB(sdb_filename, buffering=buffering, labeled=self.labeled)
+        try:
+            if sdb.schema != self.schema:
+                raise ValueError('SDB file "{}" has an incompatible schema'.format(sdb_filename))
+            durations = sdb.durations
+            if durations is None:
+                durations = [sample.duration for sample in sdb]
+            transcript_lengths = sdb.transcript_lengths
+            if self.labeled and transcript_lengths is None:
+                transcript_lengths = [len(sample.transcript) for sample in sdb]
+            position = self.sdb_file.tell()
+            offsets = sdb.offsets.astype(np.int64) - sdb.sample_data_start + position
+            sdb.sdb_file.seek(sdb.sample_data_start)
+            remaining = sdb.sample_data_end - sdb.sample_data_start
+            while remaining > 0:
+                data = sdb.sdb_file.read(min(remaining, buffering))
+                if len(data) == 0:
+                    raise RuntimeError('Unexpected end of SDB file "{}"'.format(sdb_filename))
+                self.sdb_file.write(data)
+                remaining -= len(data)
+            self.offsets.extend(offsets.tolist())
+            self.durations.extend(list(durations))
+            if self.labeled:
+                self.transcript_lengths.extend(list(transcript_lengths))
+            self.num_samples += len(sdb)
+            return len(sdb)
+        finally:
+            sdb.close()
+
     def close(self):
         if self.sdb_file is None:
             return
@@ -205,11 +291,18 @@ class DirectSDBWriter:
 
         self.sdb_file.seek(offset_index + BIGINT_SIZE)
         self.write_big_int(self.num_samples)
-        for offset in self.offsets:
-            self.write_big_int(offset)
+        self.sdb_file.write(np.array(self.offsets, dtype=BIGINT_DTYPE).tobytes())
         offset_end = self.sdb_file.tell()
         self.sdb_file.seek(offset_index)
         self.write_big_int(offset_end - offset_index - BIGINT_SIZE)
+
+        self.sdb_file.seek(offset_end)
+        index_data = {INDEX_DURATION: self.durations, INDEX_TRANSCRIPT_LENGTH: self.transcript_lengths}
+        index_data = [np.array(index_data[column], dtype=INDEX_DTYPES[column]).tobytes()
+                      for column in self.index_columns]
+        self.write_big_int(sum(map(len, index_data)))
+        for column_data in index_data:
+            self.sdb_file.write(column_data)
         self.sdb_file.close()
         self.sdb_file = None
 
@@ -221,13 +314,16 @@ class DirectSDBWriter:
 
 
 class SDB:  # pylint: disable=too-many-instance-attributes
-    """Sample collection reader for reading a Sample DB (SDB) file"""
+    """Sample collection reader for reading a Sample DB (SDB) file.
+    If the SDB file has an index section, sample durations and transcript lengths are available as NumPy arrays
+    (attributes durations and transcript_lengths) without reading any audio data - otherwise these are None."""
     def __init__(self,
                  sdb_filename,
                  buffering=BUFFER_SIZE,
                  id_prefix=None,
                  labeled=True,
-                 reverse=False):
+                 reverse=False,
+                 use_mmap=False):
         """
         Parameters
         ----------
@@ -235,6 +331,7 @@ class SDB:  # pylint: disable=too-many-instance-attributes
             Path to the SDB file to read samples from
         buffering : int
             Read-ahead buffer size to use while reading the SDB file in normal order. Fixed to 16kB if in reverse-mode.
+            Ignored if the file gets memory-mapped.
         id_prefix : str
             Prefix for IDs of read samples - defaults to sdb_filename
         labeled : bool or None
@@ -242,11 +339,20 @@ class SDB:  # pylint: disable=too-many-instance-attributes
             If False: Ignores transcripts (if available) and reads (unlabeled) util.audio.Sample instances.
             If None: Automatically determines if SDB schema has transcripts
             (reading util.sample_collections.LabeledSample instances) or not (reading util.audio.Sample instances).
+        reverse : bool
+            If the order of the samples should be reversed
+        use_mmap : bool
+            If True and the SDB file is a local file, it gets memory-mapped and samples are served as memoryview
+            slices of the mapping (see util.audio.MemoryViewIO) without further copying or system calls.
+            Samples passed to worker processes only carry the location of their data, which workers map again.
         """
+        # Set before anything can fail, as close() (called by __del__) relies on them
+        self.sdb_file = None
+        self.sdb_mmap = None
+        self.sdb_view = None
         self.sdb_filename = sdb_filename
         self.id_prefix = sdb_filename if id_prefix is None else id_prefix
         self.sdb_file = open_remote(sdb_filename, 'rb', buffering=REVERSE_BUFFER_SIZE if reverse else buffering)
-        self.offsets = []
         if self.sdb_file.read(len(MAGIC)) != MAGIC:
             raise RuntimeError('No Sample Database')
         meta_chunk_len = self.read_big_int()
@@ -271,12 +377,37 @@ class SDB:  # pylint: disable=too-many-instance-attributes
                     raise RuntimeError('No transcript data (missing in schema)')
 
         sample_chunk_len = self.read_big_int()
+        self.sample_data_start = self.sdb_file.tell() + BIGINT_SIZE
+        self.sample_data_end = self.sdb_file.tell() + sample_chunk_len
         self.sdb_file.seek(sample_chunk_len + BIGINT_SIZE, 1)
         num_samples = self.read_big_int()
-        for _ in range(num_samples):
-            self.offsets.append(self.read_big_int())
+        offsets = np.frombuffer(self.sdb_file.read(num_samples * BIGINT_SIZE), dtype=BIGINT_DTYPE)
+        self.offsets = offsets.astype(np.uint64)  # native byte order
+
+        self.durations = None
+        self.transcript_lengths = None
+        if INDEX_KEY in self.meta:
+            self.read_big_int()  # index chunk length
+            for column in self.meta[INDEX_KEY]:
+                if column not in INDEX_DTYPES:
+                    break  # entry size of unknown columns is unknown
+                dtype = INDEX_DTYPES[column]
+                column_data = np.frombuffer(self.sdb_file.read(num_samples * dtype.itemsize), dtype=dtype)
+                column_data = column_data.astype(dtype.newbyteorder('='))
+                if column == INDEX_DURATION:
+                    self.durations = column_data
+                elif column == INDEX_TRANSCRIPT_LENGTH:
+                    self.transcript_lengths = column_data
+
         if reverse:
-            self.offsets.reverse()
+            self.offsets = self.offsets[::-1]
+            if self.durations is not None:
+                self.durations = self.durations[::-1]
+            if self.transcript_lengths is not None:
+                self.transcript_lengths = self.transcript_lengths[::-1]
+        if use_mmap and not is_remote_path(sdb_filename):
+            self.sdb_mmap = mmap.mmap(self.sdb_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.sdb_view = memoryview(self.sdb_mmap)
 
     def read_int(self):
         return int.from_bytes(self.sdb_file.read(INT_SIZE), BIG_ENDIAN)
@@ -309,7 +440,9 @@ class SDB:  # pylint: disable=too-many-instance-attributes
         if not 0 <= row_index < len(self.offsets):
             raise ValueError('Wrong sample index: {} - has to be between 0 and {}'
                              .format(row_index, len(self.offsets) - 1))
-        self.sdb_file.seek(self.offsets[row_index] + INT_SIZE)
+        if self.sdb_view is not None:
+            return self.read_mapped_row(row_index, columns)
+        self.sdb_file.seek(int(self.offsets[row_index]) + INT_SIZE)
         for index in range(len(self.schema)):
             chunk_len = self.read_int()
             if index in columns:
@@ -321,13 +454,32 @@ class SDB:  # pylint: disable=too-many-instance-attributes
                 self.sdb_file.seek(chunk_len, 1)
         return tuple(column_data)
 
+    def read_mapped_row(self, row_index, columns):
+        column_data = [None] * len(columns)
+        found = 0
+        position = int(self.offsets[row_index]) + INT_SIZE
+        for index in range(len(self.schema)):
+            chunk_len = int.from_bytes(self.sdb_view[position:position + INT_SIZE], BIG_ENDIAN)
+            position += INT_SIZE
+            if index in columns:
+                data = self.sdb_view[position:position + chunk_len]
+                if index == self.speech_index:
+                    # Referencing the mapped range by location keeps pickling it to worker processes copy-free
+                    data = MemoryViewIO(data, file_path=self.sdb_filename, file_offset=position)
+                column_data[columns.index(index)] = data
+                found += 1
+                if found == len(columns):
+                    break
+            position += chunk_len
+        return tuple(column_data)
+
     def __getitem__(self, i):
         sample_id = '{}:{}'.format(self.id_prefix, i)
         if self.transcript_index is None:
             [audio_data] = self.read_row(i, self.speech_index)
             return Sample(self.audio_type, audio_data, sample_id=sample_id)
         audio_data, transcript = self.read_row(i, self.speech_index, self.transcript_index)
-        transcript = transcript.decode()
+        transcript = bytes(transcript).decode()
         return LabeledSample(self.audio_type, audio_data, transcript, sample_id=sample_id)
 
     def __iter__(self):
@@ -338,13 +490,243 @@ class SDB:  # pylint: disable=too-many-instance-attributes
         return len(self.offsets)
 
     def close(self):
+        if self.sdb_view is not None:
+            self.sdb_view.release()
+            self.sdb_view = None
+        if self.sdb_mmap is not None:
+            try:
+                self.sdb_mmap.close()
+            except BufferError:
+                pass  # samples are still referencing the mapping - it will get unmapped once they are gone
+            self.sdb_mmap = None
         if self.sdb_file is not None:
             self.sdb_file.close()
+            self.sdb_file = None
 
     def __del__(self):
         self.close()
 
 
+class ShardedSDBWriter:  # pylint: disable=too-many-instance-attributes
+    """Sample collection writer for creating a sharded SDB - a manifest file listing a series of SDB shard files"""
+    def __init__(self,
+                 manifest_filename,
+                 shard_size=DEFAULT_SHARD_SIZE,
+                 buffering=BUFFER_SIZE,
+                 audio_type=AUDIO_TYPE_OPUS,
+                 bitrate=None,
+                 frame_index=False,
+                 id_prefix=None,
+                 labeled=True):
+        """
+        Parameters
+        ----------
+        manifest_filename : str
+            Path to the manifest file to write.
+            Shards are written next to it as files named like the manifest with shard number and extension .sdb .
+        shard_size : int
+            Number of samples per shard (the last shard could be smaller)
+        buffering : int
+            Write-buffer size to use while writing the shard files
+        audio_type : str
+            See util.audio.Sample.__init__ .
+        bitrate : int
+            Bitrate for sample-compression in case of lossy audio_type (e.g. AUDIO_TYPE_OPUS)
+        frame_index : bool
+            If to write Opus samples with frame index (see util.audio.write_opus) in case of AUDIO_TYPE_OPUS
+        id_prefix : str
+            Prefix for IDs of written samples - defaults to manifest_filename
+        labeled : bool or None
+            If True: Writes labeled samples (util.sample_collections.LabeledSample) only.
+            If False: Ignores transcripts (if available) and writes (unlabeled) util.audio.Sample instances.
+        """
+        if shard_size < 1:
+            raise ValueError('Shard size has to be positive')
+        self.manifest_filename = manifest_filename
+        self.shard_size = shard_size
+        self.buffering = buffering
+        self.audio_type = audio_type
+        self.bitrate = bitrate
+        self.frame_index = frame_index
+        self.id_prefix = manifest_filename if id_prefix is None else id_prefix
+        self.labeled = labeled
+        self.shards = []
+        self.shard_writer = None
+        self.num_samples = 0
+
+    def __enter__(self):
+        return self
+
+    def close_shard(self):
+        if self.shard_writer is None:
+            return
+        durations = self.shard_writer.durations
+        self.shards.append({
+            SHARD_FILENAME_KEY: os.path.basename(self.shard_writer.sdb_filename),
+            SHARD_NUM_SAMPLES_KEY: len(self.shard_writer),
+            SHARD_MIN_DURATION_KEY: min(durations) if durations else 0.0,
+            SHARD_MAX_DURATION_KEY: max(durations) if durations else 0.0
+        })
+        self.shard_writer.close()
+        self.shard_writer = None
+
+    def add(self, sample):
+        if self.shard_writer is not None and len(self.shard_writer) >= self.shard_size:
+            self.close_shard()
+        if self.shard_writer is None:
+            shard_filename = '{}.{:05d}.sdb'.format(os.path.splitext(self.manifest_filename)[0], len(self.shards))
+            self.shard_writer = DirectSDBWriter(shard_filename,
+                                                buffering=self.buffering,
+                                                audio_type=self.audio_type,
+                                                bitrate=self.bitrate,
+                                                frame_index=self.frame_index,
+                                                labeled=self.labeled)
+        self.shard_writer.add(sample)
+        sample.sample_id = '{}:{}'.format(self.id_prefix, self.num_samples)
+        self.num_samples += 1
+        return sample.sample_id
+
+    def close(self):
+        if self.shards is None:
+            return
+        self.close_shard()
+        with open_remote(self.manifest_filename, 'w') as manifest_file:
+            json.dump({SHARDS_KEY: self.shards}, manifest_file, indent=2)
+        self.shards = None
+
+    def __len__(self):
+        return self.num_samples
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ShardedSDB:
+    """Sample collection reader for reading a sharded SDB - a manifest file listing a series of SDB shard files.
+    The shards are combined in the order of the manifest (or reversed), which corresponds to sample order from
+    shortest to longest, if the sharded SDB got written from ordered samples by util.sample_collections.ShardedSDBWriter.
+    Each shard is read through its own file handle. During iteration up to read_workers shards are read ahead
+    in parallel threads (e.g. from different disks), while samples are still served in collection order."""
+    def __init__(self,
+                 manifest_filename,
+                 buffering=BUFFER_SIZE,
+                 labeled=True,
+                 reverse=False,
+                 use_mmap=False,
+                 read_workers=DEFAULT_SHARD_READ_WORKERS,
+                 read_ahead=DEFAULT_SHARD_READ_AHEAD):
+        """
+        Parameters
+        ----------
+        manifest_filename : str
+            Path to the manifest file of the sharded SDB
+        buffering : int
+            See util.sample_collections.SDB.__init__ .
+        labeled : bool or None
+            See util.sample_collections.SDB.__init__ .
+        reverse : bool
+            If the order of the samples should be reversed
+        use_mmap : bool
+            See util.sample_collections.SDB.__init__ .
+        read_workers : int
+            Maximum number of shards that get read in parallel during iteration - 1 reads shard after shard
+        read_ahead : int
+            Maximum number of samples per shard that get read ahead during iteration
+        """
+        self.manifest_filename = manifest_filename
+        self.read_workers = read_workers
+        self.read_ahead = read_ahead
+        with open_remote(manifest_filename, 'r', encoding='utf8') as manifest_file:
+            manifest = json.load(manifest_file)
+        if SHARDS_KEY not in manifest:
+            raise RuntimeError('No SDB manifest')
+        self.manifest = manifest[SHARDS_KEY]
+        base_dir = os.path.dirname(manifest_filename)
+        self.shards = []
+        for shard in self.manifest:
+            shard_filename = shard[SHARD_FILENAME_KEY]
+            if not os.path.isabs(shard_filename) and not is_remote_path(shard_filename):
+                shard_filename = os.path.join(base_dir, shard_filename)
+            sdb = SDB(shard_filename, buffering=buffering, labeled=labeled, reverse=reverse, use_mmap=use_mmap)
+            if len(sdb) != shard[SHARD_NUM_SAMPLES_KEY]:
+                raise RuntimeError('Number of samples in shard "{}" does not match manifest'.format(shard_filename))
+            self.shards.append(sdb)
+        if reverse:
+            self.shards.reverse()
+        self.bounds = np.cumsum([len(shard) for shard in self.shards])
+
+        def concatenate(attribute):
+            columns = [getattr(shard, attribute) for shard in self.shards]
+            if len(columns) == 0 or any(column is None for column in columns):
+                return None
+            return np.concatenate(columns)
+        self.durations = concatenate('durations')
+        self.transcript_lengths = concatenate('transcript_lengths')
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise ValueError('Wrong sample index: {} - has to be between 0 and {}'.format(i, len(self) - 1))
+        shard_index = int(np.searchsorted(self.bounds, i, side='right'))
+        if shard_index > 0:
+            i -= int(self.bounds[shard_index - 1])
+        return self.shards[shard_index][i]
+
+    def __iter__(self):
+        if self.read_workers < 2 or len(self.shards) < 2:
+            for shard in self.shards:
+                yield from shard
+            return
+        stopped = threading.Event()
+
+        def read_shard(shard, shard_queue):
+            # Runs in a reader thread - every shard is only accessed by its own thread during iteration
+            if stopped.is_set():
+                return
+            try:
+                for sample in shard:
+                    while not stopped.is_set():
+                        try:
+                            shard_queue.put((sample, None), timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    if stopped.is_set():
+                        return
+            except Exception as ex:  # pylint: disable=broad-except
+                shard_queue.put((None, ex))
+                return
+            shard_queue.put((None, None))
+
+        queues = [queue.Queue(maxsize=max(1, self.read_ahead)) for _ in self.shards]
+        # Readers get started in shard order, so the reader of the shard being consumed is always running
+        executor = ThreadPoolExecutor(max_workers=self.read_workers)
+        try:
+            for shard, shard_queue in zip(self.shards, queues):
+                executor.submit(read_shard, shard, shard_queue)
+            for shard_queue in queues:
+                while True:
+                    sample, ex = shard_queue.get()
+                    if ex is not None:
+                        raise ex
+                    if sample is None:
+                        break
+                    yield sample
+        finally:
+            stopped.set()
+            for shard_queue in queues:
+                # Unblocking readers that wait for space to put their end markers
+                while not shard_queue.empty():
+                    shard_queue.get_nowait()
+            executor.shutdown(wait=True)
+
+    def __len__(self):
+        return int(self.bounds[-1]) if len(self.bounds) > 0 else 0
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+
 class CSVWriter:  # pylint: disable=too-many-instance-attributes
     """Sample collection writer for writing a CSV data-set and all its referenced WAV samples"""
     def __init__(self,
@@ -474,7 +856,7 @@ class TarWriter:  # pylint: disable=too-many-instance-attributes
 
     def close(self):
         if self.csv_file and self.tar:
-            csv_tar = tarfile.TarInfo('samples.csv')
+            csv_tar = tarfile.TarInfo(TAR_CSV_NAME)
             csv_tar.size = self.csv_file.tell()
             self.csv_file.seek(0)
             self.tar.addfile(csv_tar, io.BytesIO(self.csv_file.read().encode('utf8')))
@@ -488,9 +870,261 @@ class TarWriter:  # pylint: disable=too-many-instance-attributes
         self.close()
 
 
+class Tar:  # pylint: disable=too-many-instance-attributes
+    """Sample collection reader for reading uncompressed tar files as written by util.sample_collections.TarWriter.
+    Samples are read directly from the archive (without extracting it) by seeking to their data.
+    For this an index of the archive members gets built on first use and cached next to the archive.
+    Automatically orders samples by CSV column wav_filesize (if available), which is also provided as sizes array."""
+    def __init__(self,
+                 tar_filename,
+                 buffering=BUFFER_SIZE,
+                 labeled=None,
+                 reverse=False,
+                 use_mmap=False,
+                 csv_name=TAR_CSV_NAME):
+        """
+        Parameters
+        ----------
+        tar_filename : str
+            Path to the (uncompressed) tar file to read samples from
+        buffering : int
+            Read-buffer size to use while reading the tar file. Ignored if the file gets memory-mapped.
+        labeled : bool or None
+            If True: Reads LabeledSample instances. Fails, if the CSV file has no transcript column.
+            If False: Ignores transcripts (if available) and reads (unlabeled) util.audio.Sample instances.
+            If None: Automatically determines if the CSV file has a transcript column
+            (reading util.sample_collections.LabeledSample instances) or not (reading util.audio.Sample instances).
+        reverse : bool
+            If the order of the samples should be reversed
+        use_mmap : bool
+            If the tar file should be memory-mapped and samples served as memoryview slices of the mapping
+        csv_name : str
+            Name of the archive member that lists the samples of the archive in DeepSpeech CSV format
+
+        Currently only works with local files (not gs:// or hdfs://...)
+        """
+        # Set before anything can fail, as close() (called by __del__) relies on them
+        self.tar_file = None
+        self.tar_mmap = None
+        self.tar_view = None
+        lower_filename = tar_filename.lower()
+        if lower_filename.endswith('.tgz') or lower_filename.endswith('.gz'):
+            raise ValueError('Compressed tar files do not support random access - please decompress "{}" first'
+                             .format(tar_filename))
+        self.tar_filename = tar_filename
+        self.members = self.load_member_index()
+        self.tar_file = open(tar_filename, 'rb', buffering=buffering)
+        if use_mmap:
+            self.tar_mmap = mmap.mmap(self.tar_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.tar_view = memoryview(self.tar_mmap)
+        self.durations = None
+
+        csv_file = io.StringIO(bytes(self.read_member(csv_name)).decode('utf8'))
+        reader = csv.DictReader(csv_file)
+        if 'transcript' in reader.fieldnames:
+            if labeled is None:
+                labeled = True
+        elif labeled:
+            raise RuntimeError('No transcript data (missing CSV column)')
+        self.labeled = labeled
+        self.samples = []
+        for row in reader:
+            wav_filesize = int(row['wav_filesize']) if 'wav_filesize' in row else 0
+            self.samples.append((row['wav_filename'], wav_filesize, row['transcript'] if labeled else None))
+        self.samples.sort(key=lambda r: r[1], reverse=reverse)
+        self.sizes = np.array([r[1] for r in self.samples], dtype=np.int64)
+
+    def load_member_index(self):
+        index_filename = self.tar_filename + TAR_INDEX_SUFFIX
+        tar_stat = os.stat(self.tar_filename)
+        try:
+            with open(index_filename, 'r', encoding='utf8') as index_file:
+                index = json.load(index_file)
+            if index['size'] == tar_stat.st_size and index['mtime'] == tar_stat.st_mtime:
+                return index['members']
+        except (OSError, ValueError, KeyError):
+            pass
+        with tarfile.open(self.tar_filename, 'r:') as tar:
+            members = {member.name: (member.offset_data, member.size) for member in tar if member.isfile()}
+        try:
+            with open(index_filename, 'w', encoding='utf8') as index_file:
+                json.dump({'size': tar_stat.st_size, 'mtime': tar_stat.st_mtime, 'members': members}, index_file)
+        except OSError:
+            pass  # index could not get cached (e.g. read-only directory) - it will be rebuilt next time
+        return members
+
+    def read_member(self, name):
+        if name not in self.members:
+            raise ValueError('No member "{}" in tar file "{}"'.format(name, self.tar_filename))
+        offset, size = self.members[name]
+        if self.tar_view is not None:
+            return self.tar_view[offset:offset + size]
+        self.tar_file.seek(offset)
+        return self.tar_file.read(size)
+
+    def __getitem__(self, i):
+        member_name, _, transcript = self.samples[i]
+        audio_data = self.read_member(member_name)
+        if self.tar_view is not None:
+            audio_data = MemoryViewIO(audio_data, file_path=self.tar_filename, file_offset=self.members[member_name][0])
+        sample_id = '{}:{}'.format(self.tar_filename, member_name)
+        if self.labeled:
+            return LabeledSample(AUDIO_TYPE_WAV, audio_data, transcript, sample_id=sample_id)
+        return Sample(AUDIO_TYPE_WAV, audio_data, sample_id=sample_id)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __len__(self):
+        return len(self.samples)
+
+    def close(self):
+        if self.tar_view is not None:
+            self.tar_view.release()
+            self.tar_view = None
+        if self.tar_mmap is not None:
+            try:
+                self.tar_mmap.close()
+            except BufferError:
+                pass  # samples are still referencing the mapping - it will get unmapped once they are gone
+            self.tar_mmap = None
+        if self.tar_file is not None:
+            self.tar_file.close()
+            self.tar_file = None
+
+    def __del__(self):
+        self.close()
+
+
+class Arrow:  # pylint: disable=too-many-instance-attributes
+    """Sample collection reader for reading samples from a columnar Parquet or Arrow IPC (Feather) file.
+    Audio data is passed to the samples as views of Arrow's (memory-mapped) buffers without copying it.
+    Samples are ordered by the duration column (if available). Requires the pyarrow package."""
+    def __init__(self,
+                 filename,
+                 labeled=None,
+                 reverse=False,
+                 audio_type=AUDIO_TYPE_WAV,
+                 audio_column='audio',
+                 transcript_column='transcript',
+                 duration_column='duration',
+                 min_duration=None,
+                 max_duration=None):
+        """
+        Parameters
+        ----------
+        filename : str
+            Path to the Parquet (.parquet) or Arrow IPC (.arrow or .feather) file to read samples from
+        labeled : bool or None
+            If True: Reads LabeledSample instances. Fails, if the file has no transcript column.
+            If False: Ignores transcripts (if available) and reads (unlabeled) util.audio.Sample instances.
+            If None: Automatically determines if the file has a transcript column
+            (reading util.sample_collections.LabeledSample instances) or not (reading util.audio.Sample instances).
+        reverse : bool
+            If the order of the samples should be reversed
+        audio_type : str
+            Audio type of the data in the audio column (see util.audio.Sample.__init__) - overridden by
+            schema meta data entry "audio-type" (if present)
+        audio_column : str
+            Name of the (large) binary column containing the serialized audio data of the samples
+        transcript_column : str
+            Name of the string column containing the transcripts of the samples
+        duration_column : str
+            Name of the optional float column containing the durations of the samples in seconds
+        min_duration : float
+            If provided, samples shorter than this (according to duration_column) are skipped.
+            For Parquet files this filter gets pushed down to the reader.
+        max_duration : float
+            If provided, samples longer than this (according to duration_column) are skipped.
+            For Parquet files this filter gets pushed down to the reader.
+        """
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        self.filename = filename
+        ext = os.path.splitext(filename)[1].lower()
+        if ext == '.parquet':
+            import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+            names = pq.read_schema(filename).names
+        else:
+            table = pa.ipc.open_file(pa.memory_map(filename, 'r')).read_all()
+            names = table.schema.names
+        if audio_column not in names:
+            raise RuntimeError('No audio data (missing column "{}")'.format(audio_column))
+        if transcript_column in names:
+            if labeled is None:
+                labeled = True
+        elif labeled:
+            raise RuntimeError('No transcript data (missing column "{}")'.format(transcript_column))
+        self.labeled = labeled
+        has_durations = duration_column in names
+        filters = []
+        if has_durations and min_duration is not None:
+            filters.append((duration_column, '>=', min_duration))
+        if has_durations and max_duration is not None:
+            filters.append((duration_column, '<=', max_duration))
+        if ext == '.parquet':
+            columns = [audio_column] + ([transcript_column] if labeled else []) + \
+                      ([duration_column] if has_durations else [])
+            table = pq.read_table(filename, columns=columns, filters=filters if filters else None, memory_map=True)
+        metadata = table.schema.metadata or {}
+        self.audio_type = metadata[b'audio-type'].decode() if b'audio-type' in metadata else audio_type
+        if self.audio_type not in SERIALIZABLE_AUDIO_TYPES:
+            raise ValueError('Audio type "{}" not supported'.format(self.audio_type))
+
+        self.durations = None
+        self.order = np.arange(table.num_rows)
+        if has_durations:
+            durations = table.column(duration_column).to_numpy().astype(np.float64)
+            mask = np.ones(len(durations), dtype=bool)
+            if ext != '.parquet':
+                if min_duration is not None:
+                    mask &= durations >= min_duration
+                if max_duration is not None:
+                    mask &= durations <= max_duration
+            self.order = self.order[mask]
+            durations = durations[mask]
+            order = np.argsort(-durations if reverse else durations, kind='stable')
+            self.order = self.order[order]
+            self.durations = durations[order]
+        elif reverse:
+            self.order = self.order[::-1]
+
+        self.transcripts = table.column(transcript_column) if labeled else None
+        audio = table.column(audio_column)
+        if not (pa.types.is_binary(audio.type) or pa.types.is_large_binary(audio.type)):
+            raise RuntimeError('Audio column "{}" has to be of a binary type'.format(audio_column))
+        offsets_dtype = np.int64 if pa.types.is_large_binary(audio.type) else np.int32
+        self.chunk_bounds = np.cumsum([len(chunk) for chunk in audio.chunks])
+        self.chunks = []
+        for chunk in audio.chunks:
+            _, offsets, data = chunk.buffers()
+            offsets = np.frombuffer(offsets, dtype=offsets_dtype)[chunk.offset:chunk.offset + len(chunk) + 1]
+            self.chunks.append((offsets, memoryview(data) if data is not None else memoryview(b'')))
+        self.table = table
+
+    def __getitem__(self, i):
+        row = int(self.order[i])
+        chunk_index = int(np.searchsorted(self.chunk_bounds, row, side='right'))
+        chunk_row = row - (int(self.chunk_bounds[chunk_index - 1]) if chunk_index > 0 else 0)
+        offsets, data = self.chunks[chunk_index]
+        audio_data = data[int(offsets[chunk_row]):int(offsets[chunk_row + 1])]
+        sample_id = '{}:{}'.format(self.filename, row)
+        if self.labeled:
+            transcript = self.transcripts[row].as_py()
+            return LabeledSample(self.audio_type, audio_data, transcript, sample_id=sample_id)
+        return Sample(self.audio_type, audio_data, sample_id=sample_id)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __len__(self):
+        return len(self.order)
+
+
 class SampleList:
     """Sample collection base class with samples loaded from a list of in-memory paths."""
-    def __init__(self, samples, labeled=True, reverse=False):
+    def __init__(self, samples, labeled=True, reverse=False, durations=None):
         """
         Parameters
         ----------
@@ -501,10 +1135,22 @@ class SampleList:
             If False: Ignores transcripts (if available) and reads (unlabeled) util.audio.Sample instances.
         reverse : bool
             If the order of the samples should be reversed
+        durations : list of float
+            Optional sample durations in the order of samples - if provided, they are used for ordering the samples
+            instead of their file-sizes and are available as (ordered) durations array.
+            File-sizes are always available as (ordered) sizes array.
         """
         self.labeled = labeled
         self.samples = list(samples)
-        self.samples.sort(key=lambda r: r[1], reverse=reverse)
+        self.durations = None
+        if durations is None:
+            self.samples.sort(key=lambda r: r[1], reverse=reverse)
+        else:
+            durations = np.array(durations, dtype=np.float64)
+            order = np.argsort(-durations if reverse else durations, kind='stable')
+            self.samples = [self.samples[i] for i in order]
+            self.durations = durations[order]
+        self.sizes = np.array([r[1] for r in self.samples], dtype=np.int64)
 
     def __getitem__(self, i):
         sample_spec = self.samples[i]
@@ -516,8 +1162,8 @@ class SampleList:
 
 class CSV(SampleList):
     """Sample collection reader for reading a DeepSpeech CSV file
-    Automatically orders samples by CSV column wav_filesize (if available)."""
-    def __init__(self, csv_filename, labeled=None, reverse=False):
+    Automatically orders samples by CSV column wav_filesize (if available) or by probed durations."""
+    def __init__(self, csv_filename, labeled=None, reverse=False, probe_durations=False):
         """
         Parameters
         ----------
@@ -530,6 +1176,11 @@ class CSV(SampleList):
             (reading util.sample_collections.LabeledSample instances) or not (reading util.audio.Sample instances).
         reverse : bool
             If the order of the samples should be reversed
+        probe_durations : bool
+            If True and all referenced files are local, their exact durations are determined by reading their WAV
+            headers (see util.durations.probe_durations) and used for ordering the samples.
+            Durations get cached in a file next to the CSV file (CSV filename plus ".durations"),
+            so that only new or modified files have to be probed again.
         """
         rows = []
         with open_remote(csv_filename, 'r', encoding='utf8') as csv_file:
@@ -552,17 +1203,305 @@ class CSV(SampleList):
                     rows.append((wav_filename, wav_filesize, row['transcript']))
                 else:
                     rows.append((wav_filename, wav_filesize))
-        super(CSV, self).__init__(rows, labeled=labeled, reverse=reverse)
+        durations = None
+        if probe_durations and not is_remote_path(csv_filename) and not any(is_remote_path(r[0]) for r in rows):
+            durations = probe_audio_durations([r[0] for r in rows],
+                                              cache_filename=csv_filename + DURATIONS_SUFFIX)
+        super(CSV, self).__init__(rows, labeled=labeled, reverse=reverse, durations=durations)
+
+
+class DurationInterleaved:
+    """Sample collection that combines sample collections with known sample durations (attribute durations)
+    into one collection ordered by duration. Like util.helpers.Interleaved it merges the (already ordered)
+    collections, but it determines the merged order upfront without reading (or unpacking) any sample
+    and supports random access."""
+    def __init__(self, *collections, reverse=False):
+        """
+        Parameters
+        ----------
+        collections : random access sample collections
+            Sample collections like util.sample_collections.SDB providing a durations array
+        reverse : bool
+            If the samples should be ordered from longest to shortest
+        """
+        self.collections = collections
+        self.bounds = np.cumsum([len(collection) for collection in collections])
+        durations = np.concatenate([collection.durations for collection in collections])
+        starts = [0] + self.bounds[:-1].tolist()
+        duration_list = durations.tolist()
+        merged = heapq.merge(*[range(start, end) for start, end in zip(starts, self.bounds.tolist())],
+                             key=duration_list.__getitem__,
+                             reverse=reverse)
+        self.order = np.fromiter(merged, dtype=np.int64, count=len(durations))
+        self.durations = durations[self.order]
+        self.transcript_lengths = None
+        if all(getattr(collection, 'transcript_lengths', None) is not None for collection in collections):
+            self.transcript_lengths = np.concatenate([c.transcript_lengths for c in collections])[self.order]
+
+    def __getitem__(self, i):
+        index = int(self.order[i])
+        collection_index = int(np.searchsorted(self.bounds, index, side='right'))
+        if collection_index > 0:
+            index -= int(self.bounds[collection_index - 1])
+        return self.collections[collection_index][index]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __len__(self):
+        return len(self.order)
+
+
+class SampleCache:
+    """Bounded in-memory LRU cache of (typically decoded) samples keyed by their sample IDs.
+    The cache size is limited by the summed byte sizes of the cached samples' audio data."""
+    def __init__(self, max_size):
+        """
+        Parameters
+        ----------
+        max_size : int
+            Maximum summed byte size of the audio data of all cached samples
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.samples = OrderedDict()
+
+    @staticmethod
+    def get_sample_size(sample):
+        audio = sample.audio
+        if hasattr(audio, 'nbytes'):
+            return audio.nbytes
+        if hasattr(audio, 'getbuffer'):
+            return len(audio.getbuffer())
+        return len(audio)
+
+    def get(self, sample_id):
+        sample, _ = self.samples[sample_id]
+        self.samples.move_to_end(sample_id)
+        return sample
+
+    def put(self, sample, evict=True):
+        """Adds a sample to the cache by evicting least recently used samples (if evict is True).
+        Returns False if the sample is too big for the cache (or for its free space, if evict is False)."""
+        self.discard(sample.sample_id)
+        size = SampleCache.get_sample_size(sample)
+        if size > (self.max_size if evict else self.max_size - self.size):
+            return False
+        while self.size + size > self.max_size:
+            _, (_, evicted_size) = self.samples.popitem(last=False)
+            self.size -= evicted_size
+        self.samples[sample.sample_id] = sample, size
+        self.size += size
+        return True
+
+    def discard(self, sample_id):
+        """Removes a sample from the cache, if it is cached."""
+        if sample_id in self.samples:
+            _, size = self.samples.pop(sample_id)
+            self.size -= size
+
+    def __contains__(self, sample_id):
+        return sample_id in self.samples
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class CachedSampleSet:
+    """
+    Keeps the samples of a (not augmented) sample set in a util.sample_collections.SampleCache that can be shared
+    with other sets. A set only gets cached completely, as a partially cached set would get evicted by the rest of
+    its own pass. Its samples only go into space that is not used by other sets - so sets that fit into the cache
+    on their own but not together do not keep evicting each other. The first sets that fit stay cached.
+    """
+    def __init__(self, sample_cache, on_overflow=None):
+        """
+        Parameters
+        ----------
+        sample_cache : util.sample_collections.SampleCache
+            Cache to keep the samples in
+        on_overflow : callable
+            Called without arguments when the set turns out to not fit into the free space of the cache
+        """
+        self.sample_cache = sample_cache
+        self.on_overflow = on_overflow
+        self.sample_ids = []
+        self.cacheable = True
+
+    def is_cached(self):
+        """Returns if all samples of the last complete pass are (still) in the cache."""
+        return self.cacheable and len(self.sample_ids) > 0 and all(sid in self.sample_cache for sid in self.sample_ids)
+
+    def get_samples(self):
+        """Returns the cached samples of the last complete pass in their original order."""
+        return map(self.sample_cache.get, list(self.sample_ids))
+
+    def cache(self, samples, num_samples):
+        """
+        Passes through the first num_samples samples and caches them, as long as they all fit into the free space
+        of the cache. If they do not, the set is considered uncacheable from then on.
+
+        Parameters
+        ----------
+        samples : iterable of util.audio.Sample
+            Samples of the set
+        num_samples : int
+            Number of samples of a pass
+
+        Returns
+        -------
+        iterable of util.audio.Sample
+            The first num_samples samples
+        """
+        for sample_id in self.sample_ids:  # remainder of a former pass that got partially evicted
+            self.sample_cache.discard(sample_id)
+        self.sample_ids = []
+        sample_ids = []
+        complete = False
+        try:
+            for sample in samples:
+                if len(sample_ids) >= num_samples:
+                    break
+                if self.cacheable and not self.sample_cache.put(sample, evict=False):
+                    self.cacheable = False
+                    for sample_id in sample_ids:
+                        self.sample_cache.discard(sample_id)
+                    if self.on_overflow is not None:
+                        self.on_overflow()
+                sample_ids.append(sample.sample_id)
+                yield sample
+            complete = True
+        finally:
+            if self.cacheable and complete:
+                self.sample_ids = sample_ids
+            elif self.cacheable:  # samples of an aborted pass would only occupy space of other sets
+                for sample_id in sample_ids:
+                    self.sample_cache.discard(sample_id)
+
+
+class Concatenated:
+    """Random access sample collection that chains random access sample collections without reordering them.
+    Provides the durations (and file sizes) of its samples as arrays, if all collections provide them."""
+    def __init__(self, *collections):
+        """
+        Parameters
+        ----------
+        collections : random access sample collections
+            Sample collections to chain
+        """
+        self.collections = collections
+        self.bounds = np.cumsum([len(collection) for collection in collections])
+
+        def concatenate(attribute):
+            columns = [getattr(collection, attribute, None) for collection in collections]
+            if len(columns) == 0 or any(column is None for column in columns):
+                return None
+            return np.concatenate(columns)
+        self.durations = concatenate('durations')
+        self.sizes = concatenate('sizes')
+
+    def __getitem__(self, i):
+        collection_index = int(np.searchsorted(self.bounds, i, side='right'))
+        if collection_index > 0:
+            i -= int(self.bounds[collection_index - 1])
+        return self.collections[collection_index][i]
+
+    def __iter__(self):
+        for collection in self.collections:
+            yield from collection
+
+    def __len__(self):
+        return int(self.bounds[-1]) if len(self.bounds) > 0 else 0
+
+
+class DurationBuckets:
+    """Sample collection view that groups the samples of a random access sample collection into duration buckets
+    of equal size. Samples are ordered as randomly shuffled batches of samples from the same bucket.
+    This reduces padding within batches without having to feed samples in a fixed order from shortest to longest.
+    Only the final batch could have less than batch_size samples.
+    Buckets are determined once - calling `shuffle` (e.g. on every epoch) only draws a new order of samples
+    and batches."""
+    def __init__(self, collection, batch_size, num_buckets, seed=None):
+        """
+        Parameters
+        ----------
+        collection : random access sample collection
+            Sample collection to group into buckets. It has to provide the durations of its samples
+            (attribute durations) or, as an approximation of them, the sizes of its sample files (attribute sizes).
+        batch_size : int
+            Number of consecutive samples that are taken from the same bucket
+        num_buckets : int
+            Number of duration buckets
+        seed : int
+            Seed for the initial shuffling of samples and batches
+        """
+        if not hasattr(type(collection), '__getitem__'):
+            raise ValueError('Duration bucketing requires a random access sample collection')
+        if batch_size < 1 or num_buckets < 1:
+            raise ValueError('Batch size and number of buckets have to be positive')
+        self.collection = collection
+        self.batch_size = batch_size
+        lengths = getattr(collection, 'durations', None)
+        if lengths is None:
+            lengths = getattr(collection, 'sizes', None)
+            if lengths is None or not np.any(lengths):
+                raise ValueError('Duration bucketing requires sample durations - please use SDB files with '
+                                 'durations index, CSV files with wav_filesize column or --probe_durations')
+        self.lengths = np.asarray(lengths)
+        self.buckets = np.array_split(np.argsort(self.lengths, kind='stable'), num_buckets)
+        self.order = None
+        self.durations = None
+        self.shuffle(seed)
+
+    def shuffle(self, seed):
+        """Draws a new random order of the samples within their buckets and of the resulting batches.
+        Iterations that already started keep their order."""
+        rng = np.random.RandomState(seed)
+        batches = []
+        remainders = []
+        for bucket in self.buckets:
+            bucket = rng.permutation(bucket)
+            num_full = len(bucket) - len(bucket) % self.batch_size
+            batches.extend(bucket[:num_full].reshape(-1, self.batch_size))
+            remainders.append(bucket[num_full:])
+        remainders = np.concatenate(remainders)
+        remainders = remainders[np.argsort(self.lengths[remainders], kind='stable')]
+        num_full = len(remainders) - len(remainders) % self.batch_size
+        batches.extend(remainders[:num_full].reshape(-1, self.batch_size))
+        rng.shuffle(batches)
+        batches.append(remainders[num_full:])
+        self.order = np.concatenate(batches).astype(np.int64)
+        if getattr(self.collection, 'durations', None) is not None:
+            self.durations = self.lengths[self.order]
+        return self
+
+    def __getitem__(self, i):
+        return self.collection[int(self.order[i])]
+
+    def __iter__(self):
+        for i in self.order:
+            yield self.collection[int(i)]
+
+    def __len__(self):
+        return len(self.order)
 
 
-def samples_from_source(sample_source, buffering=BUFFER_SIZE, labeled=None, reverse=False):
+def samples_from_source(sample_source,
+                        buffering=BUFFER_SIZE,
+                        labeled=None,
+                        reverse=False,
+                        use_mmap=False,
+                        probe_durations=False,
+                        min_duration=None,
+                        max_duration=None):
     """
     Loads samples from a sample source file.
 
     Parameters
     ----------
     sample_source : str
-        Path to the sample source file (SDB or CSV)
+        Path to the sample source file (SDB, sharded SDB manifest, uncompressed tar, Parquet, Arrow IPC or CSV)
     buffering : int
         Read-buffer size to use while reading files
     labeled : bool or None
@@ -572,6 +1511,16 @@ def samples_from_source(sample_source, buffering=BUFFER_SIZE, labeled=None, reve
         (reading util.sample_collections.LabeledSample instances) or not (reading util.audio.Sample instances).
     reverse : bool
         If the order of the samples should be reversed
+    use_mmap : bool
+        If local SDB and tar files should be memory-mapped instead of being read through a read-buffer
+    probe_durations : bool
+        If exact sample durations of CSV files should be probed from WAV headers (see util.sample_collections.CSV)
+    min_duration : float
+        If provided, samples of Parquet and Arrow IPC files shorter than this are skipped
+        (see util.sample_collections.Arrow)
+    max_duration : float
+        If provided, samples of Parquet and Arrow IPC files longer than this are skipped
+        (see util.sample_collections.Arrow)
 
     Returns
     -------
@@ -579,16 +1528,32 @@ def samples_from_source(sample_source, buffering=BUFFER_SIZE, labeled=None, reve
     """
     ext = os.path.splitext(sample_source)[1].lower()
     if ext == '.sdb':
-        return SDB(sample_source, buffering=buffering, labeled=labeled, reverse=reverse)
+        return SDB(sample_source, buffering=buffering, labeled=labeled, reverse=reverse, use_mmap=use_mmap)
+    if ext == '.sdbm':
+        return ShardedSDB(sample_source, buffering=buffering, labeled=labeled, reverse=reverse, use_mmap=use_mmap)
+    if ext == '.tar':
+        return Tar(sample_source, buffering=buffering, labeled=labeled, reverse=reverse, use_mmap=use_mmap)
+    if ext in ['.parquet', '.arrow', '.feather']:
+        return Arrow(sample_source, labeled=labeled, reverse=reverse, min_duration=min_duration, max_duration=max_duration)
     if ext == '.csv':
-        return CSV(sample_source, labeled=labeled, reverse=reverse)
+        return CSV(sample_source, labeled=labeled, reverse=reverse, probe_durations=probe_durations)
     raise ValueError('Unknown file type: "{}"'.format(ext))
 
 
-def samples_from_sources(sample_sources, buffering=BUFFER_SIZE, labeled=None, reverse=False):
+def samples_from_sources(sample_sources,
+                         buffering=BUFFER_SIZE,
+                         labeled=None,
+                         reverse=False,
+                         use_mmap=False,
+                         probe_durations=False,
+                         random_access=False,
+                         min_duration=None,
+                         max_duration=None):
     """
     Loads and combines samples from a list of source files. Sources are combined in an interleaving way to
     keep default sample order from shortest to longest.
+    If all sources provide sample durations upfront (like SDBs with an index section), they get combined by
+    util.sample_collections.DurationInterleaved without reading any samples for ordering them.
 
     Note that when using distributed training, it is much faster to call this function with single pre-
     sorted sample source, because this allows for parallelization of the file I/O. (If this function is
@@ -598,7 +1563,7 @@ def samples_from_sources(sample_sources, buffering=BUFFER_SIZE, labeled=None, re
     Parameters
     ----------
     sample_sources : list of str
-        Paths to sample source files (SDBs or CSVs)
+        Paths to sample source files (SDBs, sharded SDB manifests, uncompressed tars, Parquet, Arrow IPC or CSVs)
     buffering : int
         Read-buffer size to use while reading files
     labeled : bool or None
@@ -608,6 +1573,17 @@ def samples_from_sources(sample_sources, buffering=BUFFER_SIZE, labeled=None, re
         util.audio.Sample instances from sources with no transcripts.
     reverse : bool
         If the order of the samples should be reversed
+    use_mmap : bool
+        If local SDB and tar files should be memory-mapped instead of being read through a read-buffer
+    probe_durations : bool
+        If exact sample durations of CSV files should be probed from WAV headers (see util.sample_collections.CSV)
+    random_access : bool
+        If a random access collection is required. Sources without durations are then chained by
+        util.sample_collections.Concatenated instead of getting interleaved (which requires reading the samples).
+    min_duration : float
+        If provided, samples of Parquet and Arrow IPC files shorter than this are skipped
+    max_duration : float
+        If provided, samples of Parquet and Arrow IPC files longer than this are skipped
 
     Returns
     -------
@@ -619,12 +1595,31 @@ def samples_from_sources(sample_sources, buffering=BUFFER_SIZE, labeled=None, re
     if len(sample_sources) == 0:
         raise ValueError('No files')
     if len(sample_sources) == 1:
-        return samples_from_source(sample_sources[0], buffering=buffering, labeled=labeled, reverse=reverse)
+        return samples_from_source(sample_sources[0],
+                                   buffering=buffering,
+                                   labeled=labeled,
+                                   reverse=reverse,
+                                   use_mmap=use_mmap,
+                                   probe_durations=probe_durations,
+                                   min_duration=min_duration,
+                                   max_duration=max_duration)
+
+    cols = [samples_from_source(source,
+                                buffering=buffering,
+                                labeled=labeled,
+                                reverse=reverse,
+                                use_mmap=use_mmap,
+                                probe_durations=probe_durations,
+                                min_duration=min_duration,
+                                max_duration=max_duration)
+            for source in sample_sources]
+    if all(getattr(col, 'durations', None) is not None for col in cols):
+        return DurationInterleaved(*cols, reverse=reverse)
+    if random_access:
+        return Concatenated(*cols)
 
     # If we wish to interleave based on duration, we have to unpack the audio. Note that this unpacking should
     # be done lazily onn the fly so that it respects the LimitingPool logic used in the feeding code.
-    cols = [LenMap(
-        unpack_maybe, samples_from_source(source, buffering=buffering, labeled=labeled, reverse=reverse))
-        for source in sample_sources]
+    cols = [LenMap(unpack_maybe, col) for col in cols]
 
     return Interleaved(*cols, key=lambda s: s.duration, reverse=reverse)
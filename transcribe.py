@@ -13,7 +13,6 @@ import logging
 logging.getLogger('sox').setLevel(logging.ERROR)
 import glob
 
-from deepspeech_training.util.audio import AudioFile
 from deepspeech_training.util.config import Config, initialize_globals
 from deepspeech_training.util.feeding import split_audio_file
 from deepspeech_training.util.flags import create_flags, FLAGS
@@ -36,40 +35,41 @@ def transcribe_file(audio_path, tlog_path):
         num_processes = cpu_count()
     except NotImplementedError:
         num_processes = 1
-    with AudioFile(audio_path, as_path=True) as wav_path:
-        data_set = split_audio_file(wav_path,
-                                    batch_size=FLAGS.batch_size,
-                                    aggressiveness=FLAGS.vad_aggressiveness,
-                                    outlier_duration_ms=FLAGS.outlier_duration_ms,
-                                    outlier_batch_size=FLAGS.outlier_batch_size)
-        iterator = tf.data.Iterator.from_structure(data_set.output_types, data_set.output_shapes,
-                                                   output_classes=data_set.output_classes)
-        batch_time_start, batch_time_end, batch_x, batch_x_len = iterator.get_next()
-        no_dropout = [None] * 6
-        logits, _ = create_model(batch_x=batch_x, seq_length=batch_x_len, dropout=no_dropout)
-        transposed = tf.nn.softmax(tf.transpose(logits, [1, 0, 2]))
-        tf.train.get_or_create_global_step()
-        with tf.Session(config=Config.session_config) as session:
-            load_graph_for_evaluation(session)
-            session.run(iterator.make_initializer(data_set))
-            transcripts = []
-            while True:
-                try:
-                    starts, ends, batch_logits, batch_lengths = \
-                        session.run([batch_time_start, batch_time_end, transposed, batch_x_len])
-                except tf.errors.OutOfRangeError:
-                    break
-                decoded = ctc_beam_search_decoder_batch(batch_logits, batch_lengths, Config.alphabet, FLAGS.beam_width,
-                                                        num_processes=num_processes,
-                                                        scorer=scorer)
-                decoded = list(d[0][1] for d in decoded)
-                transcripts.extend(zip(starts, ends, decoded))
-            transcripts.sort(key=lambda t: t[0])
-            transcripts = [{'start': int(start),
-                            'end': int(end),
-                            'transcript': transcript} for start, end, transcript in transcripts]
-            with open(tlog_path, 'w') as tlog_file:
-                json.dump(transcripts, tlog_file, default=float)
+    # Audio gets converted in-process (if required) while reading it
+    data_set = split_audio_file(audio_path,
+                                batch_size=FLAGS.batch_size,
+                                aggressiveness=FLAGS.vad_aggressiveness,
+                                vad_method=FLAGS.vad_method,
+                                outlier_duration_ms=FLAGS.outlier_duration_ms,
+                                outlier_batch_size=FLAGS.outlier_batch_size)
+    iterator = tf.data.Iterator.from_structure(data_set.output_types, data_set.output_shapes,
+                                               output_classes=data_set.output_classes)
+    batch_time_start, batch_time_end, batch_x, batch_x_len = iterator.get_next()
+    no_dropout = [None] * 6
+    logits, _ = create_model(batch_x=batch_x, seq_length=batch_x_len, dropout=no_dropout)
+    transposed = tf.nn.softmax(tf.transpose(logits, [1, 0, 2]))
+    tf.train.get_or_create_global_step()
+    with tf.Session(config=Config.session_config) as session:
+        load_graph_for_evaluation(session)
+        session.run(iterator.make_initializer(data_set))
+        transcripts = []
+        while True:
+            try:
+                starts, ends, batch_logits, batch_lengths = \
+                    session.run([batch_time_start, batch_time_end, transposed, batch_x_len])
+            except tf.errors.OutOfRangeError:
+                break
+            decoded = ctc_beam_search_decoder_batch(batch_logits, batch_lengths, Config.alphabet, FLAGS.beam_width,
+                                                    num_processes=num_processes,
+                                                    scorer=scorer)
+            decoded = list(d[0][1] for d in decoded)
+            transcripts.extend(zip(starts, ends, decoded))
+        transcripts.sort(key=lambda t: t[0])
+        transcripts = [{'start': int(start),
+                        'end': int(end),
+                        'transcript': transcript} for start, end, transcript in transcripts]
+        with open(tlog_path, 'w') as tlog_file:
+            json.dump(transcripts, tlog_file, default=float)
 
 
 def transcribe_many(src_paths,dst_paths):
@@ -162,6 +162,9 @@ if __name__ == '__main__':
                                                 'transcription logs (.tlog)')
     tf.app.flags.DEFINE_integer('vad_aggressiveness', 3, 'How aggressive (0=lowest, 3=highest) the VAD should '
                                                          'split audio')
+    tf.app.flags.DEFINE_enum('vad_method', 'auto', ['auto', 'webrtc', 'energy'],
+                             'Voice activity detection for splitting audio: "webrtc" (requires webrtcvad), '
+                             '"energy" (log-energy and zero-crossing rate based) or "auto" (webrtc, if available)')
     tf.app.flags.DEFINE_integer('batch_size', 40, 'Default batch size')
     tf.app.flags.DEFINE_float('outlier_duration_ms', 10000, 'Duration in ms after which samples are considered outliers')
     tf.app.flags.DEFINE_integer('outlier_batch_size', 1, 'Batch size for duration outliers (defaults to 1)')